@@ -0,0 +1,133 @@
+import numpy as np
+
+
+class ConvergenceRecorder:
+    """
+    Streaming record of the best score of every iteration of a trial. The sum and variance are updated online
+    (Welford, with a whole run of equal scores merged at once), and the curve is kept as the iterations where the
+    best score improves and its values there, so a trial never stores one entry per iteration. The sum of integer
+    distances is exact, so the mean of the bundled instances is the one np.mean gives, and the standard deviation
+    differs from np.std by floating-point rounding only.
+
+    The best score so far never gets worse, so the improvements are the whole sorted sequence and give the exact
+    median.
+    With max_points, the curve is down-sampled to at most that many points, which bounds the memory of a trial
+    whatever its length: only the first improvement of every window of resolution iterations is kept, plus the
+    current best, and the resolution doubles whenever the curve is full. A dropped improvement's run is recorded
+    with the score before it, so the curve is an upper bound of the true one, and the median is off by at most the
+    improvement made within the window that holds it. The mean and standard deviation are not affected.
+    """
+
+    def __init__(self, max_points: int = None):
+        if max_points is not None and max_points < 2:
+            raise ValueError('A down-sampled curve keeps at least 2 points')
+        self.max_points = max_points
+        self.length = 0
+        self.total = 0.0
+        self.mean = 0.0
+        self.m2 = 0.0
+        # First iteration of every run of equal best scores, and its score
+        self.starts = []
+        self.values = []
+        self.resolution = 1
+
+    def __len__(self) -> int:
+        return self.length
+
+    def record(self, best_score, count: int = 1) -> None:
+        """
+        Method to record the best score so far for count more iterations, a worse score than the best recorded
+        one, e.g. of a population that just restarted, is recorded as the best one
+        :param best_score: float
+        :param count: int
+        :return: None
+        """
+        if not self.values or best_score < self.values[-1]:
+            self.starts.append(self.length)
+            self.values.append(best_score)
+            if self.max_points is not None:
+                self._downsample()
+        else:
+            best_score = self.values[-1]
+        length = self.length + count
+        self.total += float(best_score) * count
+        delta = float(best_score) - self.mean
+        self.mean += delta * count / length
+        self.m2 += delta * delta * self.length * count / length
+        self.length = length
+
+    @classmethod
+    def minimum(cls, recorders: list, max_points: int = None):
+        """
+        Method to merge the recorders of runs of the same length into the record of their best score at every
+        iteration, exact when none of them was down-sampled
+        :param recorders: list of ConvergenceRecorder
+        :param max_points: int, down-sample the merged curve to at most this many points
+        :return: ConvergenceRecorder
+        """
+        length = recorders[0].length
+        starts = sorted(set().union(*(recorder.starts for recorder in recorders)))
+        merged = cls(max_points)
+        for start, count in zip(starts, np.diff(starts, append=length).tolist()):
+            merged.record(min(recorder._value_at(start) for recorder in recorders), count)
+        return merged
+
+    def _downsample(self) -> None:
+        # Every point but the current best is the first improvement of its window
+        if len(self.starts) >= 3 and self.starts[-2] // self.resolution == self.starts[-3] // self.resolution:
+            del self.starts[-2], self.values[-2]
+        while len(self.starts) > self.max_points:
+            self.resolution *= 2
+            windows = [start // self.resolution for start in self.starts]
+            kept = [0] + [k for k in range(1, len(self.starts) - 1) if windows[k] != windows[k - 1]]
+            kept.append(len(self.starts) - 1)
+            self.starts, self.values = [self.starts[k] for k in kept], [self.values[k] for k in kept]
+
+    def _value_at(self, iteration: int):
+        return self.values[np.searchsorted(self.starts, iteration, side='right') - 1]
+
+    def median(self) -> float:
+        """
+        Method to find the median of the recorded best scores, exact unless the curve was down-sampled
+        :return: median: float
+        """
+        # The best scores in ascending order are the iterations in reverse
+        lower = self._value_at(self.length - 1 - (self.length - 1) // 2)
+        upper = self._value_at(self.length - 1 - self.length // 2)
+        return (np.float64(lower) + np.float64(upper)) / 2
+
+    def statistics(self) -> dict:
+        """
+        Method to summarize the recorded best scores the way the trials log reports them
+        :return: statistics: dict
+        """
+        return {
+            'Mean': np.float64(self.total) / self.length,
+            'Median': self.median(),
+            'Standard Deviation': np.sqrt(np.float64(self.m2) / self.length)
+        }
+
+    def history(self) -> dict:
+        """
+        Method to get the compact curve, as saved by results.save_convergence_history
+        :return: history: dict of the starts and values of the runs, and the number of iterations
+        """
+        return {'starts': np.array(self.starts), 'values': np.array(self.values), 'length': self.length}
+
+    def get_state(self) -> dict:
+        """
+        Method to capture the recorder for a checkpoint
+        :return: state: dict of arrays
+        """
+        return dict(self.history(), moments=np.array([self.total, self.mean, self.m2]), resolution=self.resolution)
+
+    def set_state(self, state: dict) -> None:
+        """
+        Method to put the recorder back in a state captured by get_state
+        :param state: dict
+        :return: None
+        """
+        self.starts, self.values = np.asarray(state['starts']).tolist(), list(np.asarray(state['values']))
+        self.length = int(state['length'])
+        self.total, self.mean, self.m2 = (float(moment) for moment in state['moments'])
+        self.resolution = int(state['resolution'])
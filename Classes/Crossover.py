@@ -1,12 +1,25 @@
 import numpy as np
 from utils import contains_duplicates, find_duplicate_indexes
+from Classes.RandomStream import RandomStream
+from Classes.Instrumentation import NULL_INSTRUMENTATION
 
 
 class Crossover:
-    def __init__(self, parent1, parent2, crossover_rate):
+    # Permutation-preserving operators selectable by name in place of a number of crossover points
+    PERMUTATION_OPERATORS = {
+        'ox': 'order_crossover_batch',
+        'pmx': 'partially_mapped_crossover_batch',
+        'erx': 'edge_recombination_batch'
+    }
+
+    def __init__(self, parent1, parent2, crossover_rate, rng=None, instrumentation=NULL_INSTRUMENTATION):
         self.parent1 = parent1
         self.parent2 = parent2
         self.crossover_rate = crossover_rate
+        self.rng = rng if rng is not None else RandomStream()
+        self.instrumentation = instrumentation
+        # Whether the last call to crossover mixed the parents, children are plain copies otherwise
+        self.performed = False
 
     @staticmethod
     def fix_child(child, parent):
@@ -27,7 +40,10 @@ class Crossover:
                 else:
                     unique_values.add(value)
 
-            missing_values = list(set(parent) - unique_values)
+            # Taken in the order of the set of 1-based cities, which decides which duplicate gets which city
+            missing_values = [
+                city - 1 for city in {int(city) + 1 for city in parent} - {int(value) + 1 for value in unique_values}
+            ]
 
             # Replace duplicates with missing values
             for i in duplicate_indices:
@@ -39,20 +55,31 @@ class Crossover:
 
         return child
 
-    def crossover(self, num_points):
+    def crossover(self, num_points, out: np.ndarray = None):
         """
         Method to generate 2 different children by crossover.
-        :param num_points: Number of crossover points.
+        :param num_points: Number of crossover points, or 'ox', 'pmx' or 'erx' for a permutation-preserving operator.
+        :param out: ndarray of shape (2, n_cities) the children are written into, e.g. scratch rows of the population
         :return: child1, child2: ndarray, ndarray
         """
-        rng = np.random.default_rng()
+        rng = self.rng
+        if out is None:
+            out = np.empty((2, len(self.parent1)), dtype=self.parent1.dtype)
+        child1, child2 = out[0], out[1]
         # Decide whether to perform crossover based on the crossover rate
-        if rng.random() <= self.crossover_rate:
+        self.performed = rng.random() <= self.crossover_rate
+        if self.performed and isinstance(num_points, str):
+            operator = getattr(self, self.PERMUTATION_OPERATORS[num_points])
+            parents = np.stack((self.parent1, self.parent2))
+            out[:] = operator(parents, parents[::-1], rng)
+
+            return child1, child2
+        elif self.performed:
             # Randomly select unique crossover points
-            crossover_points = sorted(rng.choice(len(self.parent1) - 2, size=num_points, replace=False) + 1)
+            crossover_points = sorted(np.argsort(rng.random(len(self.parent1) - 2))[:num_points] + 1)
 
-            # Initialize children as copies of parents
-            child1, child2 = self.parent1.copy(), self.parent2.copy()
+            # Start the children from the parents
+            child1[:], child2[:] = self.parent1, self.parent2
 
             # Alternate segments from each parent based on crossover points
             for i in range(num_points):
@@ -60,14 +87,209 @@ class Crossover:
                     continue
 
                 end_point = crossover_points[i + 1] if i + 1 < len(crossover_points) else len(self.parent1)
-                (child1[crossover_points[i]:end_point]
-                 , child2[crossover_points[i]:end_point]) = (child2[crossover_points[i]:end_point],
-                                                             child1[crossover_points[i]:end_point])
+                child1[crossover_points[i]:end_point] = self.parent2[crossover_points[i]:end_point]
+                child2[crossover_points[i]:end_point] = self.parent1[crossover_points[i]:end_point]
 
-            fixed_child1 = self.fix_child(child1, self.parent1)
-            fixed_child2 = self.fix_child(child2, self.parent2)
+            with self.instrumentation.phase('repair'):
+                fixed_child1 = self.fix_child(child1, self.parent1)
+                fixed_child2 = self.fix_child(child2, self.parent2)
 
             return fixed_child1, fixed_child2
         else:
             # If crossover is not performed, children are copies of the parents
-            return self.parent1.copy(), self.parent2.copy()
+            child1[:], child2[:] = self.parent1, self.parent2
+            return child1, child2
+
+    @staticmethod
+    def fix_children(children: np.ndarray) -> np.ndarray:
+        """
+        Method to fix a 2-D array of children in place, the same way fix_child does for one child:
+        every repeated city after its first occurrence is replaced by the missing cities in ascending order
+        :param children: ndarray of shape (n_children, n_cities)
+        :return: children: ndarray
+        """
+        n_children, n_cities = children.shape
+        # Stable sort keeps the first occurrence of a city in front of its repeats
+        order = np.argsort(children, axis=1, kind='stable')
+        sorted_children = np.take_along_axis(children, order, axis=1)
+        duplicates = np.zeros(children.shape, dtype=bool)
+        np.put_along_axis(duplicates, order[:, 1:], sorted_children[:, 1:] == sorted_children[:, :-1], axis=1)
+
+        present = np.zeros((n_children, n_cities), dtype=bool)
+        present[np.arange(n_children)[:, None], children] = True
+        # Each child has as many missing cities as repeats, so the row-major orders line up
+        children[duplicates] = np.nonzero(~present)[1]
+
+        return children
+
+    @staticmethod
+    def crossover_batch(
+            parents1: np.ndarray,
+            parents2: np.ndarray,
+            crossover_rate: float,
+            num_points: int,
+            rng,
+            instrumentation=NULL_INSTRUMENTATION,
+            out: np.ndarray = None
+    ) -> np.ndarray:
+        """
+        Method to generate children from 2-D arrays of parent pairs by multi-point crossover at once
+        :param parents1: ndarray of shape (n_pairs, n_cities)
+        :param parents2: ndarray of shape (n_pairs, n_cities)
+        :param crossover_rate: float
+        :param num_points: Number of crossover points, or 'ox', 'pmx' or 'erx' for a permutation-preserving operator.
+        :param rng: RandomStream
+        :param instrumentation: Instrumentation timing the repair of the children
+        :param out: ndarray of shape (2 * n_pairs, n_cities) the children are written into
+        :return: children: ndarray of shape (2 * n_pairs, n_cities), first children of every pair then second ones
+        """
+        n_pairs, n_cities = parents1.shape
+        children = out if out is not None else np.empty((2 * n_pairs, n_cities), dtype=parents1.dtype)
+        if isinstance(num_points, str):
+            operator = getattr(Crossover, Crossover.PERMUTATION_OPERATORS[num_points])
+            children[:n_pairs], children[n_pairs:] = parents1, parents2
+            # Pairs that do not perform crossover keep copies of the parents
+            performed = np.tile(rng.random(n_pairs) <= crossover_rate, 2)
+            children[performed] = operator(
+                children[performed], np.concatenate([parents2, parents1])[performed], rng
+            )
+
+            return children
+
+        # Randomly select unique crossover points for each pair
+        crossover_points = np.sort(
+            np.argsort(rng.random((n_pairs, n_cities - 2)), axis=1)[:, :num_points] + 1, axis=1
+        )
+        # A position is swapped when an odd number of crossover points lie at or before it
+        swapped = (np.arange(n_cities) >= crossover_points[:, :, None]).sum(axis=1) % 2 == 1
+        # Pairs that do not perform crossover keep copies of the parents
+        swapped &= (rng.random(n_pairs) <= crossover_rate)[:, None]
+
+        children[:n_pairs], children[n_pairs:] = parents1, parents2
+        np.copyto(children[:n_pairs], parents2, where=swapped)
+        np.copyto(children[n_pairs:], parents1, where=swapped)
+
+        with instrumentation.phase('repair'):
+            return Crossover.fix_children(children)
+
+    @staticmethod
+    def _segments(n_rows: int, n_cities: int, rng) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Method to draw a random non-empty segment [start, end) for each row
+        :param n_rows: int
+        :param n_cities: int
+        :param rng: RandomStream
+        :return: start, end: tuple[ndarray, ndarray]
+        """
+        cuts = np.sort(np.argsort(rng.random((n_rows, n_cities + 1)), axis=1)[:, :2], axis=1)
+        return cuts[:, 0], cuts[:, 1]
+
+    @staticmethod
+    def order_crossover_batch(parents1: np.ndarray, parents2: np.ndarray, rng) -> np.ndarray:
+        """
+        Method to perform order crossover (OX) on every row: a child keeps a random segment of the first parent
+        and fills the other positions, starting after the segment, with the remaining cities in the order they
+        follow the segment in the second parent
+        :param parents1: ndarray of shape (n_rows, n_cities)
+        :param parents2: ndarray of shape (n_rows, n_cities)
+        :param rng: RandomStream
+        :return: children: ndarray of shape (n_rows, n_cities)
+        """
+        n_rows, n_cities = parents1.shape
+        rows = np.arange(n_rows)[:, None]
+        start, end = Crossover._segments(n_rows, n_cities, rng)
+        positions = np.arange(n_cities)
+        in_segment = (positions >= start[:, None]) & (positions < end[:, None])
+        city_in_segment = np.zeros((n_rows, n_cities), dtype=bool)
+        city_in_segment[rows, parents1] = in_segment
+
+        children = np.where(in_segment, parents1, 0)
+        # Walk both the second parent and the free positions cyclically from the end of the segment
+        walk = (end[:, None] + positions) % n_cities
+        parent2_walk = parents2[rows, walk]
+        free = positions < (n_cities - (end - start))[:, None]
+        children[np.broadcast_to(rows, walk.shape)[free], walk[free]] = parent2_walk[
+            ~city_in_segment[rows, parent2_walk]
+        ]
+
+        return children
+
+    @staticmethod
+    def partially_mapped_crossover_batch(parents1: np.ndarray, parents2: np.ndarray, rng) -> np.ndarray:
+        """
+        Method to perform partially mapped crossover (PMX) on every row: a child takes a random segment of the
+        first parent and the rest of the second parent, cities clashing with the segment are mapped through the
+        segment's position-wise pairs until they no longer clash
+        :param parents1: ndarray of shape (n_rows, n_cities)
+        :param parents2: ndarray of shape (n_rows, n_cities)
+        :param rng: RandomStream
+        :return: children: ndarray of shape (n_rows, n_cities)
+        """
+        n_rows, n_cities = parents1.shape
+        rows = np.arange(n_rows)[:, None]
+        start, end = Crossover._segments(n_rows, n_cities, rng)
+        positions = np.arange(n_cities)
+        in_segment = (positions >= start[:, None]) & (positions < end[:, None])
+        city_in_segment = np.zeros((n_rows, n_cities), dtype=bool)
+        city_in_segment[rows, parents1] = in_segment
+        mapping = np.zeros((n_rows, n_cities), dtype=parents1.dtype)
+        mapping[rows, parents1] = parents2
+
+        children = np.where(in_segment, parents1, parents2)
+        clash = ~in_segment & city_in_segment[rows, children]
+        while clash.any():
+            clash_rows = np.broadcast_to(rows, clash.shape)[clash]
+            children[clash] = mapping[clash_rows, children[clash]]
+            clash = ~in_segment & city_in_segment[rows, children]
+
+        return children
+
+    @staticmethod
+    def edge_recombination_batch(parents1: np.ndarray, parents2: np.ndarray, rng) -> np.ndarray:
+        """
+        Method to perform edge recombination crossover (ERX) on every row: starting from the first city of the
+        first parent, a child always moves to the unvisited neighbour (in either parent) with the fewest
+        unvisited neighbours of its own, or to a random unvisited city when there is none
+        :param parents1: ndarray of shape (n_rows, n_cities)
+        :param parents2: ndarray of shape (n_rows, n_cities)
+        :param rng: RandomStream
+        :return: children: ndarray of shape (n_rows, n_cities)
+        """
+        n_rows, n_cities = parents1.shape
+        rows = np.arange(n_rows)
+        # Edge table of both parents, city n_cities is the empty entry
+        empty = n_cities
+        neighbours = np.full((n_rows, n_cities + 1, 4), empty, dtype=parents1.dtype)
+        neighbours[rows[:, None], parents1, 0] = np.roll(parents1, 1, axis=1)
+        neighbours[rows[:, None], parents1, 1] = np.roll(parents1, -1, axis=1)
+        neighbours[rows[:, None], parents2, 2] = np.roll(parents2, 1, axis=1)
+        neighbours[rows[:, None], parents2, 3] = np.roll(parents2, -1, axis=1)
+        # Edges shared by both parents are listed once
+        neighbours[..., 2][(neighbours[..., 2:3] == neighbours[..., :2]).any(axis=-1)] = empty
+        neighbours[..., 3][(neighbours[..., 3:4] == neighbours[..., :3]).any(axis=-1)] = empty
+        degree = (neighbours != empty).sum(axis=-1)
+
+        visited = np.zeros((n_rows, n_cities + 1), dtype=bool)
+        visited[:, empty] = True
+        children = np.empty_like(parents1)
+        current = parents1[:, 0].copy()
+        for step in range(n_cities):
+            children[:, step] = current
+            visited[rows, current] = True
+            if step == n_cities - 1:
+                break
+            current_neighbours = neighbours[rows, current]
+            # The current city leaves the edge lists of its neighbours
+            degree[rows[:, None], current_neighbours] -= current_neighbours != empty
+            candidates = np.where(visited[rows[:, None], current_neighbours], empty, current_neighbours)
+            candidate_degree = np.where(candidates != empty, degree[rows[:, None], candidates], n_cities + 1)
+            current = candidates[rows, np.argmin(candidate_degree, axis=1)]
+
+            stuck = np.flatnonzero(current == empty)
+            if stuck.size:
+                # One draw per city after one for the empty entry, in the order of the 1-based edge table
+                draws = rng.random((stuck.size, n_cities + 1))
+                draws[np.roll(visited[stuck], 1, axis=1)] = -1
+                current[stuck] = np.argmax(draws, axis=1) - 1
+
+        return children
@@ -0,0 +1,170 @@
+import sys
+import math
+from collections import OrderedDict
+import numpy as np
+
+from utils import BLOCK_SIZE, edge_distances, coordinate_distances
+
+"""
+Distance providers: every part of the EA reads distances by indexing a provider like a distance matrix, with a
+pair of cities, a pair of index arrays, a row or a block of rows. A dense ndarray (or memory-mapped .npy cache) is
+the provider of small instances; CoordinateDistances computes the distances of large instances from the city
+coordinates instead, so no n x n matrix is ever stored. The EA reads a provider pair by pair in its hot loop, and
+the edges of good tours mostly join near neighbours, so the provider caches the distances from every city to its
+local search candidates and serves those pairs without computing them.
+"""
+
+
+def _euc_2d(squared: float) -> float:
+    return math.floor(math.sqrt(squared) + 0.5)
+
+
+def _ceil_2d(squared: float) -> float:
+    return math.ceil(math.sqrt(squared))
+
+
+def _att(squared: float) -> float:
+    pseudo = math.sqrt(squared / 10.0)
+    rounded = math.floor(pseudo + 0.5)
+    return rounded + 1 if rounded < pseudo else rounded
+
+
+# Distance of one pair of cities from its squared Euclidean distance, computed with the same floating-point steps as
+# edge_distances; GEO has no entry and goes through edge_distances
+SCALAR_DISTANCES = {'EUC_2D': _euc_2d, 'CEIL_2D': _ceil_2d, 'ATT': _att}
+
+
+class CoordinateDistances:
+    def __init__(self, coords: np.ndarray, edge_weight_type: str, dtype=np.float64, cache_bytes: int = 64 << 20):
+        if edge_weight_type not in SCALAR_DISTANCES and edge_weight_type != 'GEO':
+            raise ValueError(f'Unsupported edge weight type: {edge_weight_type}')
+        self.coords = np.ascontiguousarray(coords, dtype=np.float64)
+        self.edge_weight_type = edge_weight_type
+        self.dtype = np.dtype(dtype)
+        self.shape = (len(self.coords), len(self.coords))
+        # Plain floats make a single distance cheaper than indexing the coordinate array
+        self._xs, self._ys = self.coords[:, 0].tolist(), self.coords[:, 1].tolist()
+        self._scalar_distance = SCALAR_DISTANCES.get(edge_weight_type)
+        # Candidate rows {neighbour: distance} by city, most recently used last, at most cache_bytes of them
+        self.cache_bytes = cache_bytes
+        self.rows = OrderedDict()
+        self.max_rows = 0
+        # Candidate lists and distances the rows are built from, set by the local search
+        self._candidates = None
+        # Single distances served from a candidate row and computed
+        self.row_hits = 0
+        self.row_misses = 0
+
+    def __len__(self) -> int:
+        return len(self.coords)
+
+    def __getstate__(self) -> dict:
+        # Worker processes get the coordinates and build their own row cache from their own local search
+        state = self.__dict__.copy()
+        state['rows'], state['max_rows'], state['_candidates'] = OrderedDict(), 0, None
+        return state
+
+    def __getitem__(self, key):
+        """
+        Method to read distances the way a distance matrix is indexed: [i, j] for one pair, [rows, cols] with
+        index arrays for pairs element by element, [i] for a row and [start:stop] for a block of rows
+        :param key: index
+        :return: distance or ndarray of distances
+        """
+        i, j = key if isinstance(key, tuple) else (key, slice(None))
+        if isinstance(i, (int, np.integer)):
+            if isinstance(j, (int, np.integer)):
+                return self.distance(i, j)
+            return self.row(i)[j]
+        if isinstance(i, slice):
+            return self.block(i)[:, j]
+        return self.pairs(i, j)
+
+    def cache_candidates(self, neighbours: list, neighbour_distances: list) -> None:
+        """
+        Method to fill the row cache with the distances from every city to its local search candidates, as many
+        cities as fit in cache_bytes; a city read later gets its row back and pushes out the least recently used
+        :param neighbours: list of the candidate lists of every city
+        :param neighbour_distances: list of the candidate distances of every city
+        :return: None
+        """
+        self.rows.clear()
+        self._candidates = (neighbours, neighbour_distances)
+        for i in range(len(neighbours)):
+            self._cache_row(i)
+
+    def _cache_row(self, i: int) -> None:
+        neighbours, neighbour_distances = self._candidates
+        row = dict(zip(neighbours[i], map(self.dtype.type, neighbour_distances[i])))
+        if not self.max_rows:
+            # Keys, values and the dict itself
+            row_bytes = sys.getsizeof(row) + sum(map(sys.getsizeof, row)) + sum(map(sys.getsizeof, row.values()))
+            self.max_rows = max(self.cache_bytes // row_bytes, 1)
+        self.rows[i] = row
+        if len(self.rows) > self.max_rows:
+            self.rows.popitem(last=False)
+
+    def distance(self, i: int, j: int):
+        """
+        Method to find the distance between two cities, from the candidate row of either city when it holds the
+        other one
+        :param i: int
+        :param j: int
+        :return: distance
+        """
+        # Every TSPLIB coordinate distance is symmetric
+        for a, b in ((i, j), (j, i)):
+            row = self.rows.get(a)
+            if row is not None and b in row:
+                self.row_hits += 1
+                self.rows.move_to_end(a)
+                return row[b]
+        self.row_misses += 1
+        if self._candidates is not None and i not in self.rows:
+            self._cache_row(i)
+        if self._scalar_distance is None:
+            return self.dtype.type(edge_distances(self.coords[i], self.coords[j], self.edge_weight_type))
+        dx, dy = self._xs[i] - self._xs[j], self._ys[i] - self._ys[j]
+        return self.dtype.type(self._scalar_distance(dx * dx + dy * dy))
+
+    def pairs(self, rows, cols) -> np.ndarray:
+        """
+        Method to find the distances between two broadcastable arrays of cities element by element, computed in
+        blocks so the temporary coordinate arrays stay small
+        :param rows: array_like of ints
+        :param cols: array_like of ints
+        :return: distances: ndarray of the broadcast shape
+        """
+        rows, cols = np.broadcast_arrays(np.asarray(rows), np.asarray(cols))
+        distances = np.empty(rows.shape, dtype=self.dtype)
+        flat_rows, flat_cols, flat_distances = rows.ravel(), cols.ravel(), distances.reshape(-1)
+        for start in range(0, len(flat_distances), BLOCK_SIZE):
+            stop = start + BLOCK_SIZE
+            flat_distances[start:stop] = edge_distances(
+                self.coords[flat_rows[start:stop]], self.coords[flat_cols[start:stop]], self.edge_weight_type
+            )
+        return distances
+
+    def row(self, i: int) -> np.ndarray:
+        """
+        Method to compute the distances from a city to every city
+        :param i: int
+        :return: row: ndarray
+        """
+        i = int(i)
+        return coordinate_distances(self.coords[i:i + 1], self.coords, self.edge_weight_type)[0].astype(self.dtype)
+
+    def block(self, rows: slice) -> np.ndarray:
+        """
+        Method to compute a block of consecutive rows
+        :param rows: slice
+        :return: block: ndarray of shape (n_rows, n_cities)
+        """
+        indices = np.arange(len(self.coords))[rows]
+        block = np.empty((len(indices), len(self.coords)), dtype=self.dtype)
+        block_rows = max(BLOCK_SIZE // len(self.coords), 1)
+        for start in range(0, len(indices), block_rows):
+            block[start:start + block_rows] = coordinate_distances(
+                self.coords[indices[start:start + block_rows]], self.coords, self.edge_weight_type
+            )
+        return block
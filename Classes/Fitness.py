@@ -8,11 +8,19 @@ class Fitness:
     def calc_fitness(self, chromosome: np.ndarray) -> float:
         """
         Method to calculate distance for each individual solution
-        :param chromosome: ndarray
+        :param chromosome: ndarray of 0-based cities
         :return: sum of the distance: int
         """
-        return sum(
-            [
-                self.distance_matrix[chromosome[i], chromosome[i + 1]] for i in range(len(chromosome) - 1)
-            ]
-        ) + self.distance_matrix[chromosome[-1], chromosome[0]]
+        return self.distance_matrix[chromosome[:-1], chromosome[1:]].sum() + self.distance_matrix[
+            chromosome[-1], chromosome[0]
+        ]
+
+    def calc_fitness_batch(self, chromosomes: np.ndarray) -> np.ndarray:
+        """
+        Method to calculate the distance of every solution in a 2-D array of solutions at once
+        by gathering all edges from the distance matrix and summing each row
+        :param chromosomes: ndarray of 0-based cities of shape (n_solutions, n_cities), or with more leading axes
+        :return: distances: ndarray of the leading shape, (n_solutions,) for a 2-D array
+        """
+        chromosomes = np.atleast_2d(chromosomes)
+        return self.distance_matrix[chromosomes, np.roll(chromosomes, -1, axis=-1)].sum(axis=-1)
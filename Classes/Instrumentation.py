@@ -0,0 +1,111 @@
+import time
+from contextlib import nullcontext
+
+
+class _PhaseTimer:
+    def __init__(self, instrumentation, name: str):
+        self.instrumentation = instrumentation
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.instrumentation.add_time(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class Instrumentation:
+    # Phases of the GA loop, crossover time includes the repair of its children
+    PHASES = ('selection', 'crossover', 'repair', 'mutation', 'local_search', 'evaluation', 'replacement')
+    # Counters start at zero so that every trial exports the same columns in the same order
+    COUNTERS = (
+        'evaluations', 'full evaluations', 'delta evaluations', 'population hits', 'memo hits', 'offered', 'accepted',
+        'duplicates rejected'
+    )
+
+    def __init__(self):
+        self.enabled = True
+        self.times = {phase: 0.0 for phase in self.PHASES}
+        self.calls = {phase: 0 for phase in self.PHASES}
+        self.counters = {counter: 0 for counter in self.COUNTERS}
+        self.diversity = []
+
+    def phase(self, name: str) -> _PhaseTimer:
+        """
+        Method to time a phase of the GA loop with a with statement
+        :param name: str
+        :return: timer: context manager
+        """
+        return _PhaseTimer(self, name)
+
+    def add_time(self, name: str, seconds: float) -> None:
+        """
+        Method to add the time of one call of a phase
+        :param name: str
+        :param seconds: float
+        :return: None
+        """
+        self.times[name] = self.times.get(name, 0.0) + seconds
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+    def count(self, name: str, n: int = 1) -> None:
+        """
+        Method to increase a counter
+        :param name: str
+        :param n: int
+        :return: None
+        """
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def sample_diversity(self, diversity: float) -> None:
+        """
+        Method to record a population diversity sample
+        :param diversity: float
+        :return: None
+        """
+        self.diversity.append(diversity)
+
+    def summary(self, execution_time: float) -> dict:
+        """
+        Method to summarise the counters and timers of a trial as one flat row
+        :param execution_time: float, seconds of the GA loop
+        :return: metrics: dict
+        """
+        metrics = {}
+        for phase in self.times:
+            metrics[f'{phase} time'] = self.times[phase]
+            metrics[f'{phase} calls'] = self.calls[phase]
+        metrics.update(self.counters)
+        evaluations = self.counters.get('evaluations', 0)
+        offered = self.counters.get('offered', 0)
+        metrics['evaluations per second'] = evaluations / execution_time if execution_time > 0 else 0.0
+        metrics['acceptance rate'] = self.counters.get('accepted', 0) / offered if offered else 0.0
+        metrics['initial diversity'] = self.diversity[0] if self.diversity else None
+        metrics['final diversity'] = self.diversity[-1] if self.diversity else None
+        return metrics
+
+
+class NullInstrumentation:
+    """
+    Instrumentation that records nothing, the GA loop uses it when instrumentation is switched off
+    """
+    enabled = False
+    _context = nullcontext()
+
+    def phase(self, name: str):
+        return self._context
+
+    def add_time(self, name: str, seconds: float) -> None:
+        pass
+
+    def count(self, name: str, n: int = 1) -> None:
+        pass
+
+    def sample_diversity(self, diversity: float) -> None:
+        pass
+
+
+NULL_INSTRUMENTATION = NullInstrumentation()
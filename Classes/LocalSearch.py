@@ -0,0 +1,205 @@
+import time
+import weakref
+from collections import deque
+import numpy as np
+
+from utils import BLOCK_SIZE
+
+
+class LocalSearch:
+    # Local searches already built, keyed by distance matrix id and number of neighbours
+    _instances = {}
+
+    def __init__(self, distance_matrix, n_neighbours: int = 8):
+        self.distance_matrix = distance_matrix
+        self.n_neighbours = min(n_neighbours, len(distance_matrix) - 1)
+        self.neighbours, self.neighbour_distances = self.nearest_neighbours(distance_matrix, self.n_neighbours)
+        if not isinstance(distance_matrix, np.ndarray):
+            # Most distances the moves read join a city to one of its candidates, a provider keeps them at hand
+            distance_matrix.cache_candidates(self.neighbours, self.neighbour_distances)
+
+    @classmethod
+    def for_matrix(cls, distance_matrix, n_neighbours: int = 8):
+        """
+        Method to get the local search of a distance matrix, building its candidate lists only once per matrix
+        :param distance_matrix: ndarray
+        :param n_neighbours: int
+        :return: local_search: LocalSearch
+        """
+        key = (id(distance_matrix), n_neighbours)
+        if key in cls._instances:
+            matrix_ref, local_search = cls._instances[key]
+            if matrix_ref() is distance_matrix:
+                return local_search
+        local_search = cls(distance_matrix, n_neighbours)
+        cls._instances[key] = (weakref.ref(distance_matrix), local_search)
+        return local_search
+
+    @staticmethod
+    def nearest_neighbours(distance_matrix, n_neighbours: int, block_size: int = None) -> tuple[list, list]:
+        """
+        Method to build the candidate list of every city: its n_neighbours nearest cities sorted by distance
+        :param distance_matrix: ndarray
+        :param n_neighbours: int
+        :param block_size: int, rows handled at once, defaults to rows of BLOCK_SIZE distances in total
+        :return: neighbours, neighbour_distances: tuple[list, list]
+        """
+        n_cities = len(distance_matrix)
+        block_size = block_size or max(BLOCK_SIZE // n_cities, 1)
+        neighbours = np.empty((n_cities, n_neighbours), dtype=np.int64)
+        for start in range(0, n_cities, block_size):
+            block = np.array(distance_matrix[start:start + block_size], dtype=np.float64)
+            rows = np.arange(len(block))
+            # A city is never its own neighbour
+            block[rows, rows + start] = np.inf
+            nearest = np.argpartition(block, n_neighbours - 1, axis=1)[:, :n_neighbours]
+            order = np.argsort(block[rows[:, None], nearest], axis=1)
+            neighbours[start:start + block_size] = np.take_along_axis(nearest, order, axis=1)
+        neighbour_distances = np.asarray(distance_matrix[np.arange(n_cities)[:, None], neighbours], dtype=np.float64)
+        return neighbours.tolist(), neighbour_distances.tolist()
+
+    def improve(self, tour: np.ndarray, score: float, max_steps: int = None, time_budget: float = None) -> float:
+        """
+        Method to improve a tour in place with 2-opt and or-opt moves restricted to the candidate lists.
+        Cities whose neighbourhood gave no improving move get their don't-look bit set and are only checked
+        again once a move changes one of their edges.
+        :param tour: ndarray of 0-based cities
+        :param score: float, the tour's distance
+        :param max_steps: int, maximum number of improving moves
+        :param time_budget: float, maximum seconds spent on the tour
+        :return: score: float
+        """
+        deadline = time.perf_counter() + time_budget if time_budget else None
+        self.tour = tour.tolist()
+        self.position = [0] * len(self.tour)
+        for index, city in enumerate(self.tour):
+            self.position[city] = index
+
+        # Cities with their don't-look bit off
+        queue = deque(self.tour)
+        queued = [True] * len(self.tour)
+        steps = 0
+        while queue:
+            if max_steps is not None and steps >= max_steps:
+                break
+            if deadline is not None and time.perf_counter() > deadline:
+                break
+            city = queue.popleft()
+            queued[city] = False
+            move = self._two_opt(city) or self._or_opt(city)
+            if move is None:
+                continue
+            delta, touched = move
+            score += delta
+            steps += 1
+            for touched_city in touched:
+                if not queued[touched_city]:
+                    queued[touched_city] = True
+                    queue.append(touched_city)
+
+        tour[:] = self.tour
+        return score
+
+    def _succ(self, city: int) -> int:
+        return self.tour[(self.position[city] + 1) % len(self.tour)]
+
+    def _pred(self, city: int) -> int:
+        return self.tour[self.position[city] - 1]
+
+    def _reverse(self, first: int, last: int) -> None:
+        """
+        Method to reverse the path of the tour running forward from city first to city last. The shorter of the
+        path and its complement is reversed, both give the same cycle.
+        :param first: int
+        :param last: int
+        :return: None
+        """
+        n_cities = len(self.tour)
+        i, j = self.position[first], self.position[last]
+        length = (j - i) % n_cities + 1
+        if 2 * length > n_cities:
+            i, j = (j + 1) % n_cities, (i - 1) % n_cities
+            length = n_cities - length
+        for _ in range(length // 2):
+            city_i, city_j = self.tour[i], self.tour[j]
+            self.tour[i], self.tour[j] = city_j, city_i
+            self.position[city_j], self.position[city_i] = i, j
+            i, j = (i + 1) % n_cities, (j - 1) % n_cities
+
+    def _two_opt(self, a: int):
+        """
+        Method to find and apply the first improving 2-opt move that adds an edge from city a to one of its
+        candidates, looking at the edges to both its successor and its predecessor
+        :param a: int
+        :return: (delta, touched cities) or None
+        """
+        distance_matrix = self.distance_matrix
+        for forward in (True, False):
+            b = self._succ(a) if forward else self._pred(a)
+            d_ab = distance_matrix[a, b]
+            for c, d_ac in zip(self.neighbours[a], self.neighbour_distances[a]):
+                # Candidates are sorted, so no later one can shorten the new edge enough
+                if d_ac >= d_ab:
+                    break
+                d = self._succ(c) if forward else self._pred(c)
+                if c == b or d == a:
+                    continue
+                delta = d_ac + distance_matrix[b, d] - d_ab - distance_matrix[c, d]
+                if delta < -1e-9:
+                    if forward:
+                        self._reverse(b, c)
+                    else:
+                        self._reverse(c, b)
+                    return delta, (a, b, c, d)
+        return None
+
+    def _or_opt(self, a: int):
+        """
+        Method to find and apply the first improving or-opt move that takes the segment of 1 to 3 cities starting
+        at city a out of the tour and puts it back, in either direction, next to one of a's candidates
+        :param a: int
+        :return: (delta, touched cities) or None
+        """
+        distance_matrix = self.distance_matrix
+        n_cities = len(self.tour)
+        for seg_len in range(1, min(3, n_cities - 3) + 1):
+            start = self.position[a]
+            segment = [self.tour[(start + k) % n_cities] for k in range(seg_len)]
+            last = segment[-1]
+            p, nx = self._pred(a), self._succ(last)
+            removal_gain = distance_matrix[p, a] + distance_matrix[last, nx] - distance_matrix[p, nx]
+            for c, d_ac in zip(self.neighbours[a], self.neighbour_distances[a]):
+                if d_ac >= removal_gain:
+                    break
+                if c in segment:
+                    continue
+                # Put a next to c, after c keeping the segment's direction or before c reversing it
+                for e, reverse in ((self._succ(c), False), (self._pred(c), True)):
+                    if e in segment:
+                        continue
+                    delta = d_ac + distance_matrix[last, e] - distance_matrix[c, e] - removal_gain
+                    if delta < -1e-9:
+                        self._move_segment(segment, c, reverse)
+                        return delta, (p, nx, c, e, a, last)
+        return None
+
+    def _move_segment(self, segment: list, c: int, reverse: bool) -> None:
+        """
+        Method to move a segment so that its first city is next to city c, after c in the segment's direction
+        or before c in the reversed direction
+        :param segment: list
+        :param c: int
+        :param reverse: bool
+        :return: None
+        """
+        n_cities = len(self.tour)
+        # The rest of the tour, starting right after the segment
+        after = (self.position[segment[-1]] + 1) % n_cities
+        rest = [self.tour[(after + k) % n_cities] for k in range(n_cities - len(segment))]
+        insert_at = rest.index(c)
+        if reverse:
+            self.tour = rest[:insert_at] + segment[::-1] + rest[insert_at:]
+        else:
+            self.tour = rest[:insert_at + 1] + segment + rest[insert_at + 1:]
+        for index, city in enumerate(self.tour):
+            self.position[city] = index
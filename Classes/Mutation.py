@@ -1,26 +1,184 @@
 import numpy as np
 
+from Classes.RandomStream import RandomStream
+
 
 class Mutation:
-    def __init__(self, child1, child2, mutation_rate):
+    def __init__(self, child1, child2, mutation_rate, rng=None):
         self.child1 = child1
         self.child2 = child2
         self.mutation_rate = mutation_rate
+        self.rng = rng if rng is not None else RandomStream()
 
     def swap_mutation(self, num_swaps):
         """
         Performs swap mutation
         :return: child1, child2: tuple[ndarray, ndarray]
         """
+        rng = self.rng
+
         def multi_swap(arr, num_swaps):
             for _ in range(num_swaps):
-                idx1, idx2 = np.random.choice(len(arr), size=2, replace=False)
+                idx1, idx2 = rng.pair(len(arr))
                 arr[idx1], arr[idx2] = arr[idx2], arr[idx1]
 
-        rng = np.random.default_rng()
         if rng.random() < self.mutation_rate:
             multi_swap(self.child1, num_swaps)
         if rng.random() < self.mutation_rate:
             multi_swap(self.child2, num_swaps)
 
-        return self.child1, self.child2
\ No newline at end of file
+        return self.child1, self.child2
+
+    @staticmethod
+    def edges_cost(tour: np.ndarray, positions, distance_matrix: np.ndarray) -> float:
+        """
+        Method to sum the length of the tour edges that start at the given positions
+        :param tour: ndarray
+        :param positions: list of edge start positions
+        :param distance_matrix: ndarray
+        :return: cost: float
+        """
+        positions = np.asarray(positions)
+        return distance_matrix[tour[positions], tour[(positions + 1) % len(tour)]].sum()
+
+    @staticmethod
+    def swap_move(tour: np.ndarray, i: int, j: int, distance_matrix: np.ndarray) -> float:
+        """
+        Method to swap the cities at positions i and j in place. Only the (up to) four edges touching both
+        positions change, so the change in tour length is found from those edges alone.
+        :param tour: ndarray
+        :param i: int
+        :param j: int
+        :param distance_matrix: ndarray
+        :return: delta: float
+        """
+        n_cities = len(tour)
+        positions = list({(i - 1) % n_cities, i, (j - 1) % n_cities, j})
+        before = Mutation.edges_cost(tour, positions, distance_matrix)
+        tour[i], tour[j] = tour[j], tour[i]
+        return Mutation.edges_cost(tour, positions, distance_matrix) - before
+
+    @staticmethod
+    def two_opt_move(tour: np.ndarray, i: int, j: int, distance_matrix: np.ndarray) -> float:
+        """
+        Method to reverse the segment tour[i:j + 1] in place (i < j), which replaces the two edges around the
+        segment. Assumes a symmetric distance matrix so the reversed inner edges keep their length.
+        :param tour: ndarray
+        :param i: int
+        :param j: int
+        :param distance_matrix: ndarray
+        :return: delta: float
+        """
+        n_cities = len(tour)
+        if i == 0 and j == n_cities - 1:
+            # Reversing the whole tour gives the same cycle
+            tour[:] = tour[::-1]
+            return 0
+        a, b = tour[i - 1], tour[i]
+        c, d = tour[j], tour[(j + 1) % n_cities]
+        tour[i:j + 1] = tour[i:j + 1][::-1]
+        return distance_matrix[a, c] + distance_matrix[b, d] - distance_matrix[a, b] - distance_matrix[c, d]
+
+    @staticmethod
+    def or_opt_move(tour: np.ndarray, i: int, seg_len: int, k: int, distance_matrix: np.ndarray) -> float:
+        """
+        Method to move the segment tour[i:i + seg_len] in place so it follows the k-th city of the remaining tour.
+        The three edges around the old and new place of the segment are replaced.
+        :param tour: ndarray
+        :param i: int
+        :param seg_len: int
+        :param k: int
+        :param distance_matrix: ndarray
+        :return: delta: float
+        """
+        n_cities = len(tour)
+        prev_city, first, last = tour[i - 1], tour[i], tour[i + seg_len - 1]
+        next_city = tour[(i + seg_len) % n_cities]
+        n_rest = n_cities - seg_len
+        # k-th city of the tour without the segment and the city after it
+        k_next = (k + 1) % n_rest
+        a = tour[k if k < i else k + seg_len]
+        b = tour[k_next if k_next < i else k_next + seg_len]
+        segment = tour[i:i + seg_len].copy()
+        # Shift the cities between the old and the new place of the segment over it, then put the segment back
+        if k < i:
+            tour[k + 1 + seg_len:i + seg_len] = tour[k + 1:i]
+        else:
+            tour[i:k + 1] = tour[i + seg_len:k + 1 + seg_len]
+        tour[k + 1:k + 1 + seg_len] = segment
+        return (distance_matrix[prev_city, next_city] - distance_matrix[prev_city, first]
+                - distance_matrix[last, next_city] + distance_matrix[a, first]
+                + distance_matrix[last, b] - distance_matrix[a, b])
+
+    @staticmethod
+    def random_move(tour: np.ndarray, operator: str, distance_matrix: np.ndarray, rng) -> float:
+        """
+        Method to apply one random move of the given operator in place
+        :param tour: ndarray
+        :param operator: 'swap', 'two_opt' or 'or_opt'
+        :param distance_matrix: ndarray
+        :param rng: RandomStream
+        :return: delta: float
+        """
+        n_cities = len(tour)
+        if operator == 'swap':
+            i, j = rng.pair(n_cities)
+            return Mutation.swap_move(tour, i, j, distance_matrix)
+        if operator == 'two_opt':
+            i, j = sorted(rng.pair(n_cities))
+            return Mutation.two_opt_move(tour, i, j, distance_matrix)
+        if operator == 'or_opt':
+            seg_len = rng.integers(1, min(3, n_cities - 2) + 1)
+            i = rng.integers(n_cities - seg_len + 1)
+            n_rest = n_cities - seg_len
+            # Skip the insertion point right after the segment's old predecessor, which would not move it
+            k = (i + rng.integers(n_rest - 1)) % n_rest
+            return Mutation.or_opt_move(tour, i, seg_len, k, distance_matrix)
+        raise ValueError(f'Unknown mutation operator: {operator}')
+
+    def delta_mutation(
+            self,
+            num_moves: int,
+            distance_matrix: np.ndarray,
+            operator: str = 'swap',
+            rng=None
+    ) -> tuple[np.ndarray, np.ndarray, float, float]:
+        """
+        Performs swap, 2-opt or or-opt mutation and reports the change in tour length of each child, so a child's
+        score follows from its parent's known score without re-evaluating the tour
+        :param num_moves: int
+        :param distance_matrix: ndarray
+        :param operator: 'swap', 'two_opt' or 'or_opt'
+        :param rng: RandomStream, defaults to the stream of this mutation
+        :return: child1, child2, delta1, delta2: tuple[ndarray, ndarray, float, float]
+        """
+        rng = rng if rng is not None else self.rng
+        deltas = []
+        for child in (self.child1, self.child2):
+            delta = 0
+            if rng.random() < self.mutation_rate:
+                for _ in range(num_moves):
+                    delta += self.random_move(child, operator, distance_matrix, rng)
+            deltas.append(delta)
+
+        return self.child1, self.child2, deltas[0], deltas[1]
+
+    @staticmethod
+    def swap_mutation_batch(children: np.ndarray, mutation_rate: float, num_swaps: int, rng) -> np.ndarray:
+        """
+        Performs swap mutation in place on every row of a 2-D array of children
+        :param children: ndarray of shape (n_children, n_cities)
+        :param mutation_rate: float
+        :param num_swaps: int
+        :param rng: RandomStream
+        :return: children: ndarray
+        """
+        n_children, n_cities = children.shape
+        rows = np.flatnonzero(rng.random(n_children) < mutation_rate)
+        for _ in range(num_swaps):
+            idx1 = rng.integers(n_cities, size=len(rows))
+            # Offset the second index so the two swapped positions always differ
+            idx2 = (idx1 + rng.integers(1, n_cities, size=len(rows))) % n_cities
+            children[rows, idx1], children[rows, idx2] = children[rows, idx2], children[rows, idx1]
+
+        return children
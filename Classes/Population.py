@@ -1,17 +1,200 @@
+import heapq
+import hashlib
 import numpy as np
 
+from utils import tour_dtype
 from Classes.Fitness import Fitness
 
 
 class Population(Fitness):
-    def __init__(self, population: np.ndarray, distance_matrix):
+    def __init__(
+            self,
+            population: np.ndarray,
+            distance_matrix,
+            n_offspring: int = 2,
+            unique: bool = False,
+            memo_size: int = 0
+    ):
         super().__init__(distance_matrix)
-        self.population = population
+        n_pop, n_cities = np.shape(population)
+        # One contiguous buffer of 0-based tours in the smallest dtype, the rows after the population are
+        # scratch rows that operators write offspring into, so the loop allocates no new tours
+        self.buffer = np.empty((n_pop + n_offspring, n_cities), dtype=tour_dtype(n_cities))
+        self.buffer[:n_pop] = population
+        self.population = self.buffer[:n_pop]
+        self.offspring = self.buffer[n_pop:]
         self.parents = []
+        self.scores = np.zeros(len(population))
         self.best_score = 0
         self.best_sol = None
+        self.best_ind = None
         self.worst_score = 0
         self.worst_sol = None
+        self.worst_ind = None
+        # Lazy min/max heaps of (score, slot, version) entries, entries are stale once the slot version moves on
+        self._versions = [0] * len(population)
+        self._min_heap = []
+        self._max_heap = []
+        # Canonical key of every slot and the slots holding each key
+        self._keys = [None] * len(population)
+        self._slots = {}
+        # Reject offspring whose cycle is already in the population
+        self.unique = unique
+        self.rejected = 0
+        # Scores of the last memo_size tours seen, keyed by canonical key
+        self.memo_size = memo_size
+        self.memo = {}
+        self.memo_hits = 0
+        # Children whose cycle was found in the population, so their score was copied from it
+        self.population_hits = 0
+        # Tours are only hashed when duplicate rejection or the memo reads the keys
+        self.keyed = unique or memo_size > 0
+
+    @staticmethod
+    def canonical_key(tour: np.ndarray) -> bytes:
+        """
+        Method to hash the cycle of a tour: the tour is rotated to start at city 0 and read in the direction of
+        its smaller neighbour, so every rotation and direction of the same cycle gets the same key. The cities are
+        hashed in the population's dtype, so the key does not depend on the dtype of the tour.
+        :param tour: ndarray
+        :return: key: bytes
+        """
+        rotated = np.roll(tour, -int(np.argmin(tour))).astype(tour_dtype(len(tour)), copy=False)
+        if rotated[1] > rotated[-1]:
+            rotated[1:] = rotated[1:][::-1]
+        return hashlib.blake2b(rotated.tobytes(), digest_size=16).digest()
+
+    @staticmethod
+    def canonical_keys(tours: np.ndarray) -> list:
+        """
+        Method to hash the cycles of a 2-D array of tours the same way canonical_key does
+        :param tours: ndarray of shape (n_tours, n_cities)
+        :return: keys: list of bytes
+        """
+        n_cities = tours.shape[1]
+        starts = np.argmin(tours, axis=1)
+        rotated = np.take_along_axis(
+            tours, (starts[:, None] + np.arange(n_cities)) % n_cities, axis=1
+        ).astype(tour_dtype(n_cities), copy=False)
+        flip = rotated[:, 1] > rotated[:, -1]
+        rotated[flip, 1:] = rotated[flip, :0:-1]
+        return [hashlib.blake2b(row.tobytes(), digest_size=16).digest() for row in rotated]
+
+    def find(self, tour: np.ndarray, key: bytes = None):
+        """
+        Method to find a slot holding the same cycle as a tour
+        :param tour: ndarray
+        :param key: bytes, the tour's canonical key when it is already known
+        :return: slot: int or None
+        """
+        key = key if key is not None else self.canonical_key(tour)
+        if not self.keyed:
+            # The population is not indexed, so its keys are found on demand
+            return next((slot for slot, other in enumerate(self.canonical_keys(self.population)) if other == key), None)
+        slots = self._slots.get(key)
+        return next(iter(slots)) if slots else None
+
+    def key(self, tour: np.ndarray):
+        """
+        Method to find the canonical key of a tour if the population reads keys
+        :param tour: ndarray
+        :return: key: bytes or None
+        """
+        return self.canonical_key(tour) if self.keyed else None
+
+    def keys(self, tours: np.ndarray):
+        """
+        Method to find the canonical keys of a 2-D array of tours if the population reads keys
+        :param tours: ndarray of shape (n_tours, n_cities)
+        :return: keys: list of bytes or None
+        """
+        return self.canonical_keys(tours) if self.keyed else None
+
+    def __contains__(self, tour: np.ndarray) -> bool:
+        return self.find(tour) is not None
+
+    def _index_slot(self, slot: int, key: bytes) -> None:
+        """
+        Method to move a slot from the key of its old tour to the key of its new one
+        :param slot: int
+        :param key: bytes
+        :return: None
+        """
+        old_key = self._keys[slot]
+        if old_key is not None:
+            old_slots = self._slots[old_key]
+            old_slots.discard(slot)
+            if not old_slots:
+                del self._slots[old_key]
+        self._keys[slot] = key
+        self._slots.setdefault(key, set()).add(slot)
+
+    def _remember(self, key: bytes, score: float) -> None:
+        """
+        Method to store the score of a tour in the memo, dropping the oldest entry once it is full
+        :param key: bytes
+        :param score: float
+        :return: None
+        """
+        if self.memo_size:
+            self.memo[key] = score
+            if len(self.memo) > self.memo_size:
+                del self.memo[next(iter(self.memo))]
+
+    def _known_score(self, key: bytes):
+        """
+        Method to look up the score of a tour in the population and the memo
+        :param key: bytes
+        :return: score: float or None
+        """
+        slots = self._slots.get(key)
+        if slots:
+            self.population_hits += 1
+            return self.scores[next(iter(slots))]
+        if key in self.memo:
+            self.memo_hits += 1
+            return self.memo[key]
+        return None
+
+    def score(self, tour: np.ndarray, key: bytes = None) -> float:
+        """
+        Method to find the distance of a tour, tours already in the population or the memo are not evaluated again
+        :param tour: ndarray
+        :param key: bytes, the tour's canonical key when it is already known
+        :return: score: float
+        """
+        if not self.keyed:
+            return self.calc_fitness(tour)
+        key = key if key is not None else self.canonical_key(tour)
+        score = self._known_score(key)
+        if score is None:
+            score = self.calc_fitness(tour)
+            self._remember(key, score)
+        return score
+
+    def score_batch(self, tours: np.ndarray, keys: list = None) -> np.ndarray:
+        """
+        Method to find the distances of a 2-D array of tours, only unknown tours are evaluated, as one batch
+        :param tours: ndarray of shape (n_tours, n_cities)
+        :param keys: list of the tours' canonical keys when they are already known
+        :return: scores: ndarray of shape (n_tours,)
+        """
+        if not self.keyed:
+            return self.calc_fitness_batch(tours)
+        keys = keys if keys is not None else self.canonical_keys(tours)
+        scores = np.empty(len(tours))
+        unknown = []
+        for k, key in enumerate(keys):
+            score = self._known_score(key)
+            if score is None:
+                unknown.append(k)
+            else:
+                scores[k] = score
+        if unknown:
+            scores[unknown] = self.calc_fitness_batch(tours[unknown])
+            for k in unknown:
+                self._remember(keys[k], scores[k])
+        return scores
 
     def evaluate(self):
         """
@@ -19,26 +202,198 @@ class Population(Fitness):
         :return: None
         """
         # calculate the distance of each solution in population
-        distances = np.array(
-            [self.calc_fitness(chromosome - 1) for chromosome in self.population]
-        )
+        self.scores = self.calc_fitness_batch(self.population)
+        self._rebuild()
+        if self.keyed:
+            for slot, key in enumerate(self._keys):
+                self._remember(key, self.scores[slot])
+
+    def get_state(self) -> dict:
+        """
+        Method to capture the solutions, scores and memo of the population for a checkpoint
+        :return: state: dict of arrays
+        """
+        return {
+            'population': self.population.copy(),
+            'scores': self.scores.copy(),
+            # Memo keys in insertion order, so the oldest entry is still dropped first after a resume
+            'memo_keys': np.frombuffer(b''.join(self.memo), dtype=np.uint8).reshape(-1, 16),
+            'memo_scores': np.array(list(self.memo.values())),
+            'counters': np.array([self.memo_hits, self.rejected, self.population_hits])
+        }
+
+    def set_state(self, state: dict) -> None:
+        """
+        Method to put back a state captured by get_state without evaluating the solutions again
+        :param state: dict of arrays
+        :return: None
+        """
+        self.population[:] = state['population']
+        self.scores = np.array(state['scores'])
+        self._rebuild()
+        self.memo = {key.tobytes(): score for key, score in zip(state['memo_keys'], state['memo_scores'].tolist())}
+        self.memo_hits, self.rejected, self.population_hits = (int(counter) for counter in state['counters'])
+
+    def _rebuild(self):
+        """
+        Method to rebuild the heaps and the key index from the population and its scores
+        :return: None
+        """
+        self._versions = [0] * len(self.population)
+        self._min_heap = [(score, slot, 0) for slot, score in enumerate(self.scores.tolist())]
+        self._max_heap = [(-score, slot, 0) for slot, score in enumerate(self.scores.tolist())]
+        heapq.heapify(self._min_heap)
+        heapq.heapify(self._max_heap)
+        self._keys = [None] * len(self.population)
+        self._slots = {}
+        if self.keyed:
+            for slot, key in enumerate(self.canonical_keys(self.population)):
+                self._index_slot(slot, key)
         # determine the best and worst solution
-        self.best_score = np.min(distances)
-        self.best_sol = self.population[distances.tolist().index(self.best_score)]
-        self.worst_score = np.max(distances)
-        self.worst_sol = self.population[distances.tolist().index(self.worst_score)]
+        self._update_extremes()
+
+    def _peek(self, heap) -> int:
+        """
+        Method to drop stale entries from the top of a heap and return the slot of the valid top entry
+        :param heap: list
+        :return: slot: int
+        """
+        while heap[0][2] != self._versions[heap[0][1]]:
+            heapq.heappop(heap)
+        return heap[0][1]
 
-    def replacement(self, child):
+    def _update_extremes(self):
+        """
+        Method to refresh the best and worst solution from the heaps
+        :return: None
+        """
+        best_ind = self._peek(self._min_heap)
+        worst_ind = self._peek(self._max_heap)
+        self.best_ind, self.worst_ind = best_ind, worst_ind
+        self.best_score = self.scores[best_ind]
+        self.best_sol = self.population[best_ind]
+        self.worst_score = self.scores[worst_ind]
+        self.worst_sol = self.population[worst_ind]
+
+    def _compact_heaps(self):
+        """
+        Method to rebuild the heaps from the score array once stale entries dominate them
+        :return: None
+        """
+        versions = self._versions
+        scores = self.scores.tolist()
+        self._min_heap = [(scores[slot], slot, versions[slot]) for slot in range(len(scores))]
+        self._max_heap = [(-scores[slot], slot, versions[slot]) for slot in range(len(scores))]
+        heapq.heapify(self._min_heap)
+        heapq.heapify(self._max_heap)
+
+    def replace_slot(self, slot: int, chromosome: np.ndarray, score: float, key: bytes = None):
+        """
+        Method to put a solution with a known score into a slot of the population, only that slot is re-scored
+        :param slot: int
+        :param chromosome: ndarray
+        :param score: float
+        :param key: bytes, the solution's canonical key when it is already known
+        :return: None
+        """
+        if self.keyed:
+            self._index_slot(slot, key if key is not None else self.canonical_key(chromosome))
+        self.population[slot] = chromosome
+        self.scores[slot] = score
+        self._versions[slot] += 1
+        version = self._versions[slot]
+        heapq.heappush(self._min_heap, (float(score), slot, version))
+        heapq.heappush(self._max_heap, (-float(score), slot, version))
+        if len(self._min_heap) > 4 * len(self.population):
+            self._compact_heaps()
+        self._update_extremes()
+
+    def replacement(self, child, child_score=None, key: bytes = None):
         """
         Method to replace the solution in the population with child if child's distance is smaller or equal
         :param child: ndarray
-        :return: None
+        :param child_score: float, the child's distance when it is already known
+        :param key: bytes, the child's canonical key when it is already known
+        :return: accepted: bool
         """
+        key = key if key is not None else self.key(child)
+        if self.unique and key in self._slots:
+            self.rejected += 1
+            return False
         # calculate the distance of the child
-        child_score = self.calc_fitness(child - 1)
-        # replace the solution in the population with child if child's distance is smaller or equal
+        if child_score is None:
+            child_score = self.score(child, key)
+        # replace the worst solution in the population with child if child's distance is smaller or equal,
+        # the heaps keep the best and worst solution up to date without re-evaluating the population
         if child_score <= self.worst_score:
-            worst_sol_ind = np.where(np.all(self.population == self.worst_sol, axis=1))[0][0]
-            self.population[worst_sol_ind] = child
-        # re-evaluate the population to make sure we get a new worst solution
+            self.replace_slot(self.worst_ind, child, child_score, key)
+            return True
+        return False
+
+    def replace_batch(self, children: np.ndarray, children_scores: np.ndarray = None, keys: list = None) -> int:
+        """
+        Method to merge a 2-D array of children into the population in one pass. The best children replace the
+        worst solutions while the child's distance is smaller or equal, which keeps the best N of both.
+        :param children: ndarray
+        :param children_scores: ndarray, the children's distances when they are already known
+        :param keys: list of the children's canonical keys when they are already known
+        :return: accepted: int, number of children that entered the population
+        """
+        keys = keys if keys is not None else self.keys(children)
+        if children_scores is None:
+            children_scores = self.score_batch(children, keys)
+        if self.unique:
+            # Children already in the population or repeating an earlier child never get in
+            seen = set(self._slots)
+            duplicates = []
+            for k, key in enumerate(keys):
+                if key in seen:
+                    duplicates.append(k)
+                seen.add(key)
+            if duplicates:
+                self.rejected += len(duplicates)
+                children_scores = children_scores.copy()
+                children_scores[duplicates] = np.inf
+        n_replace = min(len(children), len(self.population))
+        best_children = np.argsort(children_scores, kind='stable')[:n_replace]
+        worst_slots = np.argsort(-self.scores, kind='stable')[:n_replace]
+        accepted = children_scores[best_children] <= self.scores[worst_slots]
+        slots = worst_slots[accepted]
+
+        self.population[slots] = children[best_children[accepted]]
+        self.scores[slots] = children_scores[best_children[accepted]]
+        for slot, child in zip(slots.tolist(), best_children[accepted].tolist()):
+            self._versions[slot] += 1
+            if self.keyed:
+                self._index_slot(slot, keys[child])
+        self._compact_heaps()
+        self._update_extremes()
+        return len(slots)
+
+    def restart(self, n_elite: int, rng) -> None:
+        """
+        Method to restart the population from random routes, keeping its n_elite best solutions
+        :param n_elite: int, at least 1 so the best solution found so far is never lost
+        :param rng: RandomStream
+        :return: None
+        """
+        if n_elite < 1:
+            raise ValueError('A restart keeps at least the best solution')
+        n_pop, n_cities = self.population.shape
+        fresh = np.sort(np.argsort(self.scores, kind='stable')[n_elite:])
+        self.population[fresh] = rng.permuted(np.broadcast_to(np.arange(n_cities), (len(fresh), n_cities)), axis=1)
         self.evaluate()
+
+    def diversity(self) -> float:
+        """
+        Method to measure the diversity of the population as the mean share of the best solution's edges
+        that a solution does not use, in either direction. 0 means every solution has the best one's edges.
+        :return: diversity: float
+        """
+        population = self.population
+        # Successor of every city in the best solution
+        best_successor = np.empty(population.shape[1], dtype=population.dtype)
+        best_successor[population[self.best_ind]] = np.roll(population[self.best_ind], -1)
+        successors = np.roll(population, -1, axis=1)
+        shared = (best_successor[population] == successors) | (best_successor[successors] == population)
+        return float(1 - shared.mean())
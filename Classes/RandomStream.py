@@ -0,0 +1,131 @@
+import numpy as np
+
+
+class RandomStream:
+    def __init__(self, seed=None, block_size: int = 4096):
+        self.generator = np.random.default_rng(seed)
+        self.block_size = block_size
+        # Uniform numbers drawn ahead as one block, scalar draws are served from it
+        self.block = []
+        self.index = 0
+
+    def _next_uniform(self) -> float:
+        """
+        Method to take the next uniform number in [0, 1) from the pre-drawn block, drawing a new block when empty
+        :return: uniform: float
+        """
+        if self.index == len(self.block):
+            self.block = self.generator.random(self.block_size).tolist()
+            self.index = 0
+        uniform = self.block[self.index]
+        self.index += 1
+        return uniform
+
+    def random(self, size=None):
+        """
+        Method to draw uniform numbers in [0, 1), a scalar comes from the pre-drawn block
+        :param size: int or tuple, None for a scalar
+        :return: float or ndarray
+        """
+        if size is None:
+            return self._next_uniform()
+        return self.generator.random(size)
+
+    def integers(self, low, high=None, size=None):
+        """
+        Method to draw integers in [low, high) like Generator.integers, a scalar comes from the pre-drawn block
+        :param low: int or array_like
+        :param high: int or array_like
+        :param size: int or tuple, None for a scalar
+        :return: int or ndarray
+        """
+        if size is None and np.isscalar(low) and (high is None or np.isscalar(high)):
+            if high is None:
+                low, high = 0, low
+            return int(low) + int(self._next_uniform() * (int(high) - int(low)))
+        return self.generator.integers(low, high, size)
+
+    def pair(self, n: int) -> tuple[int, int]:
+        """
+        Method to draw two different integers in [0, n)
+        :param n: int
+        :return: i, j: tuple[int, int]
+        """
+        i = self.integers(n)
+        return i, (i + self.integers(1, n)) % n
+
+    def permuted(self, x: np.ndarray, axis=None, out: np.ndarray = None) -> np.ndarray:
+        """
+        Method to shuffle an array independently along an axis, see Generator.permuted
+        :param x: ndarray
+        :param axis: int
+        :param out: ndarray the shuffled array is written into, x itself to shuffle in place
+        :return: ndarray
+        """
+        return self.generator.permuted(x, axis=axis, out=out)
+
+    def permutation(self, x) -> np.ndarray:
+        """
+        Method to draw a random permutation of range(x), or of an array, see Generator.permutation
+        :param x: int or ndarray
+        :return: ndarray
+        """
+        return self.generator.permutation(x)
+
+    def get_state(self) -> dict:
+        """
+        Method to capture the state of the stream: the bit generator state and the unused part of the block
+        :return: state: dict
+        """
+        return {'bit_generator': self.generator.bit_generator.state, 'block': list(self.block), 'index': self.index}
+
+    def set_state(self, state: dict) -> None:
+        """
+        Method to put the stream back in a state captured by get_state
+        :param state: dict
+        :return: None
+        """
+        self.generator.bit_generator.state = state['bit_generator']
+        self.block = list(state['block'])
+        self.index = state['index']
+
+
+class StackedRandomStream:
+    def __init__(self, seeds, block_size: int = 4096):
+        # One generator per stacked trial, so a trial draws the same numbers whatever it is stacked with
+        self.generators = [np.random.default_rng(seed) for seed in seeds]
+        self.block_size = block_size
+        # Uniform numbers drawn ahead, one row per trial
+        self.block = np.empty((len(self.generators), 0))
+        self.index = 0
+
+    def __len__(self) -> int:
+        return len(self.generators)
+
+    def random(self, size) -> np.ndarray:
+        """
+        Method to draw uniform numbers in [0, 1) for every trial, each from its own generator
+        :param size: int or tuple, shape drawn per trial
+        :return: ndarray of shape (n_trials, *size)
+        """
+        shape = (size,) if np.isscalar(size) else tuple(size)
+        count = int(np.prod(shape))
+        if self.index + count > self.block.shape[1]:
+            # A generator returns the same numbers however its draws are split into blocks
+            draw = max(self.block_size, count)
+            self.block = np.concatenate([
+                self.block[:, self.index:], np.stack([generator.random(draw) for generator in self.generators])
+            ], axis=1)
+            self.index = 0
+        uniforms = self.block[:, self.index:self.index + count]
+        self.index += count
+        return uniforms.reshape((len(self.generators),) + shape)
+
+    def integers(self, high, size) -> np.ndarray:
+        """
+        Method to draw integers in [0, high) for every trial
+        :param high: int or array_like broadcastable to size
+        :param size: int or tuple, shape drawn per trial
+        :return: ndarray of shape (n_trials, *size)
+        """
+        return (self.random(size) * high).astype(np.int64)
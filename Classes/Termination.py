@@ -0,0 +1,223 @@
+import time
+
+
+class StoppingCriterion:
+    # Name recorded in the trials log when the criterion stops a trial
+    name = ''
+
+    def start(self, iteration: int, best_score: float) -> None:
+        """
+        Method to start the criterion at the beginning of a trial
+        :param iteration: int
+        :param best_score: float
+        :return: None
+        """
+
+    def restart(self, iteration: int, best_score: float) -> None:
+        """
+        Method to start the criterion again after the population restarted, only progress-based criteria reset
+        :param iteration: int
+        :param best_score: float
+        :return: None
+        """
+
+    def get_state(self) -> dict:
+        """
+        Method to capture the progress of the criterion for a checkpoint
+        :return: state: dict
+        """
+        return {}
+
+    def set_state(self, state: dict) -> None:
+        """
+        Method to put back the progress of the criterion from a checkpoint, after start
+        :param state: dict
+        :return: None
+        """
+
+    def check(self, iteration: int, best_score: float) -> bool:
+        """
+        Method to decide whether the trial stops after an iteration
+        :param iteration: int, iterations done so far
+        :param best_score: float
+        :return: stop: bool
+        """
+        raise NotImplementedError
+
+    def iterations_left(self, iteration: int):
+        """
+        Method to find how many more iterations the criterion allows, so a batch step never runs past it
+        :param iteration: int, iterations done so far
+        :return: iterations: int, or None when the criterion does not limit the iterations
+        """
+        return None
+
+
+class MaxIterations(StoppingCriterion):
+    name = 'iterations'
+
+    def __init__(self, max_iterations: int):
+        self.max_iterations = max_iterations
+
+    def check(self, iteration: int, best_score: float) -> bool:
+        return iteration >= self.max_iterations
+
+    def iterations_left(self, iteration: int) -> int:
+        return self.max_iterations - iteration
+
+
+class EvaluationBudget(StoppingCriterion):
+    name = 'evaluations'
+
+    def __init__(self, max_evaluations: int):
+        self.max_evaluations = max_evaluations
+
+    def check(self, iteration: int, best_score: float) -> bool:
+        # Every iteration evaluates one pair of children, stop before the next pair would overrun the budget
+        return 2 * (iteration + 1) > self.max_evaluations
+
+    def iterations_left(self, iteration: int) -> int:
+        return self.max_evaluations // 2 - iteration
+
+
+class TargetScore(StoppingCriterion):
+    name = 'target'
+
+    def __init__(self, target: float):
+        self.target = target
+
+    def check(self, iteration: int, best_score: float) -> bool:
+        return best_score <= self.target
+
+
+class TimeBudget(StoppingCriterion):
+    name = 'time'
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.deadline = None
+
+    def start(self, iteration: int, best_score: float) -> None:
+        self.deadline = time.perf_counter() + self.seconds
+
+    def get_state(self) -> dict:
+        return {'remaining': self.deadline - time.perf_counter()}
+
+    def set_state(self, state: dict) -> None:
+        self.deadline = time.perf_counter() + state['remaining']
+
+    def check(self, iteration: int, best_score: float) -> bool:
+        return time.perf_counter() >= self.deadline
+
+
+class Stagnation(StoppingCriterion):
+    name = 'stagnation'
+
+    def __init__(self, window: int, tolerance: float = 0.0):
+        self.window = window
+        self.tolerance = tolerance
+        self.best_score = None
+        self.last_improvement = 0
+
+    def start(self, iteration: int, best_score: float) -> None:
+        self.best_score = best_score
+        self.last_improvement = iteration
+
+    def restart(self, iteration: int, best_score: float) -> None:
+        self.start(iteration, best_score)
+
+    def get_state(self) -> dict:
+        return {'best_score': float(self.best_score), 'last_improvement': self.last_improvement}
+
+    def set_state(self, state: dict) -> None:
+        self.best_score = state['best_score']
+        self.last_improvement = state['last_improvement']
+
+    def check(self, iteration: int, best_score: float) -> bool:
+        # Only improvements larger than the tolerance count as progress
+        if best_score < self.best_score - self.tolerance:
+            self.best_score = best_score
+            self.last_improvement = iteration
+        return iteration - self.last_improvement >= self.window
+
+
+class Termination:
+    def __init__(self, criteria: list):
+        self.criteria = criteria
+
+    @classmethod
+    def from_options(cls, max_iterations: int, options: dict = None):
+        """
+        Method to build the stopping criteria of a trial, the iteration limit always applies
+        :param max_iterations: int
+        :param options: dict with any of 'stagnation', 'tolerance', 'target', 'time_budget' and 'max_evaluations'
+        :return: termination: Termination
+        """
+        options = options or {}
+        criteria = [MaxIterations(max_iterations)]
+        if options.get('target') is not None:
+            criteria.append(TargetScore(options['target']))
+        if options.get('max_evaluations'):
+            criteria.append(EvaluationBudget(options['max_evaluations']))
+        if options.get('time_budget'):
+            criteria.append(TimeBudget(options['time_budget']))
+        if options.get('stagnation'):
+            criteria.append(Stagnation(options['stagnation'], options.get('tolerance', 0.0)))
+        return cls(criteria)
+
+    def start(self, best_score: float) -> None:
+        """
+        Method to start every criterion at the beginning of a trial
+        :param best_score: float
+        :return: None
+        """
+        for criterion in self.criteria:
+            criterion.start(0, best_score)
+
+    def restart(self, iteration: int, best_score: float) -> None:
+        """
+        Method to start the progress-based criteria again after the population restarted
+        :param iteration: int
+        :param best_score: float
+        :return: None
+        """
+        for criterion in self.criteria:
+            criterion.restart(iteration, best_score)
+
+    def iterations_left(self, iteration: int) -> int:
+        """
+        Method to find how many more iterations the iteration and evaluation budgets allow
+        :param iteration: int, iterations done so far
+        :return: iterations: int
+        """
+        return min(
+            left for left in (criterion.iterations_left(iteration) for criterion in self.criteria) if left is not None
+        )
+
+    def get_state(self) -> list:
+        """
+        Method to capture the progress of every criterion for a checkpoint
+        :return: states: list
+        """
+        return [criterion.get_state() for criterion in self.criteria]
+
+    def set_state(self, states: list) -> None:
+        """
+        Method to put back the progress of every criterion from a checkpoint
+        :param states: list
+        :return: None
+        """
+        for criterion, state in zip(self.criteria, states):
+            criterion.set_state(state)
+
+    def check(self, iteration: int, best_score: float):
+        """
+        Method to find the first criterion that stops the trial after an iteration
+        :param iteration: int
+        :param best_score: float
+        :return: name: str, or None while the trial goes on
+        """
+        for criterion in self.criteria:
+            if criterion.check(iteration, best_score):
+                return criterion.name
+        return None
@@ -1,59 +1,48 @@
 import numpy as np
 
-from Classes.Fitness import Fitness
 
-
-class TournamentSelection(Fitness):
-    def __init__(self, population, distance_matrix):
-        super().__init__(distance_matrix)
-        self.population = population
-        self.parent1 = None
-        self.parent2 = None
-
-    def selection_pool(self, tour_selection_size):
+class TournamentSelection:
+    @staticmethod
+    def select_parent_indices(scores: np.ndarray, tour_selection_size: int, rng) -> tuple[int, int]:
         """
-        Method to generate tournament selections pool
+        Method to select the row indices of two parents by tournament selection using the cached scores.
+        Both tournament pools are drawn at once, the second pool is drawn from N - 1 rows and shifted past
+        the first parent so that it is excluded without copying or deleting rows.
+        :param scores: ndarray
         :param tour_selection_size: int
-        :return: pool_selections: ndarray
-        """
-        rng = np.random.default_rng()
-        pool_selections = np.array(
-            [self.population[rng.integers(len(self.population))] for _ in range(tour_selection_size)]
-        )
-
-        return pool_selections
-
-    def select_single_parent(self, pool):
+        :param rng: RandomStream
+        :return: parent1_idx, parent2_idx: tuple[int, int]
         """
-        Method to select a best fit solution as a parent from a selection pool
-        :param pool: ndarray
-        :return: parent: ndarray
+        n_pop = len(scores)
+        pools = rng.integers(0, [[n_pop], [n_pop - 1]], size=(2, tour_selection_size))
+        parent1_idx = pools[0, np.argmin(scores[pools[0]])]
+        # Skip the first parent's row in the second pool
+        pools[1] += pools[1] >= parent1_idx
+        parent2_idx = pools[1, np.argmin(scores[pools[1]])]
+
+        return int(parent1_idx), int(parent2_idx)
+
+    @staticmethod
+    def select_parent_indices_batch(
+            scores: np.ndarray,
+            n_pairs: int,
+            tour_selection_size: int,
+            rng
+    ) -> tuple[np.ndarray, np.ndarray]:
         """
-        distances = np.array([self.calc_fitness(chromosome - 1) for chromosome in pool])
-        best_score_idx = np.argmin(distances)
-        parent = pool[best_score_idx]
-
-        # Find the index of the parent in the population
-        parent_index = np.where((self.population == parent).all(axis=1))[0]
-        # If the parent is in the population, delete it
-        if parent_index.size > 0:
-            self.population = np.delete(self.population, parent_index[0], axis=0)
-
-        return parent
-
-    def parents_selection(self, tour_selection_size):
-        """
-        Method to select two best fit solutions as parents from the population using tournament selection.
-        The first selected parent is removed from the population before selecting the second to avoid duplication.
+        Method to select the row indices of many pairs of parents at once, every pair is drawn like
+        select_parent_indices so the two parents of a pair are never the same row
+        :param scores: ndarray
+        :param n_pairs: int
         :param tour_selection_size: int
-        :return: self.parent1, self.parent2: tuple[ndarray, ndarray]
+        :param rng: RandomStream
+        :return: parents1_idx, parents2_idx: tuple[ndarray, ndarray]
         """
-        # Select first parent
-        pool = self.selection_pool(tour_selection_size)
-        self.parent1 = self.select_single_parent(pool)
-
-        # Select second parent
-        pool = self.selection_pool(tour_selection_size)
-        self.parent2 = self.select_single_parent(pool)
-
-        return self.parent1, self.parent2
+        n_pop = len(scores)
+        rows = np.arange(n_pairs)
+        pools = rng.integers(0, [[[n_pop]], [[n_pop - 1]]], size=(2, n_pairs, tour_selection_size))
+        parents1_idx = pools[0][rows, np.argmin(scores[pools[0]], axis=1)]
+        pools[1] += pools[1] >= parents1_idx[:, None]
+        parents2_idx = pools[1][rows, np.argmin(scores[pools[1]], axis=1)]
+
+        return parents1_idx, parents2_idx
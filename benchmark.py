@@ -0,0 +1,288 @@
+import sys
+import csv
+import json
+import time
+import argparse
+import platform
+from itertools import cycle
+import numpy as np
+
+from utils import load_distance_matrix, coordinates_to_matrix
+from ea import init_population, run_trial, steady_state_step
+from stacked import run_stacked_trials
+from Classes.TournamentSelection import TournamentSelection
+from Classes.Crossover import Crossover
+from Classes.Mutation import Mutation
+from Classes.LocalSearch import LocalSearch
+from Classes.RandomStream import RandomStream
+
+"""
+Benchmark suite: throughput of every operator, end-to-end fitness evaluations per second and time-to-target
+quality, written as JSON or CSV, plus a comparison of two result files to flag regressions
+"""
+
+# Bundled instances and their optimal tour lengths
+INSTANCES = {
+    'burma14': ('data/burma14.xml', 3323),
+    'brazil58': ('data/brazil58.xml', 25395)
+}
+# Parameters of the population used by every benchmark: n_pop, tour size, crossover points, crossover rate,
+# mutation points, mutation rate
+PARAMS_GROUP = (100, 5, 2, 0.8, 1, 0.1)
+# Populations worth of random tours the replacement benchmarks cycle through, so they do not offer the same tours
+# over and over
+REPLACEMENT_BATCHES = 8
+
+
+def random_euclidean_instance(n_cities: int, seed: int = 0) -> tuple[np.ndarray, float]:
+    """
+    Function to generate a random Euclidean instance of cities uniform in a 10000 x 10000 square, stored as float32
+    to keep the 10k-city matrix in memory. The target is the Beardwood-Halton-Hammersley estimate of the optimal
+    tour length, 0.7124 * sqrt(n * area).
+    :param n_cities: int
+    :param seed: int
+    :return: distance_matrix, target: tuple[ndarray, float]
+    """
+    coords = np.random.default_rng(seed).random((n_cities, 2)) * 10000
+    return coordinates_to_matrix(coords, 'EUC_2D', np.float32), 0.7124 * np.sqrt(n_cities * 10000 ** 2)
+
+
+def load_instance(name: str, seed: int) -> tuple[np.ndarray, float]:
+    """
+    Function to load a bundled instance by name, or generate a random one for names like 'random1000'
+    :param name: str
+    :param seed: int
+    :return: distance_matrix, target: tuple[ndarray, float]
+    """
+    if name in INSTANCES:
+        path, optimum = INSTANCES[name]
+        return load_distance_matrix(path), optimum
+    if name.startswith('random'):
+        return random_euclidean_instance(int(name[len('random'):]), seed)
+    raise ValueError(f'Unknown instance: {name}')
+
+
+def throughput(operation, min_time: float, units_per_call: int = 1) -> float:
+    """
+    Function to call an operation repeatedly for at least min_time seconds and measure its throughput
+    :param operation: callable without arguments
+    :param min_time: float
+    :param units_per_call: int, units of work (tours, pairs, ...) done by one call
+    :return: units per second: float
+    """
+    calls = 0
+    start = time.perf_counter()
+    while True:
+        operation()
+        calls += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return calls * units_per_call / elapsed
+
+
+def operator_benchmarks(distance_matrix: np.ndarray, min_time: float, seed: int) -> list:
+    """
+    Function to measure the throughput of every operator in isolation on one instance
+    :param distance_matrix: ndarray
+    :param min_time: float, seconds spent on each operator
+    :param seed: int
+    :return: results: list of (benchmark, value, unit)
+    """
+    rng = RandomStream(seed)
+    n_pop, tour_selection_size, num_points, crossover_rate, num_swaps, mutation_rate = PARAMS_GROUP
+    pop = init_population(np.arange(len(distance_matrix)), distance_matrix, n_pop, rng, n_pop)
+    pop.evaluate()
+    parent1, parent2 = pop.population[0], pop.population[1]
+    parents1, parents2 = pop.population[:n_pop // 2], pop.population[n_pop // 2:]
+    tour = pop.population[2].copy()
+
+    results = [
+        ('fitness', throughput(lambda: pop.calc_fitness(tour), min_time), 'tours/s'),
+        ('fitness_batch', throughput(lambda: pop.calc_fitness_batch(pop.population), min_time, n_pop), 'tours/s'),
+        ('selection', throughput(
+            lambda: TournamentSelection.select_parent_indices(pop.scores, tour_selection_size, rng), min_time
+        ), 'pairs/s'),
+        ('selection_batch', throughput(
+            lambda: TournamentSelection.select_parent_indices_batch(pop.scores, n_pop // 2, tour_selection_size, rng),
+            min_time, n_pop // 2
+        ), 'pairs/s'),
+    ]
+    for points in (num_points, 'ox', 'pmx', 'erx'):
+        results.append((f'crossover_{points}', throughput(
+            lambda: Crossover(parent1, parent2, 1.0, rng).crossover(points, pop.offspring[:2]), min_time
+        ), 'pairs/s'))
+        results.append((f'crossover_batch_{points}', throughput(
+            lambda: Crossover.crossover_batch(parents1, parents2, 1.0, points, rng, out=pop.offspring[:n_pop]),
+            min_time, n_pop // 2
+        ), 'pairs/s'))
+    for operator in ('swap', 'two_opt', 'or_opt'):
+        results.append((f'mutation_{operator}', throughput(
+            lambda: Mutation.random_move(tour, operator, distance_matrix, rng), min_time
+        ), 'moves/s'))
+    children = pop.offspring
+    children[:] = pop.population
+    results.append(('mutation_batch_swap', throughput(
+        lambda: Mutation.swap_mutation_batch(children, 1.0, num_swaps, rng), min_time, n_pop
+    ), 'tours/s'))
+    # Drawn before timing, every call offers the next tours to the population
+    candidates = rng.permuted(
+        np.broadcast_to(np.arange(len(distance_matrix)), (REPLACEMENT_BATCHES * n_pop, len(distance_matrix))), axis=1
+    ).astype(pop.population.dtype)
+    next_tour = cycle(candidates).__next__
+    results.append(('replacement', throughput(lambda: pop.replacement(next_tour()), min_time), 'tours/s'))
+    next_batch = cycle(candidates.reshape(-1, n_pop, len(distance_matrix))).__next__
+    results.append((
+        'replacement_batch', throughput(lambda: pop.replace_batch(next_batch()), min_time, n_pop), 'tours/s'
+    ))
+
+    local_search = LocalSearch.for_matrix(distance_matrix)
+    results.append(('local_search', throughput(
+        lambda: local_search.improve(rng.permutation(len(distance_matrix)), 0, time_budget=min_time), min_time
+    ), 'tours/s'))
+    return results
+
+
+def end_to_end_benchmarks(distance_matrix: np.ndarray, target: float, iterations: int, timeout: float,
+                          seed: int) -> list:
+    """
+    Function to measure fitness evaluations per second of full trials of every engine, the stacked one on a stack
+    of the ten trials of a group, and the time the steady-state engine takes to reach a tour within 10% of the
+    target length
+    :param distance_matrix: ndarray
+    :param target: float, optimal or estimated optimal tour length
+    :param iterations: int
+    :param timeout: float, seconds before giving up on the target
+    :param seed: int
+    :return: results: list of (benchmark, value, unit)
+    """
+    results = []
+    for engine in ('steady', 'generational'):
+        trial = run_trial(distance_matrix, PARAMS_GROUP, seed, iterations, engine=engine)
+        results.append((f'evaluations_{engine}', 2 * iterations / trial['Execution Time'], 'evaluations/s'))
+    # Every stacked trial is charged an equal share of the time of the stack
+    trial = run_stacked_trials(distance_matrix, PARAMS_GROUP, [seed + t for t in range(10)], iterations)[0]
+    results.append(('evaluations_stacked', 2 * iterations / trial['Execution Time'], 'evaluations/s'))
+
+    rng = RandomStream(seed)
+    pop = init_population(np.arange(len(distance_matrix)), distance_matrix, PARAMS_GROUP[0], rng)
+    pop.evaluate()
+    local_search_options = {'rate': 0.1, 'time_budget': 1.0}
+    start = time.perf_counter()
+    time_to_target = None
+    while time.perf_counter() - start < timeout:
+        steady_state_step(pop, PARAMS_GROUP, rng, 'or_opt', local_search_options)
+        if pop.best_score <= 1.1 * target:
+            time_to_target = time.perf_counter() - start
+            break
+    results.append(('time_to_target', time_to_target, 's'))
+    return results
+
+
+def run(args: argparse.Namespace) -> None:
+    """
+    Function to run the benchmarks on every instance and write the results
+    :param args: Namespace
+    :return: None
+    """
+    results = []
+    for name in args.instances:
+        print(f'Benchmarking {name}')
+        distance_matrix, target = load_instance(name, args.seed)
+        for benchmark, value, unit in operator_benchmarks(distance_matrix, args.min_time, args.seed):
+            results.append({'instance': name, 'benchmark': benchmark, 'value': value, 'unit': unit})
+        for benchmark, value, unit in end_to_end_benchmarks(distance_matrix, target, args.iterations,
+                                                            args.timeout, args.seed):
+            results.append({'instance': name, 'benchmark': benchmark, 'value': value, 'unit': unit})
+        del distance_matrix
+
+    if args.output.endswith('.csv'):
+        with open(args.output, 'w', newline='') as file:
+            writer = csv.DictWriter(file, fieldnames=['instance', 'benchmark', 'value', 'unit'])
+            writer.writeheader()
+            writer.writerows(results)
+    else:
+        with open(args.output, 'w') as file:
+            json.dump({
+                'python': platform.python_version(),
+                'numpy': np.__version__,
+                'machine': platform.machine(),
+                'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+                'results': results
+            }, file, indent=2)
+    print(f'Results written to {args.output}')
+
+
+def read_results(path: str) -> dict:
+    """
+    Function to read a JSON or CSV result file
+    :param path: str
+    :return: results: dict of (value, unit) by (instance, benchmark)
+    """
+    if path.endswith('.csv'):
+        with open(path, newline='') as file:
+            rows = list(csv.DictReader(file))
+    else:
+        with open(path) as file:
+            rows = json.load(file)['results']
+    return {
+        (row['instance'], row['benchmark']): (float(row['value']) if row['value'] not in (None, '') else None,
+                                              row['unit'])
+        for row in rows
+    }
+
+
+def compare(args: argparse.Namespace) -> int:
+    """
+    Function to compare a new result file against a baseline, throughputs must not drop and times must not rise
+    by more than the threshold
+    :param args: Namespace
+    :return: exit code: int, 1 when a regression was found
+    """
+    baseline, current = read_results(args.baseline), read_results(args.current)
+    regressions = 0
+    print(f'{"instance":<14}{"benchmark":<28}{"baseline":>14}{"current":>14}{"change":>10}')
+    for key in sorted(baseline.keys() & current.keys()):
+        (old, unit), (new, _) = baseline[key], current[key]
+        if old is None or new is None:
+            flag = 'REGRESSION' if old is not None else ''
+            regressions += flag == 'REGRESSION'
+            print(f'{key[0]:<14}{key[1]:<28}{str(old):>14}{str(new):>14}{"":>10} {flag}')
+            continue
+        # Times are better when lower, every other unit is a throughput
+        change = (old / new - 1) if unit == 's' else (new / old - 1)
+        flag = 'REGRESSION' if change < -args.threshold else ''
+        regressions += flag == 'REGRESSION'
+        print(f'{key[0]:<14}{key[1]:<28}{old:>14.4g}{new:>14.4g}{change:>+10.1%} {flag}')
+    print(f'{regressions} regression(s) beyond {args.threshold:.0%}')
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the EA operators and full runs')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help='Run the benchmarks')
+    run_parser.add_argument('--instances', nargs='+',
+                            default=['burma14', 'brazil58', 'random1000', 'random5000', 'random10000'],
+                            help="Bundled instances or random Euclidean ones named like 'random1000'")
+    run_parser.add_argument('--min-time', type=float, default=0.5, help='Seconds spent on each operator')
+    run_parser.add_argument('--iterations', type=int, default=2000, help='Iterations of the end-to-end trials')
+    run_parser.add_argument('--timeout', type=float, default=60, help='Seconds allowed to reach the target')
+    run_parser.add_argument('--seed', type=int, default=0)
+    run_parser.add_argument('--output', default='benchmark.json', help='Result file, .json or .csv')
+
+    compare_parser = subparsers.add_parser('compare', help='Compare two result files')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=0.1,
+                                help='Relative slowdown reported as a regression')
+
+    args = parser.parse_args()
+    if args.command == 'run':
+        run(args)
+    else:
+        sys.exit(compare(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+import os
+import json
+import time
+import threading
+import numpy as np
+
+"""
+Checkpoints of long trials: the state of a trial is saved as one uncompressed .npz file that replaces the previous
+checkpoint atomically, so a trial stopped at any moment resumes from its last complete checkpoint
+"""
+
+
+def save_checkpoint(path: str, arrays: dict, meta: dict) -> None:
+    """
+    Function to write a checkpoint through a temporary file, so readers never see a partial checkpoint
+    :param path: str
+    :param arrays: dict of ndarrays
+    :param meta: dict of JSON-serializable values, e.g. the bit generator state
+    :return: None
+    """
+    directory = os.path.dirname(path)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory, exist_ok=True)
+    temp_file_path = f'{path}.{os.getpid()}.tmp'
+    with open(temp_file_path, 'wb') as file:
+        np.savez(file, meta=np.array(json.dumps(meta)), **arrays)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_file_path, path)
+
+
+def load_checkpoint(path: str) -> tuple[dict, dict]:
+    """
+    Function to read a checkpoint written by save_checkpoint
+    :param path: str
+    :return: arrays, meta: tuple[dict, dict]
+    """
+    with np.load(path) as checkpoint:
+        arrays = {name: checkpoint[name] for name in checkpoint.files if name != 'meta'}
+        meta = json.loads(str(checkpoint['meta']))
+    return arrays, meta
+
+
+class CheckpointWriter:
+    def __init__(self, path: str, interval: float):
+        self.path = path
+        self.interval = interval
+        self.last_write = time.perf_counter()
+        self.thread = None
+
+    def due(self) -> bool:
+        """
+        Method to decide whether a checkpoint is due, a checkpoint still being written postpones the next one
+        :return: due: bool
+        """
+        if self.thread is not None and self.thread.is_alive():
+            return False
+        return time.perf_counter() - self.last_write >= self.interval
+
+    def write(self, arrays: dict, meta: dict) -> None:
+        """
+        Method to write a checkpoint on a background thread, the arrays must be copies the trial no longer changes
+        :param arrays: dict of ndarrays
+        :param meta: dict
+        :return: None
+        """
+        self.close()
+        self.thread = threading.Thread(target=save_checkpoint, args=(self.path, arrays, meta), daemon=True)
+        self.thread.start()
+        self.last_write = time.perf_counter()
+
+    def close(self) -> None:
+        """
+        Method to wait for the checkpoint being written
+        :return: None
+        """
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def remove(self) -> None:
+        """
+        Method to delete the checkpoint once the trial is complete
+        :return: None
+        """
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
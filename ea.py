@@ -1,90 +1,410 @@
-import random
+import os
+import time
+import cProfile
 import numpy as np
 
 from Classes.Population import Population
 from Classes.TournamentSelection import TournamentSelection
 from Classes.Crossover import Crossover
 from Classes.Mutation import Mutation
-
-
-def create_distance_matrix(vertexes: list) -> np.ndarray:
-    """
-    Function to create distance matrix from XML data
-    :param vertexes: list
-    :return: ndarray
-    """
-    cities_matrix = []
-    for index, vertex in enumerate(vertexes):
-        city = list(map(lambda edge: float(edge['@cost']), vertex['edge']))
-        city.insert(index, 0)
-        cities_matrix.append(city)
-    return np.array(cities_matrix)
+from Classes.LocalSearch import LocalSearch
+from Classes.RandomStream import RandomStream
+from Classes.Instrumentation import Instrumentation, NULL_INSTRUMENTATION
+from Classes.Termination import Termination
+from Classes.ConvergenceRecorder import ConvergenceRecorder
+from checkpoint import CheckpointWriter, load_checkpoint
+from stacked import check_stacked_options, run_stacked_trials
 
 
 def init_population(
         cities: np.ndarray,
         distance_matrix: np.ndarray,
         n_pop: int,
-        seed: int
+        rng: RandomStream,
+        n_offspring: int = 2,
+        unique: bool = False,
+        memo_size: int = 0
 ) -> Population:
     """
     Function to generate initial population
-    :param cities: ndarray
+    :param cities: ndarray of 0-based cities
     :param distance_matrix: ndarray
     :param n_pop: int
-    :param seed: int
+    :param rng: RandomStream, the seeded stream the rest of the trial draws from as well
+    :param n_offspring: int, scratch rows of the population buffer for the children of one step
+    :param unique: bool, reject children whose cycle is already in the population
+    :param memo_size: int, number of tour scores remembered to skip evaluating a tour seen before, 0 for none
     :return: Population
     """
-    # Set random seed
-    np.random.seed(seed)
-    return Population(
-        np.array([np.random.permutation(cities) for _ in range(n_pop)]),
-        distance_matrix
+    population = Population(
+        np.broadcast_to(cities, (n_pop, len(cities))), distance_matrix, n_offspring, unique, memo_size
     )
-
-
-def parent_selection(
-        population: np.ndarray,
-        distance_matrix: np.ndarray,
-        tour_selection_size: int
-) -> tuple[np.ndarray, np.ndarray]:
-    """
-    Function to generate parent solutions using tournament selection
-    :param population: ndarray
-    :param distance_matrix: ndarray
-    :param tour_selection_size: int
-    :return: parent1, parent2: tuple[ndarray, ndarray]
-    """
-    tour_selection = TournamentSelection(population, distance_matrix)
-    parent1, parent2 = tour_selection.parents_selection(tour_selection_size)
-    return parent1, parent2
+    # Shuffle every route in place in the population buffer
+    rng.permuted(population.population, axis=1, out=population.population)
+    return population
 
 
 def crossover(
         parent1: np.ndarray,
         parent2: np.ndarray,
         crossover_rate: float,
+        rng: RandomStream = None,
+        instrumentation=NULL_INSTRUMENTATION
 ) -> Crossover:
     """
-    Function to generate two child solutions using single-point crossover
+    Function to generate two child solutions using multi-point crossover, or order (ox), partially mapped (pmx)
+    or edge recombination (erx) crossover depending on the crossover points passed to Crossover.crossover
     :param parent1: ndarray
     :param parent2: ndarray
     :param crossover_rate: float
+    :param rng: RandomStream
+    :param instrumentation: Instrumentation timing the repair of the children
     :return: child1, child2: tuple[ndarray, ndarray]
     """
-    return Crossover(parent1, parent2, crossover_rate)
+    return Crossover(parent1, parent2, crossover_rate, rng, instrumentation)
 
 
 def mutation(
         child1: np.ndarray,
         child2: np.ndarray,
         mutation_rate: float,
+        rng: RandomStream = None
 ) -> Mutation:
     """
     Function to perform swap mutation
     :param child1: ndarray
     :param child2: ndarray
     :param mutation_rate: float
+    :param rng: RandomStream
     :return: mutated_child1, mutated_child2: tuple[ndarray, ndarray]
     """
-    return Mutation(child1, child2, mutation_rate)
+    return Mutation(child1, child2, mutation_rate, rng)
+
+
+def improve_children(
+        children,
+        children_scores: list,
+        population: Population,
+        local_search_options: dict,
+        rng: RandomStream
+) -> list:
+    """
+    Function to run the memetic local search stage on children before replacement. Each child is improved in place
+    with the given probability, within the per-child step and time budget.
+    :param children: sequence of ndarray
+    :param children_scores: list of known distances, None where a child's distance is unknown
+    :param population: Population
+    :param local_search_options: dict with 'rate', 'max_steps', 'time_budget' and 'n_neighbours'
+    :param rng: RandomStream
+    :return: children_scores: list
+    """
+    local_search = LocalSearch.for_matrix(population.distance_matrix, local_search_options.get('n_neighbours', 8))
+    for k, child in enumerate(children):
+        if rng.random() < local_search_options.get('rate', 1.0):
+            if children_scores[k] is None:
+                children_scores[k] = population.calc_fitness(child)
+            children_scores[k] = local_search.improve(
+                child,
+                children_scores[k],
+                local_search_options.get('max_steps'),
+                local_search_options.get('time_budget')
+            )
+    return children_scores
+
+
+def steady_state_step(
+        population: Population,
+        params_group: tuple,
+        rng: RandomStream,
+        mutation_operator: str = 'swap',
+        local_search_options: dict = None,
+        instrumentation=NULL_INSTRUMENTATION
+) -> None:
+    """
+    Function to run one steady-state iteration: select two parents, create two children by crossover and
+    mutation, and offer each child to the population. A child that did not go through crossover is scored
+    from its parent's cached score plus the mutation's delta instead of a full evaluation.
+    :param population: Population
+    :param params_group: tuple
+    :param rng: RandomStream
+    :param mutation_operator: 'swap', 'two_opt' or 'or_opt'
+    :param local_search_options: dict of improve_children options, no local search when None
+    :param instrumentation: Instrumentation recording the phases of the iteration
+    :return: None
+    """
+    _, tour_selection_size, num_points, crossover_rate, num_swaps, mutation_rate = params_group
+    with instrumentation.phase('selection'):
+        parent1_idx, parent2_idx = TournamentSelection.select_parent_indices(
+            population.scores, tour_selection_size, rng
+        )
+        parent1, parent2 = population.population[parent1_idx], population.population[parent2_idx]
+        parent1_score, parent2_score = population.scores[parent1_idx], population.scores[parent2_idx]
+
+    with instrumentation.phase('crossover'):
+        crossover_operator = crossover(parent1, parent2, crossover_rate, rng, instrumentation)
+        # The children live in the scratch rows of the population until replacement copies them in
+        child1, child2 = crossover_operator.crossover(num_points, population.offspring[:2])
+    with instrumentation.phase('mutation'):
+        mutated_child1, mutated_child2, delta1, delta2 = mutation(child1, child2, mutation_rate, rng).delta_mutation(
+            num_swaps, population.distance_matrix, mutation_operator
+        )
+
+    with instrumentation.phase('evaluation'):
+        keys = [population.key(mutated_child1), population.key(mutated_child2)]
+        if crossover_operator.performed:
+            # Tours already in the population or the memo are not evaluated again
+            hits = population.population_hits + population.memo_hits
+            children_scores = [population.score(mutated_child1, keys[0]), population.score(mutated_child2, keys[1])]
+            n_evaluated = 2 - (population.population_hits + population.memo_hits - hits)
+            instrumentation.count('full evaluations', n_evaluated)
+        else:
+            children_scores = [parent1_score + delta1, parent2_score + delta2]
+            n_evaluated = 2
+            instrumentation.count('delta evaluations', 2)
+    instrumentation.count('evaluations', n_evaluated)
+    if local_search_options:
+        with instrumentation.phase('local_search'):
+            children_scores = improve_children(
+                (mutated_child1, mutated_child2), children_scores, population, local_search_options, rng
+            )
+        # Local search changes the tours, so their keys are found again
+        keys = [None, None]
+
+    with instrumentation.phase('replacement'):
+        accepted = population.replacement(mutated_child1, children_scores[0], keys[0])
+        accepted += population.replacement(mutated_child2, children_scores[1], keys[1])
+    instrumentation.count('offered', 2)
+    instrumentation.count('accepted', accepted)
+
+
+def generational_step(
+        population: Population,
+        params_group: tuple,
+        n_pairs: int,
+        rng: RandomStream,
+        local_search_options: dict = None,
+        instrumentation=NULL_INSTRUMENTATION
+) -> None:
+    """
+    Function to run one batch step: select n_pairs pairs of parents, create and mutate all 2 * n_pairs children
+    as one 2-D array, and merge them into the population in a single replacement pass
+    :param population: Population
+    :param params_group: tuple
+    :param n_pairs: int
+    :param rng: RandomStream
+    :param local_search_options: dict of improve_children options, no local search when None
+    :param instrumentation: Instrumentation recording the phases of the step
+    :return: None
+    """
+    _, tour_selection_size, num_points, crossover_rate, num_swaps, mutation_rate = params_group
+    with instrumentation.phase('selection'):
+        parents1_idx, parents2_idx = TournamentSelection.select_parent_indices_batch(
+            population.scores, n_pairs, tour_selection_size, rng
+        )
+    # The children live in the scratch rows of the population when it has enough of them
+    out = population.offspring[:2 * n_pairs] if len(population.offspring) >= 2 * n_pairs else None
+    with instrumentation.phase('crossover'):
+        children = Crossover.crossover_batch(
+            population.population[parents1_idx], population.population[parents2_idx], crossover_rate, num_points,
+            rng, instrumentation, out
+        )
+    with instrumentation.phase('mutation'):
+        Mutation.swap_mutation_batch(children, mutation_rate, num_swaps, rng)
+    with instrumentation.phase('evaluation'):
+        keys = population.keys(children)
+        hits = population.population_hits + population.memo_hits
+        children_scores = population.score_batch(children, keys)
+        # Children found in the population or the memo are not evaluated again
+        n_evaluated = len(children) - (population.population_hits + population.memo_hits - hits)
+    instrumentation.count('evaluations', n_evaluated)
+    instrumentation.count('full evaluations', n_evaluated)
+    if local_search_options:
+        with instrumentation.phase('local_search'):
+            children_scores = np.array(
+                improve_children(children, children_scores.tolist(), population, local_search_options, rng)
+            )
+        keys = None
+    with instrumentation.phase('replacement'):
+        accepted = population.replace_batch(children, children_scores, keys)
+    instrumentation.count('offered', len(children))
+    instrumentation.count('accepted', accepted)
+
+
+def run_trial(
+        distance_matrix: np.ndarray,
+        params_group: tuple,
+        seed: int,
+        termination: int,
+        engine: str = 'steady',
+        n_pairs: int = None,
+        mutation_operator: str = 'swap',
+        local_search_options: dict = None,
+        instrument: bool = False,
+        profile_path: str = None,
+        unique: bool = False,
+        memo_size: int = 0,
+        stopping_options: dict = None,
+        checkpoint_path: str = None,
+        checkpoint_interval: float = None,
+        progress=None,
+        progress_interval: float = 1.0,
+        history_points: int = None,
+        recorder=None
+) -> dict:
+    """
+    Function to run one trial of the EA with a group of parameters. An iteration is one pair of children, so both
+    engines spend the same 2 * termination fitness evaluations and record one best score per iteration. The trial
+    stops earlier when one of the stopping criteria fires, a stagnating population can instead restart from random
+    routes around its elite.
+    :param distance_matrix: ndarray
+    :param params_group: tuple of (n_pop, tour_selection_size, num_points, crossover_rate, num_swaps, mutation_rate)
+    :param seed: int
+    :param termination: int
+    :param engine: 'steady' for one pair per iteration, 'generational' for n_pairs pairs per batch step, 'stacked'
+    for the generational step of run_stacked_trials on a stack of one trial
+    :param n_pairs: int, pairs of children per batch step of the generational and stacked engines, defaults to
+    n_pop // 2
+    :param mutation_operator: 'swap', 'two_opt' or 'or_opt' move of the steady-state engine
+    :param local_search_options: dict of improve_children options for the memetic mode, no local search when None
+    :param instrument: bool, record per-phase timers and counters, returned under 'Metrics'
+    :param profile_path: str, run the iterations under cProfile and dump its stats to this file
+    :param unique: bool, reject children whose cycle is already in the population
+    :param memo_size: int, number of tour scores remembered to skip evaluating a tour seen before, 0 for none
+    :param stopping_options: dict of Termination.from_options criteria, plus 'restarts', the number of restarts on
+    stagnation, and 'elite', the number of solutions a restart keeps, at least 1
+    :param checkpoint_path: str, file the trial is checkpointed to and resumed from when it exists
+    :param checkpoint_interval: float, seconds between checkpoints, no checkpoints when None
+    :param progress: callable(iterations, best_score, best_solution) called with the 1-based best solution so far
+    :param progress_interval: float, seconds between progress calls
+    :param history_points: int, down-sample the convergence curve to at most this many points, None keeps every
+    improvement
+    :param recorder: recorder of the best score of every iteration with the ConvergenceRecorder interface, a new
+    ConvergenceRecorder keeping history_points points when None
+    :return: trial: dict
+    """
+    if engine == 'stacked':
+        check_stacked_options({
+            'mutation_operator': mutation_operator,
+            'local_search_options': local_search_options,
+            'instrument': instrument,
+            'profile_path': profile_path,
+            'unique': unique,
+            'memo_size': memo_size,
+            'stopping_options': stopping_options,
+            'checkpoint_interval': checkpoint_interval
+        }, [params_group])
+        # The stack reports no progress, only its result
+        return run_stacked_trials(distance_matrix, params_group, [seed], termination, n_pairs, history_points)[0]
+
+    if engine == 'generational' and mutation_operator != 'swap':
+        raise ValueError(f'The generational engine mutates with swaps, not {mutation_operator}')
+    n_pop = params_group[0]
+    cities = np.arange(len(distance_matrix))
+    n_pairs = n_pairs or max(n_pop // 2, 1)
+
+    # One seeded stream drives every random draw of the trial, from the initial routes to replacement
+    rng = RandomStream(seed)
+    # Initialize an array with random routes and evaluate them
+    pop = init_population(
+        cities, distance_matrix, n_pop, rng, 2 * n_pairs if engine == 'generational' else 2, unique, memo_size
+    )
+    pop.evaluate()
+    # Routes are 0-based inside the EA and 1-based in the results
+    best_initial_score, best_initial_sol = pop.best_score, pop.best_sol + 1
+
+    # The null instrumentation records nothing, so the loop pays only for empty calls when it is off
+    instrumentation = Instrumentation() if instrument else NULL_INSTRUMENTATION
+    # A distance provider counts the distances served from its row cache over its whole life
+    provider = None if isinstance(distance_matrix, np.ndarray) else distance_matrix
+    row_counts = (provider.row_hits, provider.row_misses) if provider is not None else None
+    if instrument:
+        instrumentation.sample_diversity(pop.diversity())
+    profiler = cProfile.Profile() if profile_path else None
+
+    if engine not in ('steady', 'generational'):
+        raise ValueError(f'Unknown engine: {engine}')
+    stopping_options = stopping_options or {}
+    if stopping_options.get('restarts') and stopping_options.get('elite', 1) < 1:
+        raise ValueError('A restart keeps at least the best solution, elite must be at least 1')
+    stopping = Termination.from_options(termination, stopping_options)
+    stopping.start(pop.best_score)
+    restarts, stopped_by = 0, None
+
+    # Best score through iterations, as streaming statistics and the iterations where it improves
+    recorder = recorder if recorder is not None else ConvergenceRecorder(history_points)
+    elapsed = 0.0
+    writer = CheckpointWriter(checkpoint_path, checkpoint_interval) if checkpoint_path and checkpoint_interval else None
+    if writer and os.path.exists(checkpoint_path):
+        # Go on exactly where the checkpointed run stopped, the instrumentation starts over
+        arrays, meta = load_checkpoint(checkpoint_path)
+        pop.set_state(arrays)
+        rng.set_state(meta['rng'])
+        stopping.set_state(meta['stopping'])
+        recorder.set_state({name[len('recorder_'):]: array for name, array in arrays.items()
+                            if name.startswith('recorder_')})
+        best_initial_score, best_initial_sol = meta['best_initial_score'], arrays['best_initial_sol']
+        restarts, elapsed = meta['restarts'], meta['elapsed']
+
+    if profiler:
+        profiler.enable()
+    start_time = time.time() - elapsed
+    next_progress = time.time() + progress_interval
+    while stopped_by is None:
+        if engine == 'steady':
+            steady_state_step(pop, params_group, rng, mutation_operator, local_search_options, instrumentation)
+            recorder.record(pop.best_score)
+        else:
+            # The last step is cut to what is left of the iteration and evaluation budgets, but makes one pair
+            step_pairs = max(min(n_pairs, stopping.iterations_left(len(recorder))), 1)
+            generational_step(pop, params_group, step_pairs, rng, local_search_options, instrumentation)
+            recorder.record(pop.best_score, step_pairs)
+
+        stopped_by = stopping.check(len(recorder), pop.best_score)
+        if stopped_by == 'stagnation' and restarts < stopping_options.get('restarts', 0):
+            # Keep the elite and go on from fresh random routes instead of stopping
+            pop.restart(stopping_options.get('elite', 1), rng)
+            stopping.restart(len(recorder), pop.best_score)
+            restarts, stopped_by = restarts + 1, None
+        if progress and time.time() >= next_progress:
+            progress(len(recorder), pop.best_score, pop.best_sol + 1)
+            next_progress = time.time() + progress_interval
+        if writer and stopped_by is None and writer.due():
+            # Snapshot between steps, the file is written in the background while the trial goes on
+            arrays = dict(pop.get_state(), best_initial_sol=best_initial_sol)
+            arrays.update({f'recorder_{name}': array for name, array in recorder.get_state().items()})
+            writer.write(arrays, {
+                'rng': rng.get_state(),
+                'stopping': stopping.get_state(),
+                'best_initial_score': float(best_initial_score),
+                'restarts': restarts,
+                'elapsed': time.time() - start_time
+            })
+    execution_time = time.time() - start_time
+    if profiler:
+        profiler.disable()
+        profiler.dump_stats(profile_path)
+    if writer:
+        writer.remove()
+
+    trial = {
+        'Best Initial Distance': best_initial_score,
+        'Best Initial Solution': best_initial_sol,
+        'Best Final Distance': pop.best_score,
+        'Best Final Solution': pop.best_sol + 1,
+        'Execution Time': execution_time,
+        **recorder.statistics(),
+        'Iterations': len(recorder),
+        'Stopped By': stopped_by,
+        'Restarts': restarts,
+        'Best Scores': recorder.history()
+    }
+    if instrument:
+        instrumentation.sample_diversity(pop.diversity())
+        instrumentation.count('population hits', pop.population_hits)
+        instrumentation.count('memo hits', pop.memo_hits)
+        instrumentation.count('duplicates rejected', pop.rejected)
+        if provider is not None:
+            instrumentation.count('distance cache hits', provider.row_hits - row_counts[0])
+            instrumentation.count('distance cache misses', provider.row_misses - row_counts[1])
+        trial['Metrics'] = instrumentation.summary(execution_time)
+    return trial
@@ -0,0 +1,266 @@
+import time
+import multiprocessing
+from multiprocessing import shared_memory
+from multiprocessing.connection import wait
+import numpy as np
+
+from utils import tour_dtype
+from ea import init_population, steady_state_step, generational_step
+from Classes.RandomStream import RandomStream
+from Classes.ConvergenceRecorder import ConvergenceRecorder
+
+"""
+Island model: several populations evolve in separate processes and exchange elite tours through shared memory.
+Islands migrate in lockstep at a barrier, so every island reads the elites its sources published at the same
+migration and a trial gives the same result whatever the timing of the processes.
+"""
+
+
+def check_island_options(trial_options: dict) -> None:
+    """
+    Function to reject run_trial options the island model does not support: islands run the whole iteration
+    budget in lockstep, without early stopping, restarts, instrumentation or checkpoints, and generational islands
+    mutate with swaps
+    :param trial_options: dict of run_trial keyword arguments
+    :return: None
+    """
+    unsupported = [name for name in ('instrument', 'checkpoint_interval') if trial_options.get(name)]
+    if trial_options.get('engine') == 'generational' and trial_options.get('mutation_operator', 'swap') != 'swap':
+        unsupported.append('mutation_operator')
+    # Every stopping option is off when falsy, except elite which keeps 1 solution by default
+    stopping_options = trial_options.get('stopping_options') or {}
+    if any(value != 1 if name == 'elite' else value for name, value in stopping_options.items()):
+        unsupported.append('stopping_options')
+    if unsupported:
+        raise ValueError(f'The island model does not support: {", ".join(unsupported)}')
+
+
+def migration_sources(island: int, n_islands: int, topology: str) -> list:
+    """
+    Function to find the islands an island receives migrants from
+    :param island: int
+    :param n_islands: int
+    :param topology: 'ring' or 'full'
+    :return: sources: list
+    """
+    if topology == 'ring':
+        return [(island - 1) % n_islands] if n_islands > 1 else []
+    if topology == 'full':
+        return [source for source in range(n_islands) if source != island]
+    raise ValueError(f'Unknown topology: {topology}')
+
+
+def _attach(name: str, shape: tuple, dtype) -> tuple[shared_memory.SharedMemory, np.ndarray]:
+    """
+    Function to attach to a shared memory block and view it as an array
+    :param name: str
+    :param shape: tuple
+    :param dtype: dtype
+    :return: block, array: tuple[SharedMemory, ndarray]
+    """
+    block = shared_memory.SharedMemory(name=name)
+    return block, np.ndarray(shape, dtype=dtype, buffer=block.buf)
+
+
+def _island_worker(
+        island: int,
+        layout: dict,
+        barrier,
+        results,
+        params_group: tuple,
+        seed: int,
+        termination: int,
+        migration_interval: int,
+        n_migrants: int,
+        topology: str,
+        trial_options: dict,
+        distances=None
+) -> None:
+    """
+    Function to evolve one island. Every migration_interval iterations the island publishes its best tours in its
+    slot of the migration buffer and, once every island has published, offers the tours published by its source
+    islands to its population. The convergence of the island is put on the results queue at the end.
+    :param island: int
+    :param layout: dict of shared memory block name, shape and dtype by array name
+    :param barrier: Barrier of all islands, passed before and after the migrants are read
+    :param results: Queue of (island, ConvergenceRecorder)
+    :param params_group: tuple
+    :param seed: int
+    :param termination: int
+    :param migration_interval: int
+    :param n_migrants: int
+    :param topology: 'ring' or 'full'
+    :param trial_options: dict of the engine options of run_trial
+    :param distances: distance provider of an instance without a dense matrix, the shared matrix is read otherwise
+    :return: None
+    """
+    blocks, arrays = [], {}
+    for array_name, (name, shape, dtype) in layout.items():
+        block, arrays[array_name] = _attach(name, shape, dtype)
+        blocks.append(block)
+    distance_matrix = arrays['distance_matrix'] if distances is None else distances
+    migrant_tours, migrant_scores = arrays['migrant_tours'], arrays['migrant_scores']
+    n_islands = len(migrant_tours)
+
+    n_pop = params_group[0]
+    engine = trial_options.get('engine', 'steady')
+    n_pairs = trial_options.get('n_pairs') or max(n_pop // 2, 1)
+    island_seed = int(np.random.SeedSequence([seed, island]).generate_state(1)[0])
+    rng = RandomStream(island_seed)
+    pop = init_population(np.arange(len(distance_matrix)), distance_matrix, n_pop, rng,
+                          2 * n_pairs if engine == 'generational' else 2, trial_options.get('unique', False),
+                          trial_options.get('memo_size', 0))
+    pop.evaluate()
+    arrays['initial_scores'][island] = pop.best_score
+    arrays['initial_tours'][island] = pop.best_sol
+
+    local_search_options = trial_options.get('local_search_options')
+    sources = migration_sources(island, n_islands, topology)
+    # Every improvement is kept, so the global best over all islands is exact when the recorders are merged
+    recorder = ConvergenceRecorder()
+    iteration = 0
+    while iteration < termination:
+        if engine == 'steady':
+            steady_state_step(pop, params_group, rng, trial_options.get('mutation_operator', 'swap'),
+                              local_search_options)
+            step_pairs = 1
+        else:
+            step_pairs = min(n_pairs, termination - iteration)
+            generational_step(pop, params_group, step_pairs, rng, local_search_options)
+        recorder.record(pop.best_score, step_pairs)
+        previous, iteration = iteration, iteration + step_pairs
+
+        if previous // migration_interval != iteration // migration_interval:
+            # Every island takes the same steps, so all of them reach this migration and publish their elite
+            elite = np.argsort(pop.scores, kind='stable')[:n_migrants]
+            migrant_tours[island, :len(elite)] = pop.population[elite]
+            migrant_scores[island, :len(elite)] = pop.scores[elite]
+            barrier.wait()
+            immigrants = [(migrant_tours[source].copy(), migrant_scores[source].copy()) for source in sources]
+            # No island publishes its next elite before every island has read this one
+            barrier.wait()
+            for source_tours, source_scores in immigrants:
+                for immigrant, immigrant_score in zip(source_tours, source_scores):
+                    pop.replacement(immigrant, immigrant_score)
+
+    arrays['best_tours'][island] = pop.best_sol
+    arrays['best_scores'][island] = pop.best_score
+    results.put((island, recorder))
+    # Views of the blocks have to go before the blocks can be closed
+    del pop, distance_matrix, migrant_tours, migrant_scores
+    arrays.clear()
+    for block in blocks:
+        block.close()
+
+
+def run_islands(
+        distance_matrix,
+        params_group: tuple,
+        seed: int,
+        termination: int,
+        n_islands: int = 4,
+        migration_interval: int = 500,
+        n_migrants: int = 2,
+        topology: str = 'ring',
+        trial_options: dict = None
+) -> dict:
+    """
+    Function to run one trial of the island model: every island is a process evolving its own population, all of
+    them read one distance matrix from shared memory and migrate elite tours through a shared buffer
+    :param distance_matrix: ndarray, the path of a cached .npy matrix, or a CoordinateDistances provider
+    :param params_group: tuple of (n_pop, tour_selection_size, num_points, crossover_rate, num_swaps, mutation_rate)
+    :param seed: int
+    :param termination: int, iterations of every island
+    :param n_islands: int
+    :param migration_interval: int, iterations between migrations
+    :param n_migrants: int, elite tours every island publishes per migration
+    :param topology: 'ring' or 'full'
+    :param trial_options: dict of the engine options of run_trial
+    :return: trial: dict, in the format of run_trial with the global best over all islands
+    """
+    trial_options = trial_options or {}
+    check_island_options(trial_options)
+    if isinstance(distance_matrix, str):
+        distance_matrix = np.load(distance_matrix, mmap_mode='r')
+    n_cities = len(distance_matrix)
+    n_migrants = min(n_migrants, params_group[0])
+    # A dense matrix is shared by the islands, any other provider is sent to every island
+    dense = isinstance(distance_matrix, np.ndarray)
+    specs = {
+        'migrant_tours': ((n_islands, n_migrants, n_cities), tour_dtype(n_cities)),
+        'migrant_scores': ((n_islands, n_migrants), np.float64),
+        'initial_scores': ((n_islands,), np.float64),
+        'initial_tours': ((n_islands, n_cities), tour_dtype(n_cities)),
+        'best_tours': ((n_islands, n_cities), tour_dtype(n_cities)),
+        'best_scores': ((n_islands,), np.float64)
+    }
+    if dense:
+        specs['distance_matrix'] = ((n_cities, n_cities), distance_matrix.dtype)
+
+    blocks, arrays, layout = [], {}, {}
+    try:
+        for array_name, (shape, dtype) in specs.items():
+            size = max(int(np.prod(shape)) * np.dtype(dtype).itemsize, 1)
+            block = shared_memory.SharedMemory(create=True, size=size)
+            blocks.append(block)
+            arrays[array_name] = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+            arrays[array_name].fill(0)
+            layout[array_name] = (block.name, shape, dtype)
+        if dense:
+            arrays['distance_matrix'][:] = distance_matrix
+
+        barrier = multiprocessing.Barrier(n_islands)
+        results = multiprocessing.Queue()
+        start_time = time.time()
+        processes = [
+            multiprocessing.Process(
+                target=_island_worker,
+                args=(island, layout, barrier, results, params_group, seed, termination, migration_interval,
+                      n_migrants, topology, trial_options, None if dense else distance_matrix)
+            )
+            for island in range(n_islands)
+        ]
+        for process in processes:
+            process.start()
+        recorders = {}
+        pending = {process.sentinel: process for process in processes}
+        while pending:
+            # Read the results while the islands run, a full queue would keep an island from exiting
+            while not results.empty():
+                island, recorder = results.get()
+                recorders[island] = recorder
+            for sentinel in wait(list(pending), timeout=0.1):
+                process = pending.pop(sentinel)
+                process.join()
+                if process.exitcode != 0:
+                    # The other islands would wait for the failed one at the next migration
+                    barrier.abort()
+        execution_time = time.time() - start_time
+        if any(process.exitcode != 0 for process in processes):
+            raise RuntimeError('An island process failed')
+        while len(recorders) < n_islands:
+            island, recorder = results.get()
+            recorders[island] = recorder
+
+        best_island = int(np.argmin(arrays['best_scores']))
+        initial_island = int(np.argmin(arrays['initial_scores']))
+        # Global best over all islands at every iteration
+        recorder = ConvergenceRecorder.minimum(list(recorders.values()), trial_options.get('history_points'))
+        # Routes are 0-based inside the EA and 1-based in the results
+        return {
+            'Best Initial Distance': arrays['initial_scores'][initial_island],
+            'Best Initial Solution': arrays['initial_tours'][initial_island] + 1,
+            'Best Final Distance': arrays['best_scores'][best_island],
+            'Best Final Solution': arrays['best_tours'][best_island] + 1,
+            'Execution Time': execution_time,
+            **recorder.statistics(),
+            'Iterations': termination,
+            'Stopped By': 'iterations',
+            'Restarts': 0,
+            'Best Scores': recorder.history()
+        }
+    finally:
+        arrays.clear()
+        for block in blocks:
+            block.close()
+            block.unlink()
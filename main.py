@@ -1,30 +1,133 @@
+import argparse
 import os
-import time
-from tqdm import tqdm
-from prettytable import PrettyTable
 from itertools import product
 import numpy as np
-from pandas import DataFrame
-import matplotlib.pyplot as plt
 
-from utils import prompt_input, read_xml, append_text
-from ea import (create_distance_matrix,
-                init_population,
-                parent_selection,
-                crossover,
-                mutation)
+from utils import prompt_input, cache_distance_matrix, read_tsplib_coordinates
+from Classes.Distances import CoordinateDistances
+from sweep import run_sweep
+from tuning import run_race
 
 TERMINATION = 10000
+# Instances offered in the menu when no --instance path is given
+INSTANCES = {
+    'brazil': 'data/brazil58.xml',
+    'burma': 'data/burma14.xml'
+}
 
 """
 This is the main function to start and run the experiment
 """
 
 
+def parse_args() -> argparse.Namespace:
+    """
+    Function to parse the command line options of the experiment
+    :return: args: Namespace
+    """
+    parser = argparse.ArgumentParser(description='Run the EA parameter sweep on a TSP instance')
+    parser.add_argument('--instance', default=None,
+                        help='Path of an XML or TSPLIB .tsp instance, the menu of bundled instances is shown otherwise')
+    parser.add_argument('--dtype', choices=['float64', 'float32', 'int32', 'compact'], default='float64',
+                        help='dtype of the cached distance matrix, compact picks int32 for integer costs '
+                             'and float32 otherwise')
+    parser.add_argument('--cache-dir', default='.cache',
+                        help='Directory of the parsed instance cache')
+    parser.add_argument('--distances', choices=['matrix', 'coordinates'], default='matrix',
+                        help='matrix: cache the dense distance matrix, coordinates: compute the distances of a TSPLIB '
+                             'coordinate instance on demand, for instances too large for a matrix')
+    parser.add_argument('--row-cache-mb', type=int, default=64,
+                        help='Memory cap of the candidate distance rows cached by --distances coordinates for the '
+                             'local search')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Number of worker processes, defaults to the number of CPUs')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='Base seed every (group, trial) seed is derived from')
+    parser.add_argument('--engine', choices=['steady', 'generational', 'stacked'], default='steady',
+                        help='steady: one pair of children per iteration, '
+                             'generational: batches of pairs evaluated as 2-D arrays, '
+                             'stacked: the trials of a group run together as one 3-D array of generational steps')
+    parser.add_argument('--pairs', type=int, default=None,
+                        help='Pairs of children per batch step of the generational and stacked engines, '
+                             'defaults to n_pop / 2')
+    parser.add_argument('--mutation', choices=['swap', 'two_opt', 'or_opt'], default='swap',
+                        help='Mutation move of the steady-state engine, the mutation points set the number of moves')
+    parser.add_argument('--crossover-points', nargs='+', default=['1', '2'],
+                        help="Crossover points of the grid, numbers for multi-point crossover or "
+                             "'ox', 'pmx', 'erx' for permutation-preserving crossover")
+    parser.add_argument('--local-search-rate', type=float, default=0.0,
+                        help='Probability that a child is improved by 2-opt/or-opt local search (memetic mode)')
+    parser.add_argument('--local-search-steps', type=int, default=None,
+                        help='Maximum improving moves of the local search per child')
+    parser.add_argument('--local-search-time', type=float, default=None,
+                        help='Maximum seconds of local search per child')
+    parser.add_argument('--neighbours', type=int, default=8,
+                        help='Size of the nearest neighbour candidate lists of the local search')
+    parser.add_argument('--islands', type=int, default=0,
+                        help='Run every trial as an island model with this many island processes')
+    parser.add_argument('--topology', choices=['ring', 'full'], default='ring',
+                        help='Migration topology of the island model')
+    parser.add_argument('--migration-interval', type=int, default=500,
+                        help='Iterations between migrations of the island model')
+    parser.add_argument('--migrants', type=int, default=2,
+                        help='Elite tours every island sends per migration')
+    parser.add_argument('--unique', action='store_true',
+                        help='Reject children whose route, in any rotation or direction, is already in the population')
+    parser.add_argument('--memo', type=int, default=0,
+                        help='Number of route distances remembered so a route seen before is not evaluated again')
+    parser.add_argument('--stagnation', type=int, default=None,
+                        help='Stop a trial after this many iterations without improving the best distance')
+    parser.add_argument('--tolerance', type=float, default=0.0,
+                        help='Smallest decrease of the best distance that counts as an improvement')
+    parser.add_argument('--target', type=float, default=None,
+                        help='Stop a trial once its best distance reaches this value, e.g. the known optimum')
+    parser.add_argument('--time-budget', type=float, default=None, help='Seconds every trial may run')
+    parser.add_argument('--max-evaluations', type=int, default=None,
+                        help='Fitness evaluations every trial may spend')
+    parser.add_argument('--restarts', type=int, default=0,
+                        help='Restarts from random routes around the elite on stagnation before a trial stops')
+    parser.add_argument('--elite', type=int, default=1, help='Best solutions a restart keeps')
+    parser.add_argument('--tune', action='store_true',
+                        help='Race the parameter groups by successive halving instead of running the full grid')
+    parser.add_argument('--eta', type=int, default=3,
+                        help='Each race round keeps 1/eta of the groups and gives the next round eta times the budget')
+    parser.add_argument('--min-iterations', type=int, default=500, help='Iterations of the first race round')
+    parser.add_argument('--race-seeds', type=int, default=3,
+                        help='Trials of every group in the race rounds before the last')
+    parser.add_argument('--checkpoint-interval', type=float, default=None, metavar='SECONDS',
+                        help='Checkpoint every trial this often so an interrupted run resumes its unfinished trials')
+    parser.add_argument('--history-points', type=int, default=None,
+                        help='Down-sample the stored convergence curve of every trial to at most this many points, '
+                             'every improvement is kept by default')
+    parser.add_argument('--report', action='store_true',
+                        help='Plot the convergence curves and write the distance matrix table of the stored '
+                             'results instead of running trials')
+    parser.add_argument('--instrument', action='store_true',
+                        help='Record per-phase timers and counters of every trial in each group\'s metrics_log.csv')
+    parser.add_argument('--profile-trial', type=int, nargs=2, default=None, metavar=('GROUP', 'TRIAL'),
+                        help='Run one trial under cProfile and save its stats as profile_trial_N.prof')
+    args = parser.parse_args()
+    if args.engine != 'steady' and args.mutation != 'swap':
+        parser.error(f'--mutation {args.mutation} is a move of the steady-state engine, the {args.engine} engine '
+                     'mutates its children with swaps')
+    if args.elite < 1:
+        parser.error('--elite must be at least 1, a restart keeps the best solution found so far')
+    if args.tune and (args.islands > 0 or args.profile_trial):
+        parser.error('--tune races the groups as single-process trials, it cannot run with --islands or '
+                     '--profile-trial')
+    if args.islands > 0 and args.engine == 'stacked':
+        parser.error('the stacked engine stacks whole trials and cannot run as an island model')
+    if args.engine == 'stacked' and 'erx' in args.crossover_points:
+        parser.error('the stacked engine supports point, ox and pmx crossover, not erx')
+    return args
+
+
 def main():
+    args = parse_args()
+
     nums_init_pop = [50, 100, 200]
     tour_sizes = [2, 5, 7]
-    crossover_points = [1, 2]
+    crossover_points = [int(points) if points.isdigit() else points for points in args.crossover_points]
     crossover_rates = [0.6, 0.7, 0.8, 0.95]
     mutation_points = [1, 2]
     mutation_rates = [0.02, 0.05, 0.1]
@@ -36,177 +139,117 @@ def main():
         mutation_points,
         mutation_rates
     )
+    # Specify the number of trials for each experiment
+    no_of_experiments = 10
+
+    if args.instance:
+        # Results of an instance file are stored under its file name
+        instance_path = args.instance
+        country_input = os.path.splitext(os.path.basename(instance_path))[0]
+    else:
+        # Choose the city to run the experiment, choose between brazil or burma
+        country_options = list(INSTANCES)
+        country_input = prompt_input(country_options, 'Pick a country that you want to run the experiment on:')
+        instance_path = INSTANCES[country_input]
+    if args.distances == 'coordinates':
+        """
+        _____________________
+        Keep only the city coordinates, distances are computed when they are read
+        _____________________
+        """
+        coords, edge_weight_type = read_tsplib_coordinates(instance_path)
+        # Every TSPLIB coordinate distance is rounded to an integer
+        dtype = np.int32 if args.dtype == 'compact' else np.dtype(args.dtype)
+        distance_matrix = distances = CoordinateDistances(coords, edge_weight_type, dtype, args.row_cache_mb << 20)
+    else:
+        """
+        _____________________
+        Parse the instance once into the cache and memory-map the distance matrix (D)
+        _____________________
+        """
+        distances = cache_distance_matrix(instance_path, args.dtype, args.cache_dir)
+        distance_matrix = np.load(distances, mmap_mode='r')
+
+    if args.report:
+        """
+        _____________________
+        Draw the plots and tables of the stored results, only this step loads the plotting libraries
+        _____________________
+        """
+        from report import write_report
+        write_report(country_input, distance_matrix)
+        return
+
+    trial_options = {
+        'engine': args.engine,
+        'n_pairs': args.pairs,
+        'mutation_operator': args.mutation,
+        'instrument': args.instrument,
+        'unique': args.unique,
+        'memo_size': args.memo,
+        'checkpoint_interval': args.checkpoint_interval,
+        'history_points': args.history_points,
+        'stopping_options': {
+            'stagnation': args.stagnation,
+            'tolerance': args.tolerance,
+            'target': args.target,
+            'time_budget': args.time_budget,
+            'max_evaluations': args.max_evaluations,
+            'restarts': args.restarts,
+            'elite': args.elite
+        },
+        'local_search_options': {
+            'rate': args.local_search_rate,
+            'max_steps': args.local_search_steps,
+            'time_budget': args.local_search_time,
+            'n_neighbours': args.neighbours
+        } if args.local_search_rate > 0 else None
+    }
+
+    if args.tune:
+        """
+        _____________________
+        Race the parameter groups by successive halving, only the best groups get full trials
+        _____________________
+        """
+        run_race(
+            country_input,
+            distances,
+            params,
+            no_of_experiments,
+            TERMINATION,
+            n_workers=args.workers,
+            base_seed=args.seed,
+            trial_options=trial_options,
+            eta=args.eta,
+            min_iterations=args.min_iterations,
+            seeds=args.race_seeds
+        )
+        return
 
-    # Choose the city to run the experiment, choose between brazil or burma
-    country_options = ['brazil', 'burma']
-    country_input = prompt_input(country_options, 'Pick a country that you want to run the experiment on:')
     """
     _____________________
-    Read and process the XML data
+    Run every trial of every parameter group, trials with results already saved are skipped
     _____________________
     """
-    # Read the data from the XML file associated with the country
-    vertexes = read_xml(country_input)
-    # Create the distance matrix (D)
-    distance_matrix = create_distance_matrix(vertexes)
-    cities = np.array(list(i + 1 for i in range(len(distance_matrix))))
-
-    distance_matrix_table = PrettyTable([' '] + cities.tolist())
-    for row_label, row in zip(range(len(distance_matrix)), distance_matrix):
-        distance_matrix_table.add_row([row_label + 1] + list(row))
-    append_text(
-        f'experiments/{country_input}/distance matrix.txt',
-        str(distance_matrix_table)
+    run_sweep(
+        country_input,
+        distances,
+        params,
+        no_of_experiments,
+        TERMINATION,
+        n_workers=args.workers,
+        base_seed=args.seed,
+        trial_options=trial_options,
+        island_options={
+            'n_islands': args.islands,
+            'migration_interval': args.migration_interval,
+            'n_migrants': args.migrants,
+            'topology': args.topology
+        } if args.islands > 0 else None,
+        profile_trial=tuple(args.profile_trial) if args.profile_trial else None
     )
 
-    for param_group_num, params_group in enumerate(params):
-        print(f'\nRUNNING GROUP {param_group_num + 1}\n')
-
-        """
-        Input the parameter choices
-        """
-        param_group = param_group_num + 1
-        # Choose initial population
-        n_pop = params_group[0]
-        # Choose the tournament size
-        tour_selection_size = params_group[1]
-        # Choose the number of points for crossover
-        num_points = params_group[2]
-        # Choose the crossover rate
-        crossover_rate = params_group[3]
-        # Choose the number of points mutation
-        num_swaps = params_group[4]
-        # Choose the mutation rate
-        mutation_rate = params_group[5]
-        # Specify the number of trials for each experiment
-        no_of_experiments = 10
-
-        print('PARAMS\n')
-        print(f'Dataset: {country_input}\n\
-Number of initial population: {n_pop}\n\
-Tournament Size: {tour_selection_size}\n\
-Crossover Points: {num_points}\n\
-Crossover Rate: {crossover_rate}\n\
-Mutation Points: {num_swaps}\n\
-Mutation Rate: {mutation_rate}\n')
-
-        append_text(f'experiments/{country_input}/group_{param_group}/parameters.txt', f'Dataset: {country_input}\n\
-Number of initial population: {n_pop}\n\
-Tournament Size: {tour_selection_size}\n\
-Crossover Points: {num_points}\n\
-Crossover Rate: {crossover_rate}\n\
-Mutation Points: {num_swaps}\n\
-Mutation Rate: {mutation_rate}\n')
-
-        data = {
-            'Best Initial Distance': [],
-            'Best Initial Solution': [],
-            'Best Final Distance': [],
-            'Best Final Solution': [],
-            'Execution Time': [],
-            'Mean': [],
-            'Median': [],
-            'Standard Deviation': []
-        }
-
-        for experiment in range(no_of_experiments):
-            print('Running trial', experiment + 1)
-
-            """
-            _____________________
-            Population Initialization
-            _____________________
-            """
-            # Initialize an array with random routes
-            seed = np.random.randint(1, 10000)
-            pop = init_population(cities, distance_matrix, n_pop, seed)
-            # Evaluate the initial sample solutions to find the lowest sample solutions
-            pop.evaluate()
-            data['Best Initial Distance'].append(pop.best_score)
-            data['Best Initial Solution'].append(pop.best_sol)
-
-            """
-            _____________________
-            Fitness Evaluations
-            _____________________
-            """
-            # List of best score through iterations
-            best_scores = []
-            # Record the start time of the experiment
-            start_time = time.time()
-            # Run 10000 fitness evaluations
-            for i in tqdm(range(TERMINATION), desc='Running GA', unit='iteration'):
-                """
-                _____________________
-                Tournament Selection
-                _____________________
-                """
-                parent1, parent2 = parent_selection(pop.population, distance_matrix, tour_selection_size)
-
-                """
-                _____________________
-                Crossover
-                _____________________
-                """
-                crossover_operator = crossover(parent1, parent2, crossover_rate)
-                child1, child2 = crossover_operator.crossover(num_points)
-
-                """
-                _____________________
-                Mutation
-                _____________________
-                """
-                mutation_operator = mutation(child1, child2, mutation_rate)
-                mutated_child1, mutated_child2 = mutation_operator.swap_mutation(num_swaps)
-
-                """
-                _____________________
-                Replacement
-                _____________________
-                """
-                pop.replacement(mutated_child1)
-                pop.replacement(mutated_child2)
-
-                """
-                _____________________
-                Record the best score for each iteration
-                _____________________
-                """
-                best_scores.append(pop.best_score)
-
-            # Record the end time of the experiment
-            end_time = time.time()
-
-            execution_time = end_time - start_time
-
-            """
-            _____________________
-            Plot the convergence curve and save to a png file
-            _____________________
-            """
-            graph_file_path = f'experiments/{country_input}/group_{param_group}/convergence_curve_{experiment + 1}.png'
-
-            directory = os.path.dirname(graph_file_path)
-            if not os.path.exists(directory):
-                os.makedirs(directory)
-
-            plt.plot(best_scores)
-            plt.title('Convergence Curve')
-            plt.xlabel('Iteration')
-            plt.ylabel('Best Total Distance')
-            plt.savefig(graph_file_path)  # This saves the figure as an image file
-            plt.close()
-
-            data['Best Final Distance'].append(pop.best_score)
-            data['Best Final Solution'].append(pop.best_sol)
-            data['Execution Time'].append(execution_time)
-            data['Mean'].append(np.mean(best_scores))
-            data['Median'].append(np.median(best_scores))
-            data['Standard Deviation'].append(np.std(best_scores))
-        df = DataFrame(data, index=list(range(1, no_of_experiments + 1)))
-        log_file_path = f'experiments/{country_input}/group_{param_group}/trials_log.csv'
-        df.to_csv(log_file_path)
-
 
 if __name__ == '__main__':
     main()
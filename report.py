@@ -0,0 +1,82 @@
+import os
+import numpy as np
+import matplotlib
+from prettytable import PrettyTable
+
+from utils import append_text
+from results import read_convergence_history
+
+# The report never shows figures, it only saves them, the backend is chosen before pyplot is imported
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt  # noqa: E402
+
+"""
+Report step of the sweep, run on demand after the trials: it draws the plots and tables from the stored results,
+so matplotlib and prettytable are only loaded here and never by the runner or its workers
+"""
+
+
+def save_convergence_curve(graph_file_path: str, history: dict) -> None:
+    """
+    Function to plot the convergence curve and save to a png file, as steps between the stored improvements
+    :param graph_file_path: str
+    :param history: dict of the compact curve, see results.save_convergence_history
+    :return: None
+    """
+    # The last point holds the final best score up to the last iteration
+    plt.step(np.append(history['starts'], history['length'] - 1), np.append(history['values'], history['values'][-1]),
+             where='post')
+    plt.title('Convergence Curve')
+    plt.xlabel('Iteration')
+    plt.ylabel('Best Total Distance')
+    plt.savefig(graph_file_path)
+    plt.close()
+
+
+def plot_convergence_curves(experiment_dir: str) -> int:
+    """
+    Function to plot the convergence curve of every stored trial under a directory that has no plot yet
+    :param experiment_dir: str
+    :return: number of plots drawn: int
+    """
+    n_plots = 0
+    for directory, _, file_names in os.walk(experiment_dir):
+        for file_name in sorted(file_names):
+            if not (file_name.startswith('convergence_') and file_name.endswith('.npz')):
+                continue
+            trial = file_name[len('convergence_'):-len('.npz')]
+            graph_file_path = os.path.join(directory, f'convergence_curve_{trial}.png')
+            if not os.path.exists(graph_file_path):
+                save_convergence_curve(graph_file_path, read_convergence_history(os.path.join(directory, file_name)))
+                n_plots += 1
+    return n_plots
+
+
+def write_distance_matrix_table(table_file_path: str, distance_matrix: np.ndarray) -> None:
+    """
+    Function to write the distance matrix as a table with 1-based city labels
+    :param table_file_path: str
+    :param distance_matrix: ndarray
+    :return: None
+    """
+    cities = np.arange(1, len(distance_matrix) + 1)
+    distance_matrix_table = PrettyTable([' '] + cities.tolist())
+    for row_label, row in zip(cities, distance_matrix):
+        distance_matrix_table.add_row([row_label] + list(row))
+    append_text(table_file_path, str(distance_matrix_table))
+
+
+def write_report(country: str, distance_matrix: np.ndarray) -> None:
+    """
+    Function to write the report of the experiments of an instance: the distance matrix table and the
+    convergence curve of every trial of the sweep and the tuning race
+    :param country: str
+    :param distance_matrix: ndarray or distance provider
+    :return: None
+    """
+    experiment_dir = f'experiments/{country}'
+    distance_matrix_file_path = f'{experiment_dir}/distance matrix.txt'
+    # Only a dense matrix is small enough to print, other providers compute their distances on demand
+    if isinstance(distance_matrix, np.ndarray) and not os.path.exists(distance_matrix_file_path):
+        write_distance_matrix_table(distance_matrix_file_path, distance_matrix)
+    print(f'{plot_convergence_curves(experiment_dir)} convergence curves plotted')
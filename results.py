@@ -0,0 +1,176 @@
+import os
+import csv
+import queue
+import threading
+import numpy as np
+
+"""
+Result store of the sweep: every group keeps its trial rows in CSV logs and the convergence history of every trial
+in a small .npz shard. Rows and shards are written by a background thread, so the process collecting the results
+never waits on file I/O, and plots are only drawn by the report step
+"""
+
+
+def save_convergence_history(history_file_path: str, history: dict) -> None:
+    """
+    Function to save the compact convergence curve of a trial: the iterations where the best score changes, its
+    values there and the number of iterations. The best score never gets worse, so a history of thousands of
+    iterations shrinks to its few improvements.
+    :param history_file_path: str
+    :param history: dict of ConvergenceRecorder.history
+    :return: None
+    """
+    np.savez(history_file_path, starts=history['starts'], values=history['values'], length=history['length'])
+
+
+def read_convergence_history(history_file_path: str) -> dict:
+    """
+    Function to read the compact curve saved by save_convergence_history
+    :param history_file_path: str
+    :return: history: dict of starts, values and length
+    """
+    with np.load(history_file_path) as history:
+        return {'starts': history['starts'], 'values': history['values'], 'length': int(history['length'])}
+
+
+def expand_convergence_history(history: dict) -> np.ndarray:
+    """
+    Function to expand a compact curve back into the best score of every iteration, for analysis of short trials
+    :param history: dict of starts, values and length
+    :return: best_scores: ndarray of shape (length,)
+    """
+    return np.repeat(history['values'], np.diff(history['starts'], append=history['length']))
+
+
+def read_log(log_file_path: str) -> tuple[list, list]:
+    """
+    Function to read a csv log written by append_row
+    :param log_file_path: str
+    :return: header, rows: tuple[list, list], the first column of a row is its trial
+    """
+    with open(log_file_path, newline='', encoding='utf-8') as file:
+        lines = list(csv.reader(file))
+    return lines[0], lines[1:]
+
+
+def append_row(log_file_path: str, trial: int, row: dict) -> None:
+    """
+    Function to append the row of a trial to a csv log, writing the header when the log is new
+    :param log_file_path: str
+    :param trial: int
+    :param row: dict
+    :return: None
+    """
+    new_log = not os.path.exists(log_file_path)
+    with open(log_file_path, 'a', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        if new_log:
+            writer.writerow([''] + list(row))
+        writer.writerow([trial] + list(row.values()))
+
+
+def completed_trials(log_file_path: str) -> set:
+    """
+    Function to find the trials of a group that already have results in its trials log
+    :param log_file_path: str
+    :return: trials: set
+    """
+    if not os.path.exists(log_file_path):
+        return set()
+    return {int(row[0]) for row in read_log(log_file_path)[1]}
+
+
+def write_trial(group_dir: str, trial: int, result: dict) -> None:
+    """
+    Function to save the convergence history of a finished trial and append its row to the trials log, and its
+    instrumentation metrics to the metrics log when the trial was instrumented
+    :param group_dir: str
+    :param trial: int
+    :param result: dict
+    :return: None
+    """
+    if not os.path.exists(group_dir):
+        os.makedirs(group_dir)
+    save_convergence_history(f'{group_dir}/convergence_{trial}.npz', result.pop('Best Scores'))
+    metrics = result.pop('Metrics', None)
+    append_row(f'{group_dir}/trials_log.csv', trial, result)
+    if metrics is not None:
+        append_row(f'{group_dir}/metrics_log.csv', trial, metrics)
+
+
+def sort_trials_log(log_file_path: str) -> None:
+    """
+    Function to order the rows of a complete trials log by trial number
+    :param log_file_path: str
+    :return: None
+    """
+    if not os.path.exists(log_file_path):
+        return
+    header, rows = read_log(log_file_path)
+    with open(log_file_path, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        writer.writerow(header)
+        writer.writerows(sorted(rows, key=lambda row: int(row[0])))
+
+
+class ResultWriter:
+    def __init__(self):
+        # Writes run in the order they were submitted, None stops the thread
+        self.queue = queue.Queue()
+        self.error = None
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _run(self) -> None:
+        while True:
+            task = self.queue.get()
+            try:
+                if task is None:
+                    return
+                if self.error is None:
+                    function, args = task
+                    function(*args)
+            except Exception as error:
+                # Kept for the collecting process, which raises it on its next submit or on close
+                self.error = error
+            finally:
+                self.queue.task_done()
+
+    def _raise_error(self) -> None:
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+    def submit(self, function, *args) -> None:
+        """
+        Method to queue a write, e.g. write_trial or sort_trials_log, for the background thread
+        :param function: callable
+        :param args: arguments of the function
+        :return: None
+        """
+        self._raise_error()
+        self.queue.put((function, args))
+
+    def flush(self) -> None:
+        """
+        Method to wait until every queued write is on disk
+        :return: None
+        """
+        self.queue.join()
+        self._raise_error()
+
+    def close(self) -> None:
+        """
+        Method to finish the queued writes and stop the background thread
+        :return: None
+        """
+        if self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join()
+        self._raise_error()
@@ -0,0 +1,315 @@
+import os
+import json
+import asyncio
+import argparse
+import itertools
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+from utils import cache_distance_matrix, read_tsplib_coordinates
+from ea import run_trial
+from main import INSTANCES
+from Classes.Distances import CoordinateDistances
+
+"""
+Headless solver service: a long-lived localhost server that keeps parsed instances warm and runs solve jobs on a
+process pool. Clients send one JSON request per line and get JSON events back on the same connection:
+{"op": "solve", "instance": "data/brazil58.xml", "params": [100, 5, "ox", 0.8, 2, 0.1], "iterations": 10000}
+streams "accepted", "progress" events with the best tour so far, and a final "result" or "error" event, and
+{"op": "status"} returns the cached instances and the running jobs.
+"""
+
+# run_trial options a solve request may set
+TRIAL_OPTIONS = {'engine', 'n_pairs', 'mutation_operator', 'local_search_options', 'instrument', 'unique',
+                 'memo_size', 'stopping_options', 'history_points'}
+
+# Progress queue and instances already loaded by the worker process, set by the pool initializer
+_progress_queue = None
+_worker_instances = OrderedDict()
+_max_worker_instances = 4
+
+
+def _init_worker(progress_queue, max_instances: int) -> None:
+    global _progress_queue, _max_worker_instances
+    _progress_queue = progress_queue
+    _max_worker_instances = max_instances
+
+
+def _jsonable(value):
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, dict):
+        return {key: _jsonable(item) for key, item in value.items()}
+    return value
+
+
+def _solve(job_id: int, instance_key: tuple, distances, params_group: tuple, seed: int, iterations: int,
+           trial_options: dict, progress_interval: float) -> dict:
+    """
+    Function to run one solve job in a worker process, reporting the best tour so far on the progress queue
+    :param job_id: int
+    :param instance_key: tuple identifying the instance
+    :param distances: path of a cached .npy matrix or a CoordinateDistances provider
+    :param params_group: tuple
+    :param seed: int
+    :param iterations: int
+    :param trial_options: dict of run_trial options
+    :param progress_interval: float, seconds between progress events
+    :return: trial: dict of JSON values
+    """
+    # Memory-mapped matrices and providers with their row caches stay loaded for the next jobs on the instance
+    distance_matrix = _worker_instances.pop(instance_key, None)
+    if distance_matrix is None:
+        distance_matrix = np.load(distances, mmap_mode='r') if isinstance(distances, str) else distances
+    _worker_instances[instance_key] = distance_matrix
+    while len(_worker_instances) > _max_worker_instances:
+        _worker_instances.popitem(last=False)
+
+    def progress(iteration: int, best_score: float, best_solution: np.ndarray) -> None:
+        _progress_queue.put((job_id, {
+            'event': 'progress',
+            'iterations': iteration,
+            'best_distance': _jsonable(best_score),
+            'best_solution': best_solution.tolist()
+        }))
+
+    trial = run_trial(distance_matrix, params_group, seed, iterations, progress=progress,
+                      progress_interval=progress_interval, **trial_options)
+    # The history of a long trial is too large to send, clients see it through the progress events
+    trial.pop('Best Scores')
+    return _jsonable(trial)
+
+
+class InstanceCache:
+    def __init__(self, max_instances: int = 8, cache_dir: str = '.cache'):
+        self.max_instances = max_instances
+        self.cache_dir = cache_dir
+        # Loaded (or loading) instances by key, most recently used last
+        self.instances = OrderedDict()
+
+    @staticmethod
+    def key(path: str, distances: str, dtype: str) -> tuple:
+        """
+        Method to identify an instance file by its path and version, so an edited file is loaded again
+        :param path: str
+        :param distances: 'matrix' or 'coordinates'
+        :param dtype: str
+        :return: key: tuple
+        """
+        stat = os.stat(path)
+        return os.path.abspath(path), stat.st_mtime_ns, stat.st_size, distances, dtype
+
+    @staticmethod
+    def load(path: str, distances: str, dtype: str, cache_dir: str, row_cache_bytes: int):
+        """
+        Method to parse an instance into the cached .npy matrix the workers memory-map, or into a provider
+        :param path: str
+        :param distances: 'matrix' or 'coordinates'
+        :param dtype: str
+        :param cache_dir: str
+        :param row_cache_bytes: int, memory cap of the row cache of a provider
+        :return: path of the cached matrix or CoordinateDistances
+        """
+        if distances == 'coordinates':
+            coords, edge_weight_type = read_tsplib_coordinates(path)
+            return CoordinateDistances(coords, edge_weight_type, np.int32 if dtype == 'compact' else np.dtype(dtype),
+                                       row_cache_bytes)
+        return cache_distance_matrix(path, dtype, cache_dir)
+
+    async def get(self, path: str, distances: str = 'matrix', dtype: str = 'float64',
+                  row_cache_bytes: int = 64 << 20) -> tuple:
+        """
+        Method to get an instance, parsing it in a thread on its first request. Requests for an instance that is
+        still loading wait for the same load.
+        :param path: str
+        :param distances: 'matrix' or 'coordinates'
+        :param dtype: str
+        :param row_cache_bytes: int
+        :return: key, distances: tuple
+        """
+        key = self.key(path, distances, dtype)
+        task = self.instances.pop(key, None)
+        if task is None:
+            task = asyncio.get_running_loop().run_in_executor(
+                None, self.load, path, distances, dtype, self.cache_dir, row_cache_bytes
+            )
+        self.instances[key] = task
+        while len(self.instances) > self.max_instances:
+            self.instances.popitem(last=False)
+        try:
+            return key, await task
+        except Exception:
+            # A failed load is not cached
+            if self.instances.get(key) is task:
+                del self.instances[key]
+            raise
+
+
+class SolverService:
+    def __init__(self, n_workers: int = None, max_instances: int = 8, cache_dir: str = '.cache'):
+        self.cache = InstanceCache(max_instances, cache_dir)
+        self.progress_queue = multiprocessing.Queue()
+        self.executor = ProcessPoolExecutor(
+            max_workers=n_workers, initializer=_init_worker, initargs=(self.progress_queue, max_instances)
+        )
+        self.job_ids = itertools.count(1)
+        # Event queue of every running job by job id
+        self.jobs = {}
+
+    async def forward_progress(self) -> None:
+        """
+        Method to hand the progress events of the workers to the connections of their jobs
+        :return: None
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            job_id, event = await loop.run_in_executor(None, self.progress_queue.get)
+            if job_id is None:
+                return
+            # Events that arrive after their job finished are dropped
+            if job_id in self.jobs:
+                self.jobs[job_id].put_nowait(event)
+
+    async def solve(self, request: dict, send) -> None:
+        """
+        Method to run a solve request, sending its events until the result
+        :param request: dict
+        :param send: coroutine function sending one event
+        :return: None
+        """
+        trial_options = request.get('options', {})
+        unknown = set(trial_options) - TRIAL_OPTIONS
+        if unknown:
+            raise ValueError(f'Unknown options: {", ".join(sorted(unknown))}')
+        params_group = tuple(request['params'])
+        if len(params_group) != 6:
+            raise ValueError('params must be [n_pop, tour_size, crossover_points, crossover_rate, '
+                             'mutation_points, mutation_rate]')
+        path = INSTANCES.get(request['instance'], request['instance'])
+        instance_key, distances = await self.cache.get(
+            path, request.get('distances', 'matrix'), request.get('dtype', 'float64'),
+            request.get('row_cache_mb', 64) << 20
+        )
+
+        job_id = next(self.job_ids)
+        events = self.jobs[job_id] = asyncio.Queue()
+        future = asyncio.wrap_future(self.executor.submit(
+            _solve, job_id, instance_key, distances, params_group, request.get('seed', 0),
+            request.get('iterations', 10000), trial_options, request.get('progress_interval', 1.0)
+        ))
+        try:
+            await send({'event': 'accepted', 'job': job_id})
+            while not future.done():
+                event_task = asyncio.ensure_future(events.get())
+                await asyncio.wait({future, event_task}, return_when=asyncio.FIRST_COMPLETED)
+                if event_task.done():
+                    await send(dict(event_task.result(), job=job_id))
+                else:
+                    event_task.cancel()
+            await send({'event': 'result', 'job': job_id, 'trial': future.result()})
+        finally:
+            # A job whose client went away is dropped if it has not started yet
+            future.cancel()
+            del self.jobs[job_id]
+
+    def status(self) -> dict:
+        return {
+            'event': 'status',
+            'instances': [key[0] for key in self.cache.instances],
+            'jobs': sorted(self.jobs)
+        }
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """
+        Method to serve one connection, a client may send several requests and runs its solves concurrently
+        :param reader: StreamReader
+        :param writer: StreamWriter
+        :return: None
+        """
+        lock = asyncio.Lock()
+
+        async def send(event: dict) -> None:
+            async with lock:
+                writer.write((json.dumps(event) + '\n').encode())
+                await writer.drain()
+
+        async def serve(line: bytes) -> None:
+            try:
+                request = json.loads(line)
+                if request.get('op') == 'status':
+                    await send(self.status())
+                elif request.get('op', 'solve') == 'solve':
+                    await self.solve(request, send)
+                else:
+                    raise ValueError(f'Unknown op: {request.get("op")}')
+            except (ConnectionError, asyncio.CancelledError):
+                raise
+            except Exception as error:
+                await send({'event': 'error', 'message': f'{type(error).__name__}: {error}'})
+
+        tasks = set()
+        try:
+            while line := await reader.readline():
+                if line.strip():
+                    task = asyncio.ensure_future(serve(line))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+            await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            writer.close()
+
+    async def serve(self, host: str = '127.0.0.1', port: int = 8765, socket_path: str = None) -> None:
+        """
+        Method to run the service until it is cancelled
+        :param host: str
+        :param port: int
+        :param socket_path: str, serve on this Unix socket instead of TCP
+        :return: None
+        """
+        forwarder = asyncio.ensure_future(self.forward_progress())
+        if socket_path:
+            server = await asyncio.start_unix_server(self.handle, path=socket_path)
+        else:
+            server = await asyncio.start_server(self.handle, host, port)
+        print(f'Serving on {socket_path or f"{host}:{port}"}')
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.progress_queue.put((None, None))
+            await forwarder
+            self.executor.shutdown(cancel_futures=True)
+
+
+def parse_args() -> argparse.Namespace:
+    """
+    Function to parse the command line options of the service
+    :return: args: Namespace
+    """
+    parser = argparse.ArgumentParser(description='Serve EA solve jobs on localhost')
+    parser.add_argument('--host', default='127.0.0.1', help='Address to listen on, localhost only by default')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--socket', default=None, help='Listen on this Unix socket instead of TCP')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Number of worker processes, defaults to the number of CPUs')
+    parser.add_argument('--max-instances', type=int, default=8,
+                        help='Instances kept loaded, the least recently used one is dropped first')
+    parser.add_argument('--cache-dir', default='.cache', help='Directory of the parsed instance cache')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    service = SolverService(args.workers, args.max_instances, args.cache_dir)
+    try:
+        asyncio.run(service.serve(args.host, args.port, args.socket))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,249 @@
+import time
+import numpy as np
+
+from utils import tour_dtype
+from Classes.Fitness import Fitness
+from Classes.Crossover import Crossover
+from Classes.RandomStream import StackedRandomStream
+from Classes.ConvergenceRecorder import ConvergenceRecorder
+
+"""
+Stacked engine: the independent trials of a parameter group run together as one (n_trials, n_pop, n_cities) array.
+Every step selects, recombines, mutates, evaluates and replaces for all trials with one set of array operations,
+which amortizes the NumPy call overhead that dominates a single small population. Each trial draws from its own
+seeded stream with a fixed number of draws per step, so its result does not depend on the trials it is stacked with.
+"""
+
+# Permutation-preserving operators the stacked engine runs on every row at once, ERX builds a child city by city
+STACKED_CROSSOVERS = ('ox', 'pmx')
+
+
+class _Predrawn:
+    """
+    Stand-in for a RandomStream in the row operators of Crossover, it hands out uniforms already drawn per trial
+    """
+
+    def __init__(self, uniforms: np.ndarray):
+        self.uniforms = uniforms
+
+    def random(self, size) -> np.ndarray:
+        if tuple(np.atleast_1d(size)) != self.uniforms.shape:
+            raise ValueError(f'Expected a draw of shape {self.uniforms.shape}, got {size}')
+        return self.uniforms
+
+
+def check_stacked_options(trial_options: dict, params: list = ()) -> None:
+    """
+    Function to reject run_trial options and parameter groups the stacked engine does not support: trials run in
+    lockstep for the whole iteration budget, with swap mutation, point, OX or PMX crossover and without early
+    stopping, restarts, local search, duplicate rejection, memo or checkpoints
+    :param trial_options: dict of run_trial keyword arguments
+    :param params: list of parameter groups
+    :return: None
+    """
+    unsupported = [
+        name for name in ('local_search_options', 'instrument', 'profile_path', 'unique', 'memo_size',
+                          'checkpoint_interval')
+        if trial_options.get(name)
+    ]
+    if trial_options.get('mutation_operator', 'swap') != 'swap':
+        unsupported.append('mutation_operator')
+    # Every stopping option is off when falsy, except elite which keeps 1 solution by default
+    stopping_options = trial_options.get('stopping_options') or {}
+    if any(value != 1 if name == 'elite' else value for name, value in stopping_options.items()):
+        unsupported.append('stopping_options')
+    crossovers = sorted({
+        params_group[2] for params_group in params
+        if isinstance(params_group[2], str) and params_group[2] not in STACKED_CROSSOVERS
+    })
+    unsupported.extend(f'{crossover} crossover' for crossover in crossovers)
+    if unsupported:
+        raise ValueError(f'The stacked engine does not support: {", ".join(unsupported)}')
+
+
+def stacked_selection(
+        scores: np.ndarray,
+        n_pairs: int,
+        tour_selection_size: int,
+        stream: StackedRandomStream
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Function to select the parents of n_pairs pairs in every trial, each pair is drawn like
+    TournamentSelection.select_parent_indices_batch so the two parents of a pair are never the same row
+    :param scores: ndarray of shape (n_trials, n_pop)
+    :param n_pairs: int
+    :param tour_selection_size: int
+    :param stream: StackedRandomStream
+    :return: parents1_idx, parents2_idx: tuple of ndarrays of shape (n_trials, n_pairs)
+    """
+    n_trials, n_pop = scores.shape
+    trials = np.arange(n_trials)[:, None, None]
+    pools = stream.integers(np.array([n_pop, n_pop - 1])[:, None, None], size=(2, n_pairs, tour_selection_size))
+    pools1, pools2 = pools[:, 0], pools[:, 1]
+    parents1_idx = np.take_along_axis(pools1, np.argmin(scores[trials, pools1], axis=2)[..., None], axis=2)
+    pools2 += pools2 >= parents1_idx
+    parents2_idx = np.take_along_axis(pools2, np.argmin(scores[trials, pools2], axis=2)[..., None], axis=2)
+
+    return parents1_idx[..., 0], parents2_idx[..., 0]
+
+
+def stacked_crossover(
+        parents1: np.ndarray,
+        parents2: np.ndarray,
+        crossover_rate: float,
+        num_points,
+        stream: StackedRandomStream
+) -> np.ndarray:
+    """
+    Function to generate the children of every pair of every trial, like Crossover.crossover_batch
+    :param parents1: ndarray of shape (n_trials, n_pairs, n_cities)
+    :param parents2: ndarray of shape (n_trials, n_pairs, n_cities)
+    :param crossover_rate: float
+    :param num_points: Number of crossover points, or 'ox' or 'pmx' for a permutation-preserving operator
+    :param stream: StackedRandomStream
+    :return: children: ndarray of shape (n_trials, 2 * n_pairs, n_cities), first children of every pair then
+    second ones
+    """
+    n_trials, n_pairs, n_cities = parents1.shape
+    first, second = np.concatenate([parents1, parents2], axis=1), np.concatenate([parents2, parents1], axis=1)
+    if isinstance(num_points, str):
+        if num_points not in STACKED_CROSSOVERS:
+            raise ValueError(f'The stacked engine does not support {num_points} crossover')
+        operator = getattr(Crossover, Crossover.PERMUTATION_OPERATORS[num_points])
+        performed = np.tile(stream.random(n_pairs) <= crossover_rate, 2)
+        # Every row is recombined so each trial draws the same amount, rows that do not perform crossover are
+        # put back to their parent afterwards
+        segments = _Predrawn(stream.random((2 * n_pairs, n_cities + 1)).reshape(-1, n_cities + 1))
+        children = operator(first.reshape(-1, n_cities), second.reshape(-1, n_cities), segments)
+        return np.where(performed[..., None], children.reshape(first.shape), first)
+
+    # Randomly select unique crossover points for each pair
+    crossover_points = np.sort(
+        np.argsort(stream.random((n_pairs, n_cities - 2)), axis=2)[..., :num_points] + 1, axis=2
+    )
+    # A position is swapped when an odd number of crossover points lie at or before it
+    swapped = (np.arange(n_cities) >= crossover_points[..., None]).sum(axis=2) % 2 == 1
+    # Pairs that do not perform crossover keep copies of the parents
+    swapped &= (stream.random(n_pairs) <= crossover_rate)[..., None]
+    swapped = np.tile(swapped, (1, 2, 1))
+
+    children = np.where(swapped, second, first)
+    Crossover.fix_children(children.reshape(-1, n_cities))
+    return children
+
+
+def stacked_mutation(children: np.ndarray, mutation_rate: float, num_swaps: int, stream: StackedRandomStream) -> None:
+    """
+    Function to perform swap mutation in place on the children of every trial, like Mutation.swap_mutation_batch
+    :param children: ndarray of shape (n_trials, n_children, n_cities)
+    :param mutation_rate: float
+    :param num_swaps: int
+    :param stream: StackedRandomStream
+    :return: None
+    """
+    _, n_children, n_cities = children.shape
+    trials, rows = np.nonzero(stream.random(n_children) < mutation_rate)
+    for _ in range(num_swaps):
+        # Positions are drawn for every child so each trial draws the same amount
+        idx1 = stream.integers(n_cities, size=n_children)
+        # Offset the second index so the two swapped positions always differ
+        idx2 = (idx1 + 1 + stream.integers(n_cities - 1, size=n_children)) % n_cities
+        idx1, idx2 = idx1[trials, rows], idx2[trials, rows]
+        children[trials, rows, idx1], children[trials, rows, idx2] = (
+            children[trials, rows, idx2], children[trials, rows, idx1]
+        )
+
+
+def stacked_replacement(
+        population: np.ndarray,
+        scores: np.ndarray,
+        children: np.ndarray,
+        children_scores: np.ndarray
+) -> None:
+    """
+    Function to merge the children of every trial into its population in place, like Population.replace_batch:
+    the best children replace the worst solutions while the child's distance is smaller or equal
+    :param population: ndarray of shape (n_trials, n_pop, n_cities)
+    :param scores: ndarray of shape (n_trials, n_pop)
+    :param children: ndarray of shape (n_trials, n_children, n_cities)
+    :param children_scores: ndarray of shape (n_trials, n_children)
+    :return: None
+    """
+    n_replace = min(children.shape[1], population.shape[1])
+    best_children = np.argsort(children_scores, axis=1, kind='stable')[:, :n_replace]
+    worst_slots = np.argsort(-scores, axis=1, kind='stable')[:, :n_replace]
+    accepted = (
+        np.take_along_axis(children_scores, best_children, axis=1) <= np.take_along_axis(scores, worst_slots, axis=1)
+    )
+    trials = np.nonzero(accepted)[0]
+    slots, best_children = worst_slots[accepted], best_children[accepted]
+
+    population[trials, slots] = children[trials, best_children]
+    scores[trials, slots] = children_scores[trials, best_children]
+
+
+def run_stacked_trials(
+        distance_matrix: np.ndarray,
+        params_group: tuple,
+        seeds: list,
+        termination: int,
+        n_pairs: int = None,
+        history_points: int = None
+) -> list:
+    """
+    Function to run the trials of a group of parameters stacked together, one trial per seed. Every step creates
+    n_pairs pairs of children per trial like the generational engine, and an iteration is one pair of children.
+    :param distance_matrix: ndarray
+    :param params_group: tuple of (n_pop, tour_selection_size, num_points, crossover_rate, num_swaps, mutation_rate)
+    :param seeds: list of int, one per trial
+    :param termination: int
+    :param n_pairs: int, pairs of children per trial and step, defaults to n_pop // 2
+    :param history_points: int, down-sample the convergence curves to at most this many points
+    :return: trials: list of dicts in the format of run_trial
+    """
+    n_pop, tour_selection_size, num_points, crossover_rate, num_swaps, mutation_rate = params_group
+    n_trials, n_cities = len(seeds), len(distance_matrix)
+    n_pairs = n_pairs or max(n_pop // 2, 1)
+    fitness = Fitness(distance_matrix)
+    start_time = time.time()
+
+    # One seeded stream per trial drives every random draw of that trial, from the initial routes to mutation
+    stream = StackedRandomStream(seeds)
+    population = np.argsort(stream.random((n_pop, n_cities)), axis=2).astype(tour_dtype(n_cities))
+    scores = fitness.calc_fitness_batch(population)
+    trials = np.arange(n_trials)
+    best_initial = np.argmin(scores, axis=1)
+    # Routes are 0-based inside the EA and 1-based in the results
+    best_initial_scores, best_initial_sols = scores[trials, best_initial], population[trials, best_initial] + 1
+
+    # Best score of every trial through iterations
+    recorders = [ConvergenceRecorder(history_points) for _ in range(n_trials)]
+    iterations = 0
+    while iterations < termination:
+        step_pairs = min(n_pairs, termination - iterations)
+        parents1_idx, parents2_idx = stacked_selection(scores, step_pairs, tour_selection_size, stream)
+        children = stacked_crossover(
+            population[trials[:, None], parents1_idx], population[trials[:, None], parents2_idx],
+            crossover_rate, num_points, stream
+        )
+        stacked_mutation(children, mutation_rate, num_swaps, stream)
+        stacked_replacement(population, scores, children, fitness.calc_fitness_batch(children))
+        for recorder, best_score in zip(recorders, scores.min(axis=1)):
+            recorder.record(best_score, step_pairs)
+        iterations += step_pairs
+    # The trials share the time of the stack
+    execution_time = (time.time() - start_time) / n_trials
+
+    best_final = np.argmin(scores, axis=1)
+    return [{
+        'Best Initial Distance': best_initial_scores[t],
+        'Best Initial Solution': best_initial_sols[t],
+        'Best Final Distance': scores[t, best_final[t]],
+        'Best Final Solution': population[t, best_final[t]] + 1,
+        'Execution Time': execution_time,
+        **recorders[t].statistics(),
+        'Iterations': termination,
+        'Stopped By': 'iterations',
+        'Restarts': 0,
+        'Best Scores': recorders[t].history()
+    } for t in range(n_trials)]
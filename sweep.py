@@ -0,0 +1,172 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+
+from utils import append_text
+from ea import run_trial
+from island import run_islands
+from stacked import check_stacked_options, run_stacked_trials
+from results import ResultWriter, completed_trials, write_trial, sort_trials_log
+
+"""
+Parallel and resumable runner for the parameter grid
+"""
+
+# Distance matrix of the worker process, set once by the pool initializer
+_distance_matrix = None
+
+
+def trial_seed(base_seed: int, param_group: int, trial: int) -> int:
+    """
+    Function to derive a deterministic seed for a trial of a parameter group
+    :param base_seed: int
+    :param param_group: int
+    :param trial: int
+    :return: seed: int
+    """
+    return int(np.random.SeedSequence([base_seed, param_group, trial]).generate_state(1)[0])
+
+
+def format_parameters(country: str, params_group: tuple) -> str:
+    """
+    Function to format a group of parameters the way parameters.txt stores them
+    :param country: str
+    :param params_group: tuple
+    :return: text: str
+    """
+    n_pop, tour_selection_size, num_points, crossover_rate, num_swaps, mutation_rate = params_group
+    return f'Dataset: {country}\n\
+Number of initial population: {n_pop}\n\
+Tournament Size: {tour_selection_size}\n\
+Crossover Points: {num_points}\n\
+Crossover Rate: {crossover_rate}\n\
+Mutation Points: {num_swaps}\n\
+Mutation Rate: {mutation_rate}\n'
+
+
+def _init_worker(distance_matrix) -> None:
+    global _distance_matrix
+    # Workers memory-map a cached matrix so they all share one page-cache copy of it
+    if isinstance(distance_matrix, str):
+        distance_matrix = np.load(distance_matrix, mmap_mode='r')
+    _distance_matrix = distance_matrix
+
+
+def _run_task(params_group: tuple, seed: int, termination: int, trial_options: dict) -> dict:
+    return run_trial(_distance_matrix, params_group, seed, termination, **trial_options)
+
+
+def _run_stack(params_group: tuple, seeds: list, termination: int, n_pairs: int, history_points: int) -> list:
+    return run_stacked_trials(_distance_matrix, params_group, seeds, termination, n_pairs, history_points)
+
+
+def run_sweep(
+        country: str,
+        distance_matrix,
+        params: list,
+        no_of_experiments: int,
+        termination: int,
+        n_workers: int = None,
+        base_seed: int = 0,
+        trial_options: dict = None,
+        island_options: dict = None,
+        profile_trial: tuple = None
+) -> None:
+    """
+    Function to run every trial of every parameter group on a process pool. Each trial is handed to a background
+    writer as soon as it finishes, which stores it in experiments/<country>/group_N/; trials already in a group's
+    trials log are skipped. Convergence curves are plotted by the report step.
+    :param country: str
+    :param distance_matrix: ndarray, the path of a cached .npy matrix that every worker memory-maps, or a
+    CoordinateDistances provider that every worker gets a copy of
+    :param params: list of parameter groups
+    :param no_of_experiments: int
+    :param termination: int
+    :param n_workers: int, defaults to the number of CPUs
+    :param base_seed: int
+    :param trial_options: dict of extra keyword arguments for run_trial, e.g. the engine
+    :param island_options: dict of run_islands options, when given every trial runs as an island model that
+    uses the processes itself, so the trials run one after another
+    :param profile_trial: tuple of (group, trial) to run under cProfile, its stats go to the group's
+    profile_trial_N.prof, island model trials are not profiled
+    With a 'checkpoint_interval' in trial_options every trial is checkpointed to the group's
+    checkpoint_trial_N.npz, island model trials are not checkpointed
+    With the 'stacked' engine the remaining trials of a group run as one stack in one task, so the pool spreads
+    the groups over its processes, and no trial is profiled
+    :return: None
+    """
+    params = list(params)
+    trial_options = trial_options or {}
+    if trial_options.get('engine') == 'stacked' and not island_options:
+        # Rejected before any group is set up, instead of failing the first stack that reaches the option
+        check_stacked_options(trial_options, params)
+    tasks = []
+    remaining = {}
+    for param_group_num, params_group in enumerate(params):
+        param_group = param_group_num + 1
+        group_dir = f'experiments/{country}/group_{param_group}'
+        parameters_file_path = f'{group_dir}/parameters.txt'
+        if not os.path.exists(parameters_file_path):
+            append_text(parameters_file_path, format_parameters(country, params_group))
+
+        done = completed_trials(f'{group_dir}/trials_log.csv')
+        todo = [trial for trial in range(1, no_of_experiments + 1) if trial not in done]
+        remaining[param_group] = len(todo)
+        for trial in todo:
+            tasks.append((param_group, trial, params_group, trial_seed(base_seed, param_group, trial)))
+
+    print(f'{len(tasks)} trials to run, {len(params) * no_of_experiments - len(tasks)} already done')
+    # Imported here so the pool workers, which import this module for _run_task, never load it
+    from tqdm import tqdm
+
+    def collect(writer: ResultWriter, param_group: int, trial: int, result: dict) -> None:
+        group_dir = f'experiments/{country}/group_{param_group}'
+        writer.submit(write_trial, group_dir, trial, result)
+        remaining[param_group] -= 1
+        if remaining[param_group] == 0:
+            writer.submit(sort_trials_log, f'{group_dir}/trials_log.csv')
+            writer.submit(sort_trials_log, f'{group_dir}/metrics_log.csv')
+
+    with ResultWriter() as writer:
+        if island_options:
+            for param_group, trial, params_group, seed in tqdm(tasks, desc='Running sweep', unit='trial'):
+                result = run_islands(
+                    distance_matrix, params_group, seed, termination, trial_options=trial_options, **island_options
+                )
+                collect(writer, param_group, trial, result)
+            return
+
+        with ProcessPoolExecutor(
+                max_workers=n_workers, initializer=_init_worker, initargs=(distance_matrix,)
+        ) as executor:
+            if trial_options.get('engine') == 'stacked':
+                stacks = {}
+                for param_group, trial, params_group, seed in tasks:
+                    stacks.setdefault((param_group, params_group), []).append((trial, seed))
+                futures = {}
+                for (param_group, params_group), stack in stacks.items():
+                    trials, seeds = zip(*stack)
+                    future = executor.submit(_run_stack, params_group, seeds, termination,
+                                             trial_options.get('n_pairs'), trial_options.get('history_points'))
+                    futures[future] = (param_group, trials)
+                with tqdm(total=len(tasks), desc='Running sweep', unit='trial') as progress_bar:
+                    for future in as_completed(futures):
+                        param_group, trials = futures[future]
+                        for trial, result in zip(trials, future.result()):
+                            collect(writer, param_group, trial, result)
+                        progress_bar.update(len(trials))
+                return
+
+            futures = {}
+            for param_group, trial, params_group, seed in tasks:
+                group_dir = f'experiments/{country}/group_{param_group}'
+                task_options = dict(trial_options)
+                if profile_trial == (param_group, trial):
+                    task_options['profile_path'] = f'{group_dir}/profile_trial_{trial}.prof'
+                if trial_options.get('checkpoint_interval'):
+                    # An interrupted sweep resumes this trial from its checkpoint instead of starting it over
+                    task_options['checkpoint_path'] = f'{group_dir}/checkpoint_trial_{trial}.npz'
+                future = executor.submit(_run_task, params_group, seed, termination, task_options)
+                futures[future] = (param_group, trial)
+            for future in tqdm(as_completed(futures), total=len(futures), desc='Running sweep', unit='trial'):
+                collect(writer, *futures[future], future.result())
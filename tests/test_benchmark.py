@@ -0,0 +1,38 @@
+import argparse
+import json
+
+from benchmark import compare, operator_benchmarks, random_euclidean_instance
+
+
+def test_operator_benchmarks_measure_every_operator():
+    distance_matrix, _ = random_euclidean_instance(30)
+
+    results = operator_benchmarks(distance_matrix, 0.001, 0)
+
+    names = [benchmark for benchmark, _, _ in results]
+    assert len(names) == len(set(names))
+    assert {'fitness_batch', 'crossover_batch_erx', 'mutation_or_opt', 'replacement_batch'} <= set(names)
+    assert all(value > 0 for _, value, _ in results)
+
+
+def write_results(path, values: dict) -> str:
+    path.write_text(json.dumps({'results': [
+        {'instance': 'burma14', 'benchmark': benchmark, 'value': value, 'unit': unit}
+        for benchmark, (value, unit) in values.items()
+    ]}))
+    return str(path)
+
+
+def test_compare_flags_slower_throughputs_and_times(tmp_path):
+    baseline = write_results(tmp_path / 'baseline.json', {
+        'fitness': (1000.0, 'tours/s'), 'selection': (1000.0, 'pairs/s'), 'time_to_target': (1.0, 's')
+    })
+    faster = write_results(tmp_path / 'faster.json', {
+        'fitness': (950.0, 'tours/s'), 'selection': (2000.0, 'pairs/s'), 'time_to_target': (0.5, 's')
+    })
+    slower = write_results(tmp_path / 'slower.json', {
+        'fitness': (1000.0, 'tours/s'), 'selection': (1000.0, 'pairs/s'), 'time_to_target': (2.0, 's')
+    })
+
+    assert compare(argparse.Namespace(baseline=baseline, current=faster, threshold=0.1)) == 0
+    assert compare(argparse.Namespace(baseline=baseline, current=slower, threshold=0.1)) == 1
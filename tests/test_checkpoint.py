@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from checkpoint import CheckpointWriter, load_checkpoint, save_checkpoint
+from ea import run_trial
+from results import expand_convergence_history
+
+PARAMS_GROUP = (20, 3, 2, 0.9, 1, 0.3)
+
+
+@pytest.fixture
+def distance_matrix():
+    coords = np.random.default_rng(0).random((25, 2)) * 100
+    return np.rint(np.sqrt(((coords[:, None] - coords[None]) ** 2).sum(axis=-1)))
+
+
+def test_checkpoint_round_trip(tmp_path):
+    path = str(tmp_path / 'run' / 'checkpoint.npz')
+    arrays = {'population': np.arange(12, dtype=np.uint16).reshape(3, 4), 'scores': np.array([1.5, 2.0, 3.0])}
+
+    save_checkpoint(path, arrays, {'restarts': 2, 'rng': {'pos': [1, 2]}})
+    loaded, meta = load_checkpoint(path)
+
+    assert loaded.keys() == arrays.keys()
+    for name, array in arrays.items():
+        np.testing.assert_array_equal(loaded[name], array)
+        assert loaded[name].dtype == array.dtype
+    assert meta == {'restarts': 2, 'rng': {'pos': [1, 2]}}
+    assert [file.name for file in (tmp_path / 'run').iterdir()] == ['checkpoint.npz']
+
+
+@pytest.mark.parametrize('options', [
+    {'engine': 'steady', 'memo_size': 50},
+    {'engine': 'generational', 'n_pairs': 5, 'unique': True},
+    {'engine': 'steady', 'stopping_options': {'stagnation': 40, 'restarts': 3, 'elite': 2}}
+])
+def test_resumed_trial_matches_an_uninterrupted_one(distance_matrix, tmp_path, monkeypatch, options):
+    path = tmp_path / 'checkpoint_trial_1.npz'
+    uninterrupted = run_trial(distance_matrix, PARAMS_GROUP, 4, 300, **options)
+
+    # Keep the last checkpoint of a shorter run, as if the trial had been stopped there
+    monkeypatch.setattr(CheckpointWriter, 'remove', CheckpointWriter.close)
+    run_trial(distance_matrix, PARAMS_GROUP, 4, 150, checkpoint_path=str(path), checkpoint_interval=1e-9, **options)
+    monkeypatch.undo()
+    assert 0 < load_checkpoint(str(path))[0]['recorder_length'] < 150
+
+    resumed = run_trial(distance_matrix, PARAMS_GROUP, 4, 300, checkpoint_path=str(path), checkpoint_interval=60,
+                        **options)
+
+    np.testing.assert_array_equal(expand_convergence_history(resumed['Best Scores']),
+                                  expand_convergence_history(uninterrupted['Best Scores']))
+    assert resumed['Restarts'] == uninterrupted['Restarts']
+    np.testing.assert_array_equal(resumed['Best Final Solution'], uninterrupted['Best Final Solution'])
+    assert not path.exists()
@@ -0,0 +1,107 @@
+import numpy as np
+import pytest
+
+from Classes.ConvergenceRecorder import ConvergenceRecorder
+from results import expand_convergence_history
+
+
+def best_score_curve(seed, length=1000):
+    rng = np.random.default_rng(seed)
+    return np.minimum.accumulate(rng.integers(100, 5000, length)).astype(np.float64)
+
+
+def record(best_scores, max_points=None):
+    recorder = ConvergenceRecorder(max_points)
+    for best_score in best_scores:
+        recorder.record(best_score)
+    return recorder
+
+
+@pytest.mark.parametrize('length', [1, 2, 7, 1000])
+def test_statistics_match_numpy(length):
+    best_scores = best_score_curve(0, length)
+
+    statistics = record(best_scores).statistics()
+
+    assert statistics['Mean'] == np.mean(best_scores)
+    assert statistics['Median'] == np.median(best_scores)
+    assert statistics['Standard Deviation'] == pytest.approx(np.std(best_scores))
+
+
+def test_curve_keeps_only_the_improvements():
+    best_scores = best_score_curve(1)
+
+    recorder = record(best_scores)
+
+    assert len(recorder) == len(best_scores)
+    assert len(recorder.starts) == len(np.unique(best_scores))
+    np.testing.assert_array_equal(expand_convergence_history(recorder.history()), best_scores)
+
+
+def test_counted_record_equals_repeated_records():
+    counted = ConvergenceRecorder()
+    for best_score, count in [(50.0, 3), (42.0, 1), (40.0, 6)]:
+        counted.record(best_score, count)
+
+    repeated = record([50.0] * 3 + [42.0] + [40.0] * 6)
+
+    assert counted.statistics() == pytest.approx(repeated.statistics())
+    np.testing.assert_array_equal(expand_convergence_history(counted.history()),
+                                  expand_convergence_history(repeated.history()))
+
+
+def test_worse_score_keeps_the_best_so_far():
+    recorder = record([30.0, 20.0, 45.0, 25.0])
+
+    np.testing.assert_array_equal(expand_convergence_history(recorder.history()), [30.0, 20.0, 20.0, 20.0])
+    assert recorder.statistics()['Mean'] == 22.5
+
+
+@pytest.mark.parametrize('max_points', [2, 5, 16])
+def test_downsampled_curve_is_bounded(max_points):
+    best_scores = best_score_curve(2, 5000)
+    exact = record(best_scores)
+
+    recorder = record(best_scores, max_points)
+
+    curve = expand_convergence_history(recorder.history())
+    assert len(recorder.starts) <= max_points
+    assert len(curve) == len(best_scores)
+    assert curve[0] == best_scores[0] and curve[-1] == best_scores[-1]
+    # A dropped improvement keeps the score before it, so the curve never falls below the true one
+    assert (curve >= best_scores).all()
+    assert recorder.statistics()['Mean'] == exact.statistics()['Mean']
+    assert recorder.statistics()['Standard Deviation'] == exact.statistics()['Standard Deviation']
+    # The median is off by at most the improvement within one window of the final resolution
+    middle = len(best_scores) // 2
+    window = best_scores[max(middle - recorder.resolution, 0)] - best_scores[min(middle + recorder.resolution,
+                                                                                 len(best_scores) - 1)]
+    assert abs(recorder.median() - np.median(best_scores)) <= window
+
+
+def test_too_few_points_are_rejected():
+    with pytest.raises(ValueError):
+        ConvergenceRecorder(1)
+
+
+def test_minimum_is_the_best_curve_of_every_iteration():
+    curves = [best_score_curve(seed, 300) for seed in (3, 4, 5)]
+
+    merged = ConvergenceRecorder.minimum([record(curve) for curve in curves])
+
+    np.testing.assert_array_equal(expand_convergence_history(merged.history()), np.min(curves, axis=0))
+    assert merged.statistics()['Median'] == np.median(np.min(curves, axis=0))
+
+
+def test_state_round_trip():
+    best_scores = best_score_curve(6, 600)
+    recorder = record(best_scores[:300], 8)
+    restored = ConvergenceRecorder(8)
+
+    restored.set_state(recorder.get_state())
+    for best_score in best_scores[300:]:
+        recorder.record(best_score)
+        restored.record(best_score)
+
+    assert restored.statistics() == recorder.statistics()
+    assert restored.starts == recorder.starts and restored.values == recorder.values
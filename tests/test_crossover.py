@@ -0,0 +1,102 @@
+import numpy as np
+import pytest
+
+from Classes.Crossover import Crossover
+from Classes.RandomStream import RandomStream
+
+N_CITIES = 20
+
+
+def random_parents(n_pairs: int, seed: int) -> tuple[np.ndarray, np.ndarray]:
+    generator = np.random.default_rng(seed)
+    parents = generator.permuted(np.broadcast_to(np.arange(N_CITIES), (2 * n_pairs, N_CITIES)), axis=1)
+    return parents[:n_pairs], parents[n_pairs:]
+
+
+def assert_permutations(children: np.ndarray) -> None:
+    np.testing.assert_array_equal(
+        np.sort(children, axis=-1), np.broadcast_to(np.arange(N_CITIES), children.shape)
+    )
+
+
+@pytest.mark.parametrize('num_points', [1, 2, 3])
+def test_crossover_batch_gives_permutations(num_points):
+    parents1, parents2 = random_parents(30, 4)
+
+    children = Crossover.crossover_batch(parents1, parents2, 0.7, num_points, RandomStream(5))
+
+    assert children.shape == (60, N_CITIES)
+    assert_permutations(children)
+
+
+def test_fix_children_repairs_like_fix_child():
+    generator = np.random.default_rng(6)
+    children = generator.integers(0, N_CITIES, (50, N_CITIES))
+    parent = np.arange(N_CITIES)
+
+    expected = np.array([Crossover.fix_child(child.copy(), parent) for child in children])
+
+    np.testing.assert_array_equal(Crossover.fix_children(children), expected)
+
+
+def test_no_crossover_copies_the_parents():
+    parents1, parents2 = random_parents(10, 8)
+
+    children = Crossover.crossover_batch(parents1, parents2, 0.0, 2, RandomStream(9))
+
+    np.testing.assert_array_equal(children, np.concatenate([parents1, parents2]))
+
+
+@pytest.mark.parametrize('operator', ['ox', 'pmx', 'erx'])
+def test_permutation_crossovers_give_permutations(operator):
+    parents1, parents2 = random_parents(30, 10)
+
+    children = Crossover.crossover_batch(parents1, parents2, 1.0, operator, RandomStream(11))
+
+    assert children.shape == (60, N_CITIES)
+    assert_permutations(children)
+
+
+def edges(tours: np.ndarray) -> set:
+    return {frozenset(edge) for tour in tours for edge in zip(tour, np.roll(tour, -1))}
+
+
+def test_permutation_crossovers_of_identical_parents_copy_them():
+    parents, _ = random_parents(10, 12)
+    rng = RandomStream(13)
+
+    np.testing.assert_array_equal(Crossover.order_crossover_batch(parents, parents, rng), parents)
+    np.testing.assert_array_equal(Crossover.partially_mapped_crossover_batch(parents, parents, rng), parents)
+    # ERX may walk the cycle in either direction
+    for child, parent in zip(Crossover.edge_recombination_batch(parents, parents, rng), parents):
+        assert edges([child]) == edges([parent])
+
+
+def test_edge_recombination_mostly_inherits_parent_edges():
+    parents1, parents2 = random_parents(50, 14)
+
+    children = Crossover.edge_recombination_batch(parents1, parents2, RandomStream(15))
+
+    inherited = [
+        len(edges([child]) & edges([parent1, parent2]))
+        for child, parent1, parent2 in zip(children, parents1, parents2)
+    ]
+    # Only a child that gets stuck takes an edge from neither parent
+    assert np.mean(inherited) > 0.8 * N_CITIES
+
+
+@pytest.mark.parametrize('num_points', [1, 2, 3])
+def test_point_crossover_children_take_each_others_segments(num_points):
+    parents1, parents2 = random_parents(50, 16)
+    changed = 0
+    for k, (parent1, parent2) in enumerate(zip(parents1, parents2)):
+        child1, child2 = Crossover(parent1, parent2, 1.0, RandomStream(k)).crossover(num_points)
+        # The same draws with the parents swapped give the same children the other way round
+        swapped1, swapped2 = Crossover(parent2, parent1, 1.0, RandomStream(k)).crossover(num_points)
+
+        np.testing.assert_array_equal(child1, swapped2)
+        np.testing.assert_array_equal(child2, swapped1)
+        assert sorted(child2) == list(range(N_CITIES))
+        changed += not np.array_equal(child2, parent2)
+    # Only a segment the repair maps back to the parent leaves the second child unchanged
+    assert changed > 40
@@ -0,0 +1,78 @@
+import pickle
+
+import numpy as np
+import pytest
+
+from Classes.Distances import CoordinateDistances
+from Classes.LocalSearch import LocalSearch
+from ea import run_trial
+from results import expand_convergence_history
+from utils import coordinates_to_matrix
+
+PARAMS_GROUP = (20, 3, 2, 0.9, 1, 0.3)
+EDGE_WEIGHT_TYPES = ['EUC_2D', 'CEIL_2D', 'ATT', 'GEO']
+
+
+def coordinates(edge_weight_type: str, n_cities: int = 30) -> np.ndarray:
+    generator = np.random.default_rng(1)
+    if edge_weight_type == 'GEO':
+        # DDD.MM latitudes and longitudes
+        return np.trunc(generator.uniform(-60, 60, (n_cities, 2))) + generator.integers(0, 60, (n_cities, 2)) / 100
+    return generator.random((n_cities, 2)) * 1000
+
+
+@pytest.mark.parametrize('edge_weight_type', EDGE_WEIGHT_TYPES)
+def test_provider_matches_the_dense_matrix(edge_weight_type):
+    coords = coordinates(edge_weight_type)
+    distance_matrix = coordinates_to_matrix(coords, edge_weight_type)
+    provider = CoordinateDistances(coords, edge_weight_type)
+    rows, cols = np.random.default_rng(2).integers(0, len(coords), (2, 5, 40))
+
+    assert provider.shape == distance_matrix.shape and len(provider) == len(distance_matrix)
+    assert all(provider[i, j] == distance_matrix[i, j] for i in range(len(coords)) for j in range(len(coords)))
+    np.testing.assert_array_equal(provider[rows, cols], distance_matrix[rows, cols])
+    np.testing.assert_array_equal(provider[3], distance_matrix[3])
+    np.testing.assert_array_equal(provider[4:9], distance_matrix[4:9])
+
+
+def test_candidate_rows_serve_neighbour_distances_within_the_cap():
+    coords = coordinates('EUC_2D', 50)
+    distance_matrix = coordinates_to_matrix(coords, 'EUC_2D')
+    # Room for only a few candidate rows
+    provider = CoordinateDistances(coords, 'EUC_2D', cache_bytes=5000)
+    local_search = LocalSearch(provider, n_neighbours=5)
+
+    assert 0 < len(provider.rows) < 50
+    for i in range(50):
+        for j in local_search.neighbours[i]:
+            assert provider[i, j] == distance_matrix[i, j]
+            assert provider[j, i] == distance_matrix[j, i]
+    assert provider.row_hits > 0 and provider.row_misses > 0
+    assert len(provider.rows) <= provider.max_rows
+
+
+def test_copies_for_workers_drop_the_cache():
+    provider = CoordinateDistances(coordinates('EUC_2D'), 'EUC_2D')
+    LocalSearch(provider, n_neighbours=5)
+
+    copy = pickle.loads(pickle.dumps(provider))
+
+    assert provider.rows and not copy.rows
+    np.testing.assert_array_equal(copy[2], provider[2])
+
+
+@pytest.mark.parametrize('engine, options', [
+    ('steady', {'mutation_operator': 'two_opt'}),
+    ('generational', {'n_pairs': 5}),
+    ('steady', {'local_search_options': {'rate': 0.5, 'max_steps': 20, 'n_neighbours': 5}})
+])
+def test_trial_on_the_provider_matches_the_dense_matrix(engine, options):
+    coords = coordinates('EUC_2D')
+    dense = run_trial(coordinates_to_matrix(coords, 'EUC_2D'), PARAMS_GROUP, 3, 150, engine=engine, **options)
+    provided = run_trial(CoordinateDistances(coords, 'EUC_2D'), PARAMS_GROUP, 3, 150, engine=engine,
+                         instrument=True, **options)
+
+    np.testing.assert_array_equal(expand_convergence_history(provided['Best Scores']),
+                                  expand_convergence_history(dense['Best Scores']))
+    np.testing.assert_array_equal(provided['Best Final Solution'], dense['Best Final Solution'])
+    assert 'distance cache hits' in provided['Metrics']
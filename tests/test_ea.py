@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from ea import run_trial
+from results import expand_convergence_history
+
+PARAMS_GROUP = (20, 3, 2, 0.9, 1, 0.3)
+
+
+@pytest.fixture
+def distance_matrix():
+    coords = np.random.default_rng(0).random((25, 2)) * 100
+    return np.rint(np.sqrt(((coords[:, None] - coords[None]) ** 2).sum(axis=-1)))
+
+
+@pytest.mark.parametrize('engine, n_pairs', [('steady', None), ('generational', None), ('generational', 7)])
+def test_trial_records_one_score_per_iteration(distance_matrix, engine, n_pairs):
+    trial = run_trial(distance_matrix, PARAMS_GROUP, 1, 250, engine=engine, n_pairs=n_pairs)
+
+    best_scores = expand_convergence_history(trial['Best Scores']).tolist()
+    assert len(best_scores) == 250
+    assert (np.diff(best_scores) <= 0).all()
+    assert trial['Best Final Distance'] == best_scores[-1] <= trial['Best Initial Distance']
+    assert sorted(trial['Best Final Solution']) == list(range(1, 26))
+
+
+@pytest.mark.parametrize('mutation_operator', ['two_opt', 'or_opt'])
+def test_steady_state_moves_keep_the_scores_exact(distance_matrix, mutation_operator):
+    trial = run_trial(distance_matrix, PARAMS_GROUP, 2, 200, mutation_operator=mutation_operator)
+
+    tour = np.array(trial['Best Final Solution']) - 1
+    assert trial['Best Final Distance'] == pytest.approx(distance_matrix[tour, np.roll(tour, -1)].sum())
+
+
+@pytest.mark.parametrize('engine', ['steady', 'generational'])
+def test_memetic_trial_keeps_the_scores_exact(distance_matrix, engine):
+    local_search_options = {'rate': 0.5, 'max_steps': 10, 'n_neighbours': 5}
+    trial = run_trial(distance_matrix, PARAMS_GROUP, 3, 100, engine=engine, local_search_options=local_search_options)
+
+    tour = np.array(trial['Best Final Solution']) - 1
+    assert trial['Best Final Distance'] == pytest.approx(distance_matrix[tour, np.roll(tour, -1)].sum())
+
+
+def test_generational_engine_rejects_delta_moves(distance_matrix):
+    with pytest.raises(ValueError):
+        run_trial(distance_matrix, PARAMS_GROUP, 1, 10, engine='generational', mutation_operator='two_opt')
+
+
+@pytest.mark.parametrize('engine', ['steady', 'generational'])
+@pytest.mark.parametrize('num_points', [2, 'ox', 'erx'])
+def test_trial_is_reproducible_from_its_seed(distance_matrix, engine, num_points):
+    params_group = PARAMS_GROUP[:2] + (num_points,) + PARAMS_GROUP[3:]
+    options = {'engine': engine, 'local_search_options': {'rate': 0.2, 'max_steps': 5}}
+    trials = [run_trial(distance_matrix, params_group, seed, 150, **options) for seed in (4, 4, 5)]
+
+    np.testing.assert_array_equal(expand_convergence_history(trials[0]['Best Scores']),
+                                  expand_convergence_history(trials[1]['Best Scores']))
+    np.testing.assert_array_equal(trials[0]['Best Final Solution'], trials[1]['Best Final Solution'])
+    assert not np.array_equal(expand_convergence_history(trials[0]['Best Scores']),
+                              expand_convergence_history(trials[2]['Best Scores']))
+
+
+def test_unknown_engine_is_rejected(distance_matrix):
+    with pytest.raises(ValueError):
+        run_trial(distance_matrix, PARAMS_GROUP, 1, 10, engine='parallel')
+
+
+def test_progress_reports_the_best_tour_so_far(distance_matrix):
+    calls = []
+
+    trial = run_trial(distance_matrix, PARAMS_GROUP, 1, 50, progress=lambda *call: calls.append(call),
+                      progress_interval=0)
+
+    assert [call[0] for call in calls] == list(range(1, 51))
+    assert [call[1] for call in calls] == expand_convergence_history(trial['Best Scores']).tolist()
+    np.testing.assert_array_equal(calls[-1][2], trial['Best Final Solution'])
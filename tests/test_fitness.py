@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+
+from Classes.Fitness import Fitness
+
+
+@pytest.mark.parametrize('symmetric', [True, False])
+def test_calc_fitness_batch_matches_scalar_loop(symmetric):
+    rng = np.random.default_rng(0)
+    distance_matrix = rng.random((30, 30)) * 100
+    if symmetric:
+        distance_matrix = distance_matrix + distance_matrix.T
+    tours = rng.permuted(np.broadcast_to(np.arange(30), (20, 30)), axis=1)
+    fitness = Fitness(distance_matrix)
+
+    expected = [fitness.calc_fitness(tour) for tour in tours]
+
+    np.testing.assert_allclose(fitness.calc_fitness_batch(tours), expected)
+
+
+def test_calc_fitness_batch_of_one_tour():
+    distance_matrix = np.random.default_rng(1).integers(1, 100, (12, 12)).astype(np.float64)
+    tour = np.random.default_rng(2).permutation(12)
+    fitness = Fitness(distance_matrix)
+
+    np.testing.assert_array_equal(fitness.calc_fitness_batch(tour), [fitness.calc_fitness(tour)])
+
+
+def test_calc_fitness_closes_the_cycle():
+    distance_matrix = np.arange(16, dtype=np.float64).reshape(4, 4)
+    # Edges 0->1, 1->2, 2->3 and back 3->0
+    assert Fitness(distance_matrix).calc_fitness(np.arange(4)) == 1 + 6 + 11 + 12
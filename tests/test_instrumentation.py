@@ -0,0 +1,71 @@
+import pstats
+
+import numpy as np
+import pytest
+
+from Classes.Instrumentation import Instrumentation
+from ea import run_trial
+from results import expand_convergence_history
+
+PARAMS_GROUP = (20, 3, 2, 0.9, 1, 0.3)
+
+
+@pytest.fixture
+def distance_matrix():
+    coords = np.random.default_rng(0).random((25, 2)) * 100
+    return np.rint(np.sqrt(((coords[:, None] - coords[None]) ** 2).sum(axis=-1)))
+
+
+@pytest.mark.parametrize('engine', ['steady', 'generational'])
+def test_instrumented_trial_counts_every_child(distance_matrix, engine):
+    trial = run_trial(distance_matrix, PARAMS_GROUP, 1, 120, engine=engine, instrument=True)
+
+    metrics = trial['Metrics']
+    assert metrics['evaluations'] == metrics['full evaluations'] + metrics['delta evaluations'] == 240
+    assert metrics['offered'] == 240
+    assert 0 < metrics['accepted'] <= metrics['offered']
+    assert metrics['acceptance rate'] == metrics['accepted'] / 240
+    for phase in ('selection', 'crossover', 'mutation', 'evaluation', 'replacement'):
+        assert metrics[f'{phase} calls'] > 0
+        assert metrics[f'{phase} time'] >= 0
+    assert 0 <= metrics['final diversity'] <= metrics['initial diversity'] <= 1
+
+
+@pytest.mark.parametrize('engine', ['steady', 'generational'])
+def test_known_children_are_not_counted_as_evaluations(distance_matrix, engine):
+    trial = run_trial(distance_matrix, PARAMS_GROUP, 1, 300, engine=engine, instrument=True, memo_size=1000)
+
+    metrics = trial['Metrics']
+    hits = metrics['population hits'] + metrics['memo hits']
+    assert hits > 0
+    assert metrics['evaluations'] == metrics['full evaluations'] + metrics['delta evaluations']
+    assert metrics['full evaluations'] + hits == metrics['offered'] - metrics['delta evaluations']
+
+
+def test_instrumentation_does_not_change_the_trial(distance_matrix):
+    plain = run_trial(distance_matrix, PARAMS_GROUP, 2, 100)
+    instrumented = run_trial(distance_matrix, PARAMS_GROUP, 2, 100, instrument=True)
+
+    assert 'Metrics' not in plain
+    np.testing.assert_array_equal(expand_convergence_history(plain['Best Scores']),
+                                  expand_convergence_history(instrumented['Best Scores']))
+
+
+def test_profiled_trial_dumps_its_stats(distance_matrix, tmp_path):
+    profile_path = tmp_path / 'trial.prof'
+
+    run_trial(distance_matrix, PARAMS_GROUP, 3, 50, profile_path=str(profile_path))
+
+    assert pstats.Stats(str(profile_path)).total_calls > 0
+
+
+def test_summary_exports_every_counter():
+    instrumentation = Instrumentation()
+    with instrumentation.phase('selection'):
+        instrumentation.count('offered', 4)
+
+    metrics = instrumentation.summary(1.0)
+
+    assert set(Instrumentation.COUNTERS) <= set(metrics)
+    assert metrics['selection calls'] == 1
+    assert metrics['acceptance rate'] == 0.0
@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from Classes.Distances import CoordinateDistances
+from island import migration_sources, run_islands
+from results import expand_convergence_history
+from utils import coordinates_to_matrix
+
+PARAMS_GROUP = (16, 3, 2, 0.9, 1, 0.3)
+
+
+@pytest.fixture
+def distance_matrix():
+    coords = np.random.default_rng(0).random((20, 2)) * 100
+    return np.rint(np.sqrt(((coords[:, None] - coords[None]) ** 2).sum(axis=-1)))
+
+
+def test_migration_sources():
+    assert migration_sources(0, 4, 'ring') == [3]
+    assert migration_sources(2, 4, 'full') == [0, 1, 3]
+    assert migration_sources(0, 1, 'ring') == []
+
+
+@pytest.mark.parametrize('trial_options', [{'engine': 'steady'}, {'engine': 'generational', 'n_pairs': 4}])
+def test_island_trials_are_reproducible(distance_matrix, trial_options):
+    trials = [
+        run_islands(distance_matrix, PARAMS_GROUP, 7, 200, n_islands=3, migration_interval=20, n_migrants=2,
+                    topology='full', trial_options=trial_options)
+        for _ in range(2)
+    ]
+
+    np.testing.assert_array_equal(expand_convergence_history(trials[0]['Best Scores']),
+                                  expand_convergence_history(trials[1]['Best Scores']))
+    np.testing.assert_array_equal(trials[0]['Best Final Solution'], trials[1]['Best Final Solution'])
+    best_scores = expand_convergence_history(trials[0]['Best Scores']).tolist()
+    assert len(best_scores) == 200
+    assert (np.diff(best_scores) <= 0).all()
+    assert trials[0]['Best Final Distance'] == best_scores[-1]
+    assert sorted(trials[0]['Best Final Solution']) == list(range(1, 21))
+
+
+def test_generational_islands_reject_delta_moves(distance_matrix):
+    with pytest.raises(ValueError):
+        run_islands(distance_matrix, PARAMS_GROUP, 7, 20, n_islands=2,
+                    trial_options={'engine': 'generational', 'mutation_operator': 'or_opt'})
+
+
+@pytest.mark.parametrize('trial_options', [
+    {'instrument': True},
+    {'checkpoint_interval': 60},
+    {'stopping_options': {'stagnation': 10}},
+    {'stopping_options': {'restarts': 1}},
+    {'stopping_options': {'elite': 3}}
+])
+def test_islands_reject_unsupported_options(distance_matrix, trial_options):
+    with pytest.raises(ValueError):
+        run_islands(distance_matrix, PARAMS_GROUP, 7, 20, n_islands=2, trial_options=trial_options)
+
+
+def test_islands_accept_the_default_stopping_options(distance_matrix):
+    stopping_options = {'stagnation': None, 'tolerance': 0.0, 'target': None, 'time_budget': None,
+                        'max_evaluations': None, 'restarts': 0, 'elite': 1}
+
+    trial = run_islands(distance_matrix, PARAMS_GROUP, 7, 20, n_islands=2,
+                        trial_options={'stopping_options': stopping_options})
+
+    assert len(expand_convergence_history(trial['Best Scores'])) == 20
+
+
+def test_islands_run_on_a_coordinate_provider():
+    coords = np.random.default_rng(0).random((20, 2)) * 100
+    trials = [
+        run_islands(distance_matrix, PARAMS_GROUP, 7, 60, n_islands=2, migration_interval=20)
+        for distance_matrix in (coordinates_to_matrix(coords, 'EUC_2D'), CoordinateDistances(coords, 'EUC_2D'))
+    ]
+
+    np.testing.assert_array_equal(expand_convergence_history(trials[0]['Best Scores']),
+                                  expand_convergence_history(trials[1]['Best Scores']))
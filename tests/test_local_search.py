@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from Classes.Fitness import Fitness
+from Classes.LocalSearch import LocalSearch
+
+N_CITIES = 60
+
+
+@pytest.fixture
+def distance_matrix():
+    coords = np.random.default_rng(0).random((N_CITIES, 2)) * 100
+    return np.sqrt(((coords[:, None] - coords[None]) ** 2).sum(axis=-1))
+
+
+def test_improve_reports_the_exact_distance(distance_matrix):
+    fitness = Fitness(distance_matrix)
+    local_search = LocalSearch(distance_matrix, 8)
+    generator = np.random.default_rng(1)
+    for _ in range(20):
+        tour = generator.permutation(N_CITIES)
+        score = fitness.calc_fitness(tour)
+
+        improved = local_search.improve(tour, score)
+
+        assert sorted(tour) == list(range(N_CITIES))
+        assert improved == pytest.approx(fitness.calc_fitness(tour))
+        assert improved < score
+
+
+@pytest.mark.parametrize('max_steps', [1, 5, 25])
+def test_improve_stops_after_max_steps(distance_matrix, max_steps):
+    fitness = Fitness(distance_matrix)
+    local_search = LocalSearch(distance_matrix, 8)
+    tour = np.random.default_rng(2).permutation(N_CITIES)
+    score = fitness.calc_fitness(tour)
+    unbounded = local_search.improve(tour.copy(), score)
+
+    improved = local_search.improve(tour, score, max_steps=max_steps)
+
+    assert improved == pytest.approx(fitness.calc_fitness(tour))
+    assert unbounded <= improved < score
+
+
+def test_nearest_neighbours_match_a_full_sort(distance_matrix):
+    neighbours, neighbour_distances = LocalSearch.nearest_neighbours(distance_matrix, 5, block_size=7)
+
+    for city in range(N_CITIES):
+        expected = [other for other in np.argsort(distance_matrix[city]) if other != city][:5]
+        assert neighbours[city] == expected
+        np.testing.assert_allclose(neighbour_distances[city], distance_matrix[city, expected])
+
+
+def test_for_matrix_reuses_the_candidate_lists(distance_matrix):
+    assert LocalSearch.for_matrix(distance_matrix, 6) is LocalSearch.for_matrix(distance_matrix, 6)
+    assert LocalSearch.for_matrix(distance_matrix, 6) is not LocalSearch.for_matrix(distance_matrix.copy(), 6)
@@ -0,0 +1,28 @@
+import sys
+
+import pytest
+
+from main import parse_args
+
+
+@pytest.mark.parametrize('argv', [
+    ['--engine', 'generational', '--mutation', 'two_opt'],
+    ['--elite', '0'],
+    ['--tune', '--islands', '2'],
+    ['--tune', '--profile-trial', '1', '1'],
+    ['--engine', 'stacked', '--islands', '2'],
+    ['--engine', 'stacked', '--crossover-points', '2', 'erx']
+])
+def test_parse_args_rejects_conflicting_options(monkeypatch, argv):
+    monkeypatch.setattr(sys, 'argv', ['main.py'] + argv)
+
+    with pytest.raises(SystemExit):
+        parse_args()
+
+
+def test_parse_args_accepts_a_race(monkeypatch):
+    monkeypatch.setattr(sys, 'argv', ['main.py', '--tune', '--eta', '2'])
+
+    args = parse_args()
+
+    assert args.tune and args.eta == 2
@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from Classes.Fitness import Fitness
+from Classes.Mutation import Mutation
+from Classes.RandomStream import RandomStream
+
+N_CITIES = 15
+
+
+@pytest.fixture
+def distance_matrix():
+    coords = np.random.default_rng(0).random((N_CITIES, 2)) * 100
+    return np.sqrt(((coords[:, None] - coords[None]) ** 2).sum(axis=-1))
+
+
+def check_delta(distance_matrix, tour, move):
+    fitness = Fitness(distance_matrix)
+    before = fitness.calc_fitness(tour)
+    delta = move(tour)
+    assert sorted(tour) == list(range(N_CITIES))
+    assert fitness.calc_fitness(tour) == pytest.approx(before + delta)
+
+
+def test_swap_move_delta_matches_full_evaluation(distance_matrix):
+    tour = np.random.default_rng(1).permutation(N_CITIES)
+    # Every pair of positions, including neighbours and the pair around the end of the tour
+    for i in range(N_CITIES):
+        for j in range(N_CITIES):
+            if i != j:
+                check_delta(distance_matrix, tour, lambda t: Mutation.swap_move(t, i, j, distance_matrix))
+
+
+def test_two_opt_move_delta_matches_full_evaluation(distance_matrix):
+    tour = np.random.default_rng(2).permutation(N_CITIES)
+    for i in range(N_CITIES):
+        for j in range(i + 1, N_CITIES):
+            check_delta(distance_matrix, tour, lambda t: Mutation.two_opt_move(t, i, j, distance_matrix))
+
+
+def test_or_opt_move_delta_matches_full_evaluation(distance_matrix):
+    tour = np.random.default_rng(3).permutation(N_CITIES)
+    for seg_len in (1, 2, 3):
+        for i in range(N_CITIES - seg_len + 1):
+            for k in range(N_CITIES - seg_len):
+                check_delta(distance_matrix, tour, lambda t: Mutation.or_opt_move(t, i, seg_len, k, distance_matrix))
+
+
+@pytest.mark.parametrize('operator', ['swap', 'two_opt', 'or_opt'])
+def test_random_move_delta_matches_full_evaluation(distance_matrix, operator):
+    rng = RandomStream(4)
+    tour = rng.permutation(N_CITIES)
+    for _ in range(200):
+        check_delta(distance_matrix, tour, lambda t: Mutation.random_move(t, operator, distance_matrix, rng))
+
+
+def test_swap_mutation_batch_keeps_permutations():
+    rng = RandomStream(0)
+    children = rng.permuted(np.tile(np.arange(N_CITIES), (40, 1)), axis=1)
+    before = children.copy()
+
+    Mutation.swap_mutation_batch(children, 0.5, 2, rng)
+
+    np.testing.assert_array_equal(np.sort(children, axis=1), np.sort(before, axis=1))
+    # Every mutated child differs from its parent in two to four positions
+    changed = (children != before).sum(axis=1)
+    assert set(changed.tolist()) <= {0, 2, 3, 4}
+    assert changed.any()
+
+
+def test_swap_mutation_batch_without_mutation_keeps_children():
+    rng = RandomStream(1)
+    children = rng.permuted(np.tile(np.arange(N_CITIES), (10, 1)), axis=1)
+    before = children.copy()
+
+    Mutation.swap_mutation_batch(children, 0.0, 3, rng)
+
+    np.testing.assert_array_equal(children, before)
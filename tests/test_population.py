@@ -0,0 +1,157 @@
+import numpy as np
+import pytest
+
+from Classes.Population import Population
+from Classes.RandomStream import RandomStream
+
+N_CITIES = 12
+N_POP = 20
+
+
+@pytest.fixture
+def distance_matrix():
+    coords = np.random.default_rng(0).random((N_CITIES, 2)) * 100
+    return np.rint(np.sqrt(((coords[:, None] - coords[None]) ** 2).sum(axis=-1)))
+
+
+def random_tours(n_tours: int, seed: int) -> np.ndarray:
+    generator = np.random.default_rng(seed)
+    return generator.permuted(np.broadcast_to(np.arange(N_CITIES), (n_tours, N_CITIES)), axis=1)
+
+
+def make_population(distance_matrix, seed: int = 1, **options) -> Population:
+    pop = Population(random_tours(N_POP, seed), distance_matrix, **options)
+    pop.evaluate()
+    return pop
+
+
+def assert_invariants(pop: Population) -> None:
+    np.testing.assert_array_equal(pop.scores, pop.calc_fitness_batch(pop.population))
+    # The heaps give a best and worst slot holding the extreme scores
+    assert pop.scores[pop.best_ind] == pop.best_score == pop.scores.min()
+    assert pop.scores[pop.worst_ind] == pop.worst_score == pop.scores.max()
+    np.testing.assert_array_equal(pop.best_sol, pop.population[pop.best_ind])
+    np.testing.assert_array_equal(pop.worst_sol, pop.population[pop.worst_ind])
+
+
+def test_population_is_stored_compact_with_scratch_rows(distance_matrix):
+    pop = Population(random_tours(N_POP, 1), distance_matrix, n_offspring=6)
+
+    assert pop.population.dtype == np.uint16
+    assert pop.population.base is pop.buffer and pop.offspring.base is pop.buffer
+    assert pop.offspring.shape == (6, N_CITIES)
+
+
+@pytest.mark.parametrize('options', [{}, {'unique': True}, {'memo_size': 10}])
+def test_replacement_keeps_invariants(distance_matrix, options):
+    pop = make_population(distance_matrix, **options)
+    assert_invariants(pop)
+    for tour in random_tours(300, 2):
+        worst_before = pop.worst_score
+        pop.replacement(tour)
+        assert pop.worst_score <= worst_before
+        assert_invariants(pop)
+
+
+def test_replacement_takes_the_worst_slot(distance_matrix):
+    pop = make_population(distance_matrix)
+    worst_ind = pop.worst_ind
+    child = pop.population[pop.best_ind].copy()
+
+    pop.replacement(child)
+
+    np.testing.assert_array_equal(pop.population[worst_ind], child)
+    assert_invariants(pop)
+
+
+def test_replace_batch_keeps_the_best_of_both(distance_matrix):
+    pop = make_population(distance_matrix)
+    for children in random_tours(300, 3).reshape(15, N_POP, N_CITIES):
+        merged = np.sort(np.concatenate([pop.scores, pop.calc_fitness_batch(children)]))[:N_POP]
+        pop.replace_batch(children)
+        np.testing.assert_array_equal(np.sort(pop.scores), merged)
+        assert_invariants(pop)
+
+
+@pytest.mark.parametrize('options', [{'unique': True}, {'memo_size': 10}])
+def test_replace_batch_with_keys_keeps_invariants(distance_matrix, options):
+    pop = make_population(distance_matrix, **options)
+    for children in random_tours(300, 3).reshape(15, N_POP, N_CITIES):
+        worst_before = pop.worst_score
+        accepted = pop.replace_batch(children)
+        assert 0 <= accepted <= N_POP
+        assert pop.worst_score <= worst_before
+        assert_invariants(pop)
+
+
+def test_canonical_key_ignores_rotation_direction_and_dtype():
+    tour = random_tours(1, 6)[0]
+    key = Population.canonical_key(tour)
+
+    assert Population.canonical_key(np.roll(tour, 4)) == key
+    assert Population.canonical_key(tour[::-1].copy()) == key
+    assert Population.canonical_key(tour.astype(np.int64)) == key
+    assert Population.canonical_keys(np.stack([tour, np.roll(tour, 3)[::-1]])) == [key, key]
+    assert Population.canonical_key(random_tours(1, 7)[0]) != key
+
+
+def test_unique_rejects_rotations_and_reversals(distance_matrix):
+    pop = make_population(distance_matrix, unique=True)
+    tour = pop.population[pop.best_ind].copy()
+
+    assert not pop.replacement(np.roll(tour, 5))
+    assert not pop.replacement(tour[::-1].copy())
+    assert pop.rejected == 2
+    assert_invariants(pop)
+
+
+def test_find_without_index(distance_matrix):
+    pop = make_population(distance_matrix)
+    slot = pop.worst_ind
+
+    assert not pop.keyed
+    assert pop.find(np.roll(pop.population[slot], 3)[::-1].copy()) is not None
+    assert pop.find(random_tours(1, 8)[0]) is None
+
+
+def test_memo_counts_only_memo_lookups(distance_matrix):
+    pop = make_population(distance_matrix, memo_size=100)
+    # A tour of the population is found in the population, not in the memo
+    pop.score(pop.population[0].copy())
+    assert (pop.population_hits, pop.memo_hits) == (1, 0)
+
+    tour = random_tours(1, 5)[0]
+    score = pop.score(tour)
+    assert pop.score(np.roll(tour, 2)) == score
+    assert (pop.population_hits, pop.memo_hits) == (1, 1)
+
+
+def test_restart_keeps_the_elite(distance_matrix):
+    pop = make_population(distance_matrix)
+    elite = pop.population[np.argsort(pop.scores, kind='stable')[:3]].copy()
+
+    pop.restart(3, RandomStream(1))
+
+    for tour in elite:
+        assert any((row == tour).all() for row in pop.population)
+    assert pop.best_score == pop.calc_fitness(elite[0])
+    assert_invariants(pop)
+    with pytest.raises(ValueError):
+        pop.restart(0, RandomStream(1))
+
+
+def test_state_round_trip(distance_matrix):
+    pop = make_population(distance_matrix, memo_size=30, unique=True)
+    for tour in random_tours(100, 9):
+        pop.replacement(tour)
+    state = pop.get_state()
+
+    resumed = make_population(distance_matrix, seed=2, memo_size=30, unique=True)
+    resumed.set_state(state)
+
+    np.testing.assert_array_equal(resumed.population, pop.population)
+    assert list(resumed.memo.items()) == list(pop.memo.items())
+    assert (resumed.memo_hits, resumed.rejected, resumed.population_hits) == \
+        (pop.memo_hits, pop.rejected, pop.population_hits)
+    assert_invariants(resumed)
+    assert resumed.find(pop.population[3]) is not None
@@ -0,0 +1,40 @@
+import numpy as np
+
+from Classes.RandomStream import RandomStream
+
+
+def test_same_seed_gives_the_same_draws():
+    streams = [RandomStream(3, block_size=16), RandomStream(3, block_size=16)]
+    draws = [
+        [stream.random() for _ in range(40)] + [stream.integers(2, 9) for _ in range(40)] + stream.random(5).tolist()
+        for stream in streams
+    ]
+
+    assert draws[0] == draws[1]
+
+
+def test_scalar_integers_stay_in_range():
+    rng = RandomStream(4, block_size=64)
+    draws = [rng.integers(3, 8) for _ in range(2000)]
+
+    assert set(draws) == {3, 4, 5, 6, 7}
+    assert all(0 <= rng.integers(5) < 5 for _ in range(200))
+
+
+def test_pair_draws_two_different_integers():
+    rng = RandomStream(5)
+    for _ in range(1000):
+        i, j = rng.pair(4)
+        assert i != j and 0 <= i < 4 and 0 <= j < 4
+
+
+def test_state_round_trip_continues_the_stream():
+    rng = RandomStream(6, block_size=16)
+    [rng.random() for _ in range(10)]
+    state = rng.get_state()
+    expected = [rng.random() for _ in range(30)]
+
+    resumed = RandomStream(0, block_size=16)
+    resumed.set_state(state)
+
+    assert [resumed.random() for _ in range(30)] == expected
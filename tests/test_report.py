@@ -0,0 +1,37 @@
+import sys
+
+import numpy as np
+
+from report import write_report
+from results import save_convergence_history
+from sweep import run_sweep
+
+
+def test_report_plots_every_stored_trial_once(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    group_dir = tmp_path / 'experiments/test/group_1'
+    group_dir.mkdir(parents=True)
+    for trial in (1, 2):
+        history = {'starts': np.array([0, 1]), 'values': np.array([30.0, 25.0]), 'length': 3}
+        save_convergence_history(str(group_dir / f'convergence_{trial}.npz'), history)
+    distance_matrix = np.array([[0, 3], [3, 0]])
+
+    write_report('test', distance_matrix)
+    write_report('test', distance_matrix)
+
+    assert capsys.readouterr().out.split('\n')[:2] == ['2 convergence curves plotted', '0 convergence curves plotted']
+    assert (group_dir / 'convergence_curve_2.png').exists()
+    assert (tmp_path / 'experiments/test/distance matrix.txt').read_text().count('3') >= 2
+
+
+def test_sweep_does_not_load_the_plotting_libraries(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    for name in [name for name in sys.modules if name.split('.')[0] in ('matplotlib', 'prettytable', 'report')]:
+        monkeypatch.delitem(sys.modules, name)
+    coords = np.random.default_rng(0).random((8, 2)) * 100
+    distance_matrix = np.rint(np.sqrt(((coords[:, None] - coords[None]) ** 2).sum(axis=-1)))
+
+    run_sweep('test', distance_matrix, [(10, 2, 1, 0.8, 1, 0.1)], 1, 20, n_workers=1)
+
+    assert 'matplotlib' not in sys.modules and 'prettytable' not in sys.modules
+    assert not list((tmp_path / 'experiments/test/group_1').glob('*.png'))
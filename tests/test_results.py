@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from Classes.ConvergenceRecorder import ConvergenceRecorder
+from results import (ResultWriter, expand_convergence_history, read_convergence_history, read_log,
+                     save_convergence_history, write_trial)
+
+
+def test_convergence_history_round_trip(tmp_path):
+    best_scores = [50.0, 50.0, 42.0, 42.0, 42.0, 40.5, 40.5]
+    recorder = ConvergenceRecorder()
+    for best_score in best_scores:
+        recorder.record(best_score)
+    history_file_path = str(tmp_path / 'convergence_1.npz')
+
+    save_convergence_history(history_file_path, recorder.history())
+
+    history = read_convergence_history(history_file_path)
+    assert history['starts'].tolist() == [0, 2, 5]
+    assert history['length'] == 7
+    np.testing.assert_array_equal(expand_convergence_history(history), best_scores)
+
+
+def test_writer_stores_trials_in_submission_order(tmp_path):
+    group_dir = str(tmp_path / 'group_1')
+    with ResultWriter() as writer:
+        for trial in (2, 1):
+            history = {'starts': np.array([0, 1]), 'values': np.array([12.0, 10.0]) * trial, 'length': 2}
+            result = {'Best Final Distance': 10.0 * trial, 'Best Scores': history,
+                      'Metrics': {'evaluations': trial}}
+            writer.submit(write_trial, group_dir, trial, result)
+        writer.flush()
+        header, rows = read_log(f'{group_dir}/trials_log.csv')
+
+    assert header == ['', 'Best Final Distance']
+    assert rows == [['2', '20.0'], ['1', '10.0']]
+    assert read_log(f'{group_dir}/metrics_log.csv')[1] == [['2', '2'], ['1', '1']]
+    history = read_convergence_history(f'{group_dir}/convergence_1.npz')
+    np.testing.assert_array_equal(expand_convergence_history(history), [12.0, 10.0])
+
+
+def test_writer_raises_the_error_of_a_failed_write(tmp_path):
+    def fail():
+        raise OSError('disk full')
+
+    writer = ResultWriter()
+    writer.submit(fail)
+
+    with pytest.raises(OSError):
+        writer.flush()
+    writer.close()
@@ -0,0 +1,73 @@
+import json
+import asyncio
+
+import numpy as np
+import pytest
+
+from service import SolverService
+
+PARAMS_GROUP = [12, 2, 'ox', 0.9, 1, 0.2]
+
+
+@pytest.fixture
+def instance_path(tmp_path):
+    coords = np.random.default_rng(0).random((15, 2)) * 100
+    path = tmp_path / 'instance.tsp'
+    path.write_text('\n'.join([
+        'NAME : instance',
+        'TYPE : TSP',
+        'DIMENSION : 15',
+        'EDGE_WEIGHT_TYPE : EUC_2D',
+        'NODE_COORD_SECTION',
+        *(f'{city} {x:.3f} {y:.3f}' for city, (x, y) in enumerate(coords, 1)),
+        'EOF'
+    ]))
+    return str(path)
+
+
+async def exchange(service: SolverService, socket_path: str, requests: list, n_final: int) -> list:
+    server_task = asyncio.ensure_future(service.serve(socket_path=socket_path))
+    while not server_task.done():
+        try:
+            reader, writer = await asyncio.open_unix_connection(socket_path)
+            break
+        except (FileNotFoundError, ConnectionRefusedError):
+            await asyncio.sleep(0.05)
+    for request in requests:
+        writer.write(request.encode() + b'\n')
+    await writer.drain()
+    events = []
+    # Results, errors and the status answer end a request
+    while sum(event['event'] in ('result', 'error', 'status') for event in events) < n_final:
+        events.append(json.loads(await asyncio.wait_for(reader.readline(), 60)))
+    writer.close()
+    server_task.cancel()
+    await asyncio.gather(server_task, return_exceptions=True)
+    return events
+
+
+@pytest.mark.parametrize('distances', ['matrix', 'coordinates'])
+def test_service_streams_progress_and_results(tmp_path, instance_path, distances):
+    service = SolverService(n_workers=2, cache_dir=str(tmp_path / 'cache'))
+    solve = {'instance': instance_path, 'params': PARAMS_GROUP, 'iterations': 300, 'seed': 4,
+             'distances': distances, 'progress_interval': 0}
+    requests = [
+        json.dumps(dict(solve, op='solve')),
+        json.dumps(dict(solve, seed=5)),
+        '{"op": "status"}',
+        'not json',
+        json.dumps({'instance': instance_path, 'params': PARAMS_GROUP, 'options': {'threads': 2}})
+    ]
+
+    events = asyncio.run(exchange(service, str(tmp_path / 'service.sock'), requests, 5))
+
+    results = {event['job']: event['trial'] for event in events if event['event'] == 'result'}
+    assert len(results) == 2
+    assert sum(event['event'] == 'error' for event in events) == 2
+    status = next(event for event in events if event['event'] == 'status')
+    assert len(status['instances']) == 1
+    for job, trial in results.items():
+        progress = [event for event in events if event['event'] == 'progress' and event['job'] == job]
+        assert progress and progress[-1]['best_distance'] >= trial['Best Final Distance']
+        assert sorted(progress[-1]['best_solution']) == list(range(1, 16))
+        assert sorted(trial['Best Final Solution']) == list(range(1, 16))
@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+
+from Classes.Fitness import Fitness
+from Classes.RandomStream import StackedRandomStream
+from ea import run_trial
+from results import expand_convergence_history, read_log
+from stacked import check_stacked_options, run_stacked_trials
+from sweep import run_sweep, trial_seed
+
+N_CITIES = 20
+
+
+@pytest.fixture
+def distance_matrix():
+    coords = np.random.default_rng(0).random((N_CITIES, 2)) * 100
+    return np.rint(np.sqrt(((coords[:, None] - coords[None]) ** 2).sum(axis=-1)))
+
+
+def test_fitness_of_a_3d_stack_matches_every_2d_slice(distance_matrix):
+    fitness = Fitness(distance_matrix)
+    tours = np.argsort(np.random.default_rng(1).random((3, 5, N_CITIES)), axis=2)
+
+    scores = fitness.calc_fitness_batch(tours)
+
+    assert scores.shape == (3, 5)
+    for t in range(3):
+        np.testing.assert_array_equal(scores[t], fitness.calc_fitness_batch(tours[t]))
+
+
+def test_stacked_stream_does_not_depend_on_its_blocks_or_neighbours():
+    draws = []
+    for seeds, block_size in (([7, 8], 5), ([3, 7], 64), ([7], 4096)):
+        stream = StackedRandomStream(seeds, block_size)
+        trial = seeds.index(7)
+        draws.append(np.concatenate([stream.random(3)[trial], stream.random((2, 4))[trial].ravel(),
+                                     stream.random(9)[trial]]))
+
+    np.testing.assert_array_equal(draws[0], draws[1])
+    np.testing.assert_array_equal(draws[0], draws[2])
+
+
+@pytest.mark.parametrize('num_points', [2, 'ox', 'pmx'])
+def test_stacked_trials_are_independent(distance_matrix, num_points):
+    params_group = (16, 3, num_points, 0.9, 2, 0.3)
+    stack = run_stacked_trials(distance_matrix, params_group, [11, 12, 13], 120, n_pairs=5)
+    # The same seed gives the same trial alone, or stacked at another position with other trials
+    alone = run_trial(distance_matrix, params_group, 12, 120, engine='stacked', n_pairs=5)
+    reordered = run_stacked_trials(distance_matrix, params_group, [12, 99], 120, n_pairs=5)
+
+    for trial in (alone, reordered[0]):
+        np.testing.assert_array_equal(expand_convergence_history(trial['Best Scores']),
+                                      expand_convergence_history(stack[1]['Best Scores']))
+        np.testing.assert_array_equal(trial['Best Final Solution'], stack[1]['Best Final Solution'])
+    assert not np.array_equal(expand_convergence_history(stack[0]['Best Scores']),
+                              expand_convergence_history(stack[1]['Best Scores']))
+    for trial in stack:
+        best_scores = expand_convergence_history(trial['Best Scores'])
+        assert len(best_scores) == 120
+        assert (np.diff(best_scores) <= 0).all()
+        assert sorted(trial['Best Final Solution']) == list(range(1, N_CITIES + 1))
+        assert trial['Best Final Distance'] == Fitness(distance_matrix).calc_fitness(trial['Best Final Solution'] - 1)
+
+
+@pytest.mark.parametrize('trial_options, params', [
+    ({'mutation_operator': 'two_opt'}, []),
+    ({'memo_size': 10}, []),
+    ({'stopping_options': {'stagnation': 100}}, []),
+    ({'stopping_options': {'restarts': 1}}, []),
+    ({}, [(16, 3, 'erx', 0.9, 1, 0.3)])
+])
+def test_unsupported_options_are_rejected(trial_options, params):
+    with pytest.raises(ValueError):
+        check_stacked_options(trial_options, params)
+
+
+def test_default_options_are_accepted():
+    check_stacked_options({'mutation_operator': 'swap', 'memo_size': 0, 'stopping_options': {
+        'stagnation': None, 'tolerance': 0.0, 'restarts': 0, 'elite': 1
+    }}, [(16, 3, 'pmx', 0.9, 1, 0.3)])
+
+
+def test_stacked_sweep_matches_single_trials(distance_matrix, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    params = [(10, 2, 1, 0.8, 1, 0.1), (12, 3, 'ox', 0.9, 1, 0.2)]
+
+    run_sweep('test', distance_matrix, params, 3, 30, n_workers=2, trial_options={'engine': 'stacked'})
+
+    for group, params_group in enumerate(params, 1):
+        header, rows = read_log(f'experiments/test/group_{group}/trials_log.csv')
+        assert [row[0] for row in rows] == ['1', '2', '3']
+        column = header.index('Best Final Distance')
+        assert [float(row[column]) for row in rows] == [
+            run_trial(distance_matrix, params_group, trial_seed(0, group, trial), 30,
+                      engine='stacked')['Best Final Distance']
+            for trial in (1, 2, 3)
+        ]
@@ -0,0 +1,34 @@
+import numpy as np
+
+from results import read_log
+from sweep import run_sweep, trial_seed
+
+PARAMS = [(10, 2, 1, 0.8, 1, 0.1), (12, 3, 2, 0.9, 1, 0.2)]
+
+
+def distance_matrix():
+    coords = np.random.default_rng(0).random((8, 2)) * 100
+    return np.rint(np.sqrt(((coords[:, None] - coords[None]) ** 2).sum(axis=-1)))
+
+
+def test_trial_seeds_are_distinct_and_stable():
+    seeds = {trial_seed(0, group, trial) for group in range(1, 6) for trial in range(1, 11)}
+
+    assert len(seeds) == 50
+    assert trial_seed(3, 2, 7) == trial_seed(3, 2, 7) != trial_seed(4, 2, 7)
+
+
+def test_sweep_resumes_without_running_finished_trials(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    run_sweep('test', distance_matrix(), PARAMS, 2, 20, n_workers=2)
+    first = {group: read_log(f'experiments/test/group_{group}/trials_log.csv') for group in (1, 2)}
+
+    # A longer sweep only runs the trials that have no row yet
+    run_sweep('test', distance_matrix(), PARAMS, 3, 20, n_workers=2)
+
+    for group in (1, 2):
+        header, rows = read_log(f'experiments/test/group_{group}/trials_log.csv')
+        assert [row[0] for row in rows] == ['1', '2', '3']
+        assert (header, rows[:2]) == first[group]
+        assert (tmp_path / f'experiments/test/group_{group}/convergence_3.npz').exists()
+        assert (tmp_path / f'experiments/test/group_{group}/parameters.txt').read_text().count('Dataset') == 1
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from Classes.Termination import EvaluationBudget, MaxIterations, Stagnation, TargetScore, Termination
+from ea import run_trial
+from results import expand_convergence_history
+
+PARAMS_GROUP = (20, 3, 2, 0.9, 1, 0.3)
+
+
+@pytest.fixture
+def distance_matrix():
+    coords = np.random.default_rng(0).random((25, 2)) * 100
+    return np.rint(np.sqrt(((coords[:, None] - coords[None]) ** 2).sum(axis=-1)))
+
+
+def test_evaluation_budget_never_overruns():
+    budget = EvaluationBudget(11)
+
+    assert not budget.check(4, 0.0)
+    # A sixth pair would spend 12 evaluations
+    assert budget.check(5, 0.0)
+    assert budget.iterations_left(3) == 2
+
+
+def test_stagnation_counts_only_improvements_beyond_the_tolerance():
+    stagnation = Stagnation(3, tolerance=1.0)
+    stagnation.start(0, 100.0)
+
+    assert not stagnation.check(2, 99.5)
+    assert stagnation.check(3, 99.5)
+    stagnation.restart(3, 99.5)
+    assert not stagnation.check(5, 90.0)
+    assert stagnation.check(8, 90.0)
+
+
+def test_termination_reports_the_first_criterion():
+    stopping = Termination([MaxIterations(10), TargetScore(50.0), EvaluationBudget(8)])
+    stopping.start(100.0)
+
+    assert stopping.check(2, 60.0) is None
+    assert stopping.check(2, 50.0) == 'target'
+    assert stopping.check(10, 60.0) == 'iterations'
+    assert stopping.iterations_left(1) == 3
+
+
+@pytest.mark.parametrize('engine', ['steady', 'generational'])
+def test_trial_stops_within_the_evaluation_budget(distance_matrix, engine):
+    trial = run_trial(distance_matrix, PARAMS_GROUP, 1, 1000, engine=engine, n_pairs=7,
+                      stopping_options={'max_evaluations': 101}, instrument=True)
+
+    assert trial['Stopped By'] == 'evaluations'
+    assert trial['Iterations'] == len(expand_convergence_history(trial['Best Scores'])) == 50
+    assert trial['Metrics']['offered'] == 100
+
+
+def test_stagnating_trial_restarts_around_its_elite(distance_matrix):
+    trial = run_trial(distance_matrix, PARAMS_GROUP, 1, 5000,
+                      stopping_options={'stagnation': 100, 'restarts': 2, 'elite': 3})
+
+    assert trial['Stopped By'] == 'stagnation'
+    assert trial['Restarts'] == 2
+    # The restarts keep the best solution, so the best score never gets worse
+    assert (np.diff(expand_convergence_history(trial['Best Scores'])) <= 0).all()
+
+
+def test_restart_needs_an_elite(distance_matrix):
+    with pytest.raises(ValueError):
+        run_trial(distance_matrix, PARAMS_GROUP, 1, 100, stopping_options={'restarts': 1, 'elite': 0})
@@ -0,0 +1,42 @@
+import numpy as np
+
+from Classes.RandomStream import RandomStream
+from Classes.TournamentSelection import TournamentSelection
+
+
+def test_parents_are_different_rows():
+    rng = RandomStream(0)
+    scores = rng.random(10)
+    for _ in range(500):
+        parent1_idx, parent2_idx = TournamentSelection.select_parent_indices(scores, 3, rng)
+        assert 0 <= parent1_idx < 10 and 0 <= parent2_idx < 10
+        assert parent1_idx != parent2_idx
+
+
+def test_second_parent_skips_the_first_one():
+    rng = RandomStream(1)
+    for _ in range(100):
+        # Of two rows, the second parent is always the row the first parent is not
+        assert sorted(TournamentSelection.select_parent_indices(np.array([1.0, 2.0]), 2, rng)) == [0, 1]
+
+
+def test_better_scores_win_more_tournaments():
+    rng = RandomStream(2)
+    scores = np.arange(20, dtype=np.float64)
+    wins = np.zeros(20)
+    for _ in range(2000):
+        wins[TournamentSelection.select_parent_indices(scores, 5, rng)[0]] += 1
+
+    # The best row wins every tournament it enters, the worst one wins only the tournaments it fills alone
+    assert wins[0] > wins[10] > wins[19]
+
+
+def test_batch_pairs_are_different_rows():
+    rng = RandomStream(3)
+    scores = rng.random(10)
+
+    parents1_idx, parents2_idx = TournamentSelection.select_parent_indices_batch(scores, 500, 3, rng)
+
+    assert parents1_idx.shape == parents2_idx.shape == (500,)
+    assert (parents1_idx != parents2_idx).all()
+    assert ((0 <= parents2_idx) & (parents2_idx < 10)).all()
@@ -0,0 +1,40 @@
+import numpy as np
+
+from results import read_log
+from tuning import race_budgets, run_race
+
+PARAMS = [(10, 2, 1, 0.8, 1, 0.1), (12, 3, 2, 0.9, 1, 0.2), (8, 2, 1, 0.6, 1, 0.05), (10, 3, 2, 0.95, 2, 0.1)]
+
+
+def distance_matrix():
+    coords = np.random.default_rng(0).random((10, 2)) * 100
+    return np.rint(np.sqrt(((coords[:, None] - coords[None]) ** 2).sum(axis=-1)))
+
+
+def test_race_budgets_grow_by_eta_up_to_the_termination():
+    assert race_budgets(10000, 500, 3) == [500, 1500, 4500, 10000]
+    assert race_budgets(100, 100, 3) == [100]
+
+
+def test_race_keeps_the_best_groups_and_resumes(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    best_group = run_race('test', distance_matrix(), PARAMS, 2, 40, n_workers=2, eta=2, min_iterations=20, seeds=2)
+
+    header, rows = read_log('experiments/test/tuning/race_log.csv')
+    race_log = [dict(zip(header, row)) for row in rows]
+    first_round = [row for row in race_log if row['Round'] == '1']
+    last_round = [row for row in race_log if row['Round'] == '2']
+    survivors = sorted(row['Group'] for row in first_round if row['Survived'] == 'True')
+    assert len(first_round) == 4 and len(survivors) == 2
+    assert sorted(row['Group'] for row in last_round) == survivors
+    assert best_group == int(next(row['Group'] for row in last_round if row['Rank'] == '1'))
+    # Survivors have their race trials and then the full trials of the last round
+    log_file_path = f'experiments/test/tuning/group_{best_group}/trials_log.csv'
+    header, rows = read_log(log_file_path)
+    assert [row[0] for row in rows] == ['1', '2', '3', '4']
+    assert [row[header.index('Budget')] for row in rows] == ['20', '20', '40', '40']
+
+    # Every trial is logged, so racing again gives the same result without running a trial
+    assert run_race('test', distance_matrix(), PARAMS, 2, 40, n_workers=2, eta=2, min_iterations=20,
+                    seeds=2) == best_group
+    assert read_log(log_file_path) == (header, rows)
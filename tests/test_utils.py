@@ -0,0 +1,122 @@
+import numpy as np
+import pytest
+
+from utils import compact_distance_matrix, load_cached_distance_matrix, read_tsplib, read_xml, tour_dtype
+
+N_CITIES = 7
+
+
+def symmetric_matrix() -> np.ndarray:
+    upper = np.triu(np.random.default_rng(0).integers(1, 1000, (N_CITIES, N_CITIES)), 1)
+    return (upper + upper.T).astype(np.float64)
+
+
+# Order in which TSPLIB lists the entries of every EDGE_WEIGHT_FORMAT, as (row, column) pairs
+EXPLICIT_ORDERS = {
+    'FULL_MATRIX': [(i, j) for i in range(N_CITIES) for j in range(N_CITIES)],
+    'UPPER_ROW': [(i, j) for i in range(N_CITIES) for j in range(i + 1, N_CITIES)],
+    'LOWER_ROW': [(i, j) for i in range(N_CITIES) for j in range(i)],
+    'UPPER_DIAG_ROW': [(i, j) for i in range(N_CITIES) for j in range(i, N_CITIES)],
+    'LOWER_DIAG_ROW': [(i, j) for i in range(N_CITIES) for j in range(i + 1)],
+    'UPPER_COL': [(i, j) for j in range(N_CITIES) for i in range(j)],
+    'LOWER_COL': [(i, j) for j in range(N_CITIES) for i in range(j + 1, N_CITIES)],
+    'UPPER_DIAG_COL': [(i, j) for j in range(N_CITIES) for i in range(j + 1)],
+    'LOWER_DIAG_COL': [(i, j) for j in range(N_CITIES) for i in range(j, N_CITIES)],
+}
+
+
+@pytest.mark.parametrize('edge_weight_format', sorted(EXPLICIT_ORDERS))
+def test_read_tsplib_explicit_layouts(tmp_path, edge_weight_format):
+    distance_matrix = symmetric_matrix()
+    values = [f'{distance_matrix[i, j]:.0f}' for i, j in EXPLICIT_ORDERS[edge_weight_format]]
+    # Lines of 5 values do not line up with the rows, so rows are split across lines
+    lines = [' '.join(values[k:k + 5]) for k in range(0, len(values), 5)]
+    path = tmp_path / 'explicit.tsp'
+    path.write_text('\n'.join([
+        'NAME : explicit',
+        'TYPE : TSP',
+        f'DIMENSION : {N_CITIES}',
+        'EDGE_WEIGHT_TYPE : EXPLICIT',
+        f'EDGE_WEIGHT_FORMAT : {edge_weight_format}',
+        'EDGE_WEIGHT_SECTION',
+        *lines,
+        'EOF'
+    ]))
+
+    np.testing.assert_array_equal(read_tsplib(str(path)), distance_matrix)
+
+
+@pytest.mark.parametrize('edge_weight_type, expected', [
+    ('EUC_2D', [[0, 5, 10], [5, 0, 5], [10, 5, 0]]),
+    ('CEIL_2D', [[0, 5, 10], [5, 0, 5], [10, 5, 0]]),
+    ('ATT', [[0, 2, 4], [2, 0, 2], [4, 2, 0]]),
+])
+def test_read_tsplib_coordinates(tmp_path, edge_weight_type, expected):
+    path = tmp_path / 'coordinates.tsp'
+    path.write_text('\n'.join([
+        'NAME : coordinates',
+        'TYPE : TSP',
+        'DIMENSION : 3',
+        f'EDGE_WEIGHT_TYPE : {edge_weight_type}',
+        'NODE_COORD_SECTION',
+        '1 0 0',
+        '2 3 4',
+        '3 6 8',
+        'EOF'
+    ]))
+
+    np.testing.assert_array_equal(read_tsplib(str(path)), expected)
+
+
+def test_read_tsplib_casts_to_dtype(tmp_path):
+    path = tmp_path / 'explicit.tsp'
+    path.write_text('DIMENSION : 2\nEDGE_WEIGHT_TYPE : EXPLICIT\nEDGE_WEIGHT_FORMAT : FULL_MATRIX\n'
+                    'EDGE_WEIGHT_SECTION\n0 3\n3 0\nEOF\n')
+
+    distance_matrix = read_tsplib(str(path), np.int32)
+
+    assert distance_matrix.dtype == np.int32
+    np.testing.assert_array_equal(distance_matrix, [[0, 3], [3, 0]])
+
+
+def test_read_xml_streams_every_vertex(tmp_path):
+    distance_matrix = symmetric_matrix()
+    vertices = [
+        '<vertex>' + ''.join(
+            f'<edge cost="{distance_matrix[i, j]:.15e}">{j}</edge>' for j in range(N_CITIES) if j != i
+        ) + '</vertex>'
+        for i in range(N_CITIES)
+    ]
+    path = tmp_path / 'instance.xml'
+    path.write_text(f'<travellingSalesmanProblemInstance><graph>{"".join(vertices)}</graph>'
+                    '</travellingSalesmanProblemInstance>')
+
+    np.testing.assert_array_equal(read_xml(str(path)), distance_matrix)
+
+
+@pytest.mark.parametrize('scale, expected_dtype', [(1.0, np.int32), (0.5, np.float32)])
+def test_compact_distance_matrix(scale, expected_dtype):
+    # More rows than one block, so the cast runs block by block over the shared buffer
+    n_cities = 1500
+    distance_matrix = np.random.default_rng(1).integers(0, 10000, (n_cities, n_cities)) * scale
+    expected = distance_matrix.copy()
+
+    compact = compact_distance_matrix(distance_matrix)
+
+    assert compact.dtype == expected_dtype
+    np.testing.assert_array_equal(compact, expected.astype(expected_dtype))
+
+
+def test_cache_distance_matrix_compact_reads_rounded_instances_as_int32(tmp_path):
+    path = tmp_path / 'coordinates.tsp'
+    path.write_text('DIMENSION : 3\nEDGE_WEIGHT_TYPE : EUC_2D\nNODE_COORD_SECTION\n1 0 0\n2 3 4\n3 6 8\nEOF\n')
+
+    distance_matrix = load_cached_distance_matrix(str(path), 'compact', str(tmp_path / 'cache'))
+
+    assert distance_matrix.dtype == np.int32
+    np.testing.assert_array_equal(distance_matrix, [[0, 5, 10], [5, 0, 5], [10, 5, 0]])
+
+
+def test_tour_dtype_holds_every_city():
+    assert np.iinfo(tour_dtype(65535)).max >= 65534
+    assert np.iinfo(tour_dtype(70000)).max >= 69999
@@ -0,0 +1,163 @@
+import os
+import csv
+import math
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+
+from utils import append_text
+from sweep import trial_seed, format_parameters, _init_worker, _run_task
+from stacked import check_stacked_options
+from results import ResultWriter, read_log, write_trial, sort_trials_log
+
+"""
+Racing of the parameter grid by successive halving: every group starts on a small budget with a few seeds, only
+the best groups of each round go on to a larger budget, and the survivors of the last round get full trials
+"""
+
+
+def race_budgets(termination: int, min_iterations: int, eta: int) -> list:
+    """
+    Function to find the iteration budget of every round, growing by a factor eta up to the full termination
+    :param termination: int
+    :param min_iterations: int
+    :param eta: int
+    :return: budgets: list
+    """
+    budgets = []
+    budget = min_iterations
+    while budget < termination:
+        budgets.append(budget)
+        budget *= eta
+    budgets.append(termination)
+    return budgets
+
+
+def logged_scores(log_file_path: str) -> dict:
+    """
+    Function to read the best final distance of every trial already in a trials log
+    :param log_file_path: str
+    :return: scores: dict of distance by trial
+    """
+    if not os.path.exists(log_file_path):
+        return {}
+    header, rows = read_log(log_file_path)
+    column = header.index('Best Final Distance')
+    return {int(row[0]): float(row[column]) for row in rows}
+
+
+def write_race_log(log_file_path: str, race_rows: list) -> None:
+    """
+    Function to write the race log with the outcome of every group in every round so far
+    :param log_file_path: str
+    :param race_rows: list of dicts
+    :return: None
+    """
+    with open(log_file_path, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.DictWriter(file, fieldnames=list(race_rows[0]))
+        writer.writeheader()
+        writer.writerows(race_rows)
+
+
+def run_race(
+        country: str,
+        distance_matrix,
+        params: list,
+        no_of_experiments: int,
+        termination: int,
+        n_workers: int = None,
+        base_seed: int = 0,
+        trial_options: dict = None,
+        eta: int = 3,
+        min_iterations: int = 500,
+        seeds: int = 3
+) -> int:
+    """
+    Function to race the parameter groups by successive halving. Each round runs `seeds` trials of every surviving
+    group on the round's budget and keeps the best 1 / eta of them by mean best final distance; the last round
+    runs no_of_experiments full trials of the survivors. Trials are written to experiments/<country>/tuning/
+    group_N/ in the layout of the sweep, with the round and budget of every trial, and a race log lists the mean
+    of every group in every round. Trials already logged are read back instead of run again.
+    :param country: str
+    :param distance_matrix: ndarray, the path of a cached .npy matrix that every worker memory-maps, or a
+    CoordinateDistances provider that every worker gets a copy of
+    :param params: list of parameter groups
+    :param no_of_experiments: int, full trials of every group that survives to the last round
+    :param termination: int, budget of the last round
+    :param n_workers: int, defaults to the number of CPUs
+    :param base_seed: int
+    :param trial_options: dict of extra keyword arguments for run_trial, e.g. the engine
+    :param eta: int, a round keeps 1 / eta of its groups and the next round has eta times its budget
+    :param min_iterations: int, budget of the first round
+    :param seeds: int, trials of every group in the rounds before the last
+    :return: best group: int
+    """
+    params = list(params)
+    trial_options = trial_options or {}
+    if trial_options.get('engine') == 'stacked':
+        # Rejected before the first round instead of failing its first trial
+        check_stacked_options(trial_options, params)
+    tuning_dir = f'experiments/{country}/tuning'
+    budgets = race_budgets(termination, min_iterations, eta)
+    alive = list(range(1, len(params) + 1))
+    race_rows = []
+    first_trial = 1
+    # Imported here so the pool workers, which import the sweep module, never load it
+    from tqdm import tqdm
+
+    with ResultWriter() as writer, ProcessPoolExecutor(
+            max_workers=n_workers, initializer=_init_worker, initargs=(distance_matrix,)
+    ) as executor:
+        for round_num, budget in enumerate(budgets, 1):
+            last_round = round_num == len(budgets)
+            trials = range(first_trial, first_trial + (no_of_experiments if last_round else seeds))
+            scores = {param_group: {} for param_group in alive}
+            futures = {}
+            # The trials of the last round must be on disk before the logs are read for resuming
+            writer.flush()
+            for param_group in alive:
+                group_dir = f'{tuning_dir}/group_{param_group}'
+                parameters_file_path = f'{group_dir}/parameters.txt'
+                if not os.path.exists(parameters_file_path):
+                    append_text(parameters_file_path, format_parameters(country, params[param_group - 1]))
+                done = logged_scores(f'{group_dir}/trials_log.csv')
+                for trial in trials:
+                    if trial in done:
+                        scores[param_group][trial] = done[trial]
+                        continue
+                    seed = trial_seed(base_seed, param_group, trial)
+                    task_options = dict(trial_options)
+                    if trial_options.get('checkpoint_interval'):
+                        task_options['checkpoint_path'] = f'{group_dir}/checkpoint_trial_{trial}.npz'
+                    future = executor.submit(_run_task, params[param_group - 1], seed, budget, task_options)
+                    futures[future] = (param_group, trial)
+
+            for future in tqdm(as_completed(futures), total=len(futures), unit='trial',
+                               desc=f'Round {round_num}/{len(budgets)}, {len(alive)} groups, {budget} iterations'):
+                param_group, trial = futures[future]
+                result = future.result()
+                result['Round'], result['Budget'] = round_num, budget
+                scores[param_group][trial] = result['Best Final Distance']
+                writer.submit(write_trial, f'{tuning_dir}/group_{param_group}', trial, result)
+            for param_group in alive:
+                writer.submit(sort_trials_log, f'{tuning_dir}/group_{param_group}/trials_log.csv')
+
+            means = {param_group: np.mean(list(scores[param_group].values())) for param_group in alive}
+            ranked = sorted(alive, key=lambda param_group: (means[param_group], param_group))
+            survivors = ranked if last_round else ranked[:math.ceil(len(ranked) / eta)]
+            for rank, param_group in enumerate(ranked, 1):
+                race_rows.append({
+                    'Round': round_num,
+                    'Budget': budget,
+                    'Group': param_group,
+                    'Trials': len(scores[param_group]),
+                    'Mean': means[param_group],
+                    'Rank': rank,
+                    'Survived': param_group in survivors
+                })
+            writer.submit(write_race_log, f'{tuning_dir}/race_log.csv', list(race_rows))
+            alive = survivors
+            first_trial = trials.stop
+
+    best_group = alive[0]
+    print(f'Best group: {best_group}\n{format_parameters(country, params[best_group - 1])}')
+    return best_group
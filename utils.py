@@ -1,21 +1,340 @@
 import os
-import xmltodict
+import hashlib
+from xml.etree import ElementTree
 import numpy as np
 
 
-def read_xml(country: str) -> list:
+# Number of distance matrix entries computed at once when building a matrix from coordinates
+BLOCK_SIZE = 1 << 20
+# Sections of a TSPLIB file that end its header
+TSPLIB_SECTIONS = {'NODE_COORD_SECTION', 'EDGE_WEIGHT_SECTION', 'DISPLAY_DATA_SECTION', 'EOF'}
+# Edge weight types whose distances TSPLIB rounds to integers
+TSPLIB_INTEGRAL_TYPES = {'EUC_2D', 'CEIL_2D', 'ATT', 'GEO'}
+# Number of values on row i of a TSPLIB explicit matrix and the slice of the matrix row they fill,
+# column-wise formats list the other triangle of a symmetric matrix row by row
+TSPLIB_ROW_LAYOUTS = {
+    'FULL_MATRIX': lambda i, n: slice(0, n),
+    'UPPER_ROW': lambda i, n: slice(i + 1, n),
+    'LOWER_COL': lambda i, n: slice(i + 1, n),
+    'UPPER_DIAG_ROW': lambda i, n: slice(i, n),
+    'LOWER_DIAG_COL': lambda i, n: slice(i, n),
+    'LOWER_ROW': lambda i, n: slice(0, i),
+    'UPPER_COL': lambda i, n: slice(0, i),
+    'LOWER_DIAG_ROW': lambda i, n: slice(0, i + 1),
+    'UPPER_DIAG_COL': lambda i, n: slice(0, i + 1),
+}
+
+
+def read_xml(path: str, dtype=np.float64) -> np.ndarray:
+    """
+    Function to stream a TSP instance in the XML format into a distance matrix. Vertices are parsed one at a time
+    and written straight into a preallocated matrix, so the parsed tree never holds more than one vertex.
+    :param path: str
+    :param dtype: dtype of the distance matrix
+    :return: distance_matrix: ndarray
+    """
+    distance_matrix = None
+    graph = None
+    row = 0
+    for event, element in ElementTree.iterparse(path, events=('start', 'end')):
+        if event == 'start':
+            if element.tag == 'graph':
+                graph = element
+            continue
+        if element.tag != 'vertex':
+            continue
+
+        targets = np.array([int(edge.text) for edge in element], dtype=np.int64)
+        costs = np.array([float(edge.get('cost')) for edge in element], dtype=dtype)
+        if distance_matrix is None:
+            # The first vertex is connected to every other city of the complete graph
+            distance_matrix = np.zeros((len(targets) + 1, len(targets) + 1), dtype=dtype)
+        distance_matrix[row, targets] = costs
+        row += 1
+        # Drop the parsed vertex from the tree
+        graph.clear()
+
+    return distance_matrix
+
+
+def read_tsplib_header(file) -> tuple[dict, str]:
+    """
+    Function to read the specification part of an open TSPLIB file up to its first data section
+    :param file: text file
+    :return: header, section: tuple[dict, str]
+    """
+    header = {}
+    for line in file:
+        line = line.strip()
+        if not line:
+            continue
+        if line.split(':')[0].strip() in TSPLIB_SECTIONS:
+            return header, line.split(':')[0].strip()
+        key, _, value = line.partition(':')
+        header[key.strip()] = value.strip()
+    return header, 'EOF'
+
+
+def edge_distances(coords_from: np.ndarray, coords_to: np.ndarray, edge_weight_type: str) -> np.ndarray:
+    """
+    Function to compute the TSPLIB distances between pairs of cities from their coordinates, element by element
+    :param coords_from: ndarray of shape (..., 2)
+    :param coords_to: ndarray of shape (..., 2), broadcastable with coords_from
+    :param edge_weight_type: 'EUC_2D', 'CEIL_2D', 'ATT' or 'GEO'
+    :return: distances: ndarray of the broadcast shape without the last axis
+    """
+    if edge_weight_type == 'GEO':
+        # TSPLIB reads coordinates as DDD.MM degrees and minutes
+        degrees_from, degrees_to = np.trunc(coords_from), np.trunc(coords_to)
+        radians_from = 3.141592 * (degrees_from + 5.0 * (coords_from - degrees_from) / 3.0) / 180.0
+        radians_to = 3.141592 * (degrees_to + 5.0 * (coords_to - degrees_to) / 3.0) / 180.0
+        lat_from, lon_from = radians_from[..., 0], radians_from[..., 1]
+        lat_to, lon_to = radians_to[..., 0], radians_to[..., 1]
+        q1 = np.cos(lon_from - lon_to)
+        q2 = np.cos(lat_from - lat_to)
+        q3 = np.cos(lat_from + lat_to)
+        distances = np.floor(
+            6378.388 * np.arccos(np.clip(0.5 * ((1.0 + q1) * q2 - (1.0 - q1) * q3), -1.0, 1.0)) + 1.0
+        )
+        # A city is at distance 0 from itself
+        return np.where((coords_from == coords_to).all(axis=-1), 0.0, distances)
+
+    delta = coords_from - coords_to
+    squared = (delta ** 2).sum(axis=-1)
+    if edge_weight_type == 'EUC_2D':
+        return np.floor(np.sqrt(squared) + 0.5)
+    if edge_weight_type == 'CEIL_2D':
+        return np.ceil(np.sqrt(squared))
+    if edge_weight_type == 'ATT':
+        pseudo = np.sqrt(squared / 10.0)
+        rounded = np.floor(pseudo + 0.5)
+        return np.where(rounded < pseudo, rounded + 1, rounded)
+    raise ValueError(f'Unsupported edge weight type: {edge_weight_type}')
+
+
+def coordinate_distances(coords_from: np.ndarray, coords_to: np.ndarray, edge_weight_type: str) -> np.ndarray:
+    """
+    Function to compute the TSPLIB distances between two sets of cities from their coordinates
+    :param coords_from: ndarray of shape (m, 2)
+    :param coords_to: ndarray of shape (k, 2)
+    :param edge_weight_type: 'EUC_2D', 'CEIL_2D', 'ATT' or 'GEO'
+    :return: distances: ndarray of shape (m, k)
+    """
+    return edge_distances(coords_from[:, None, :], coords_to[None, :, :], edge_weight_type)
+
+
+def seek_tsplib_section(file, header: dict, section: str, target: str) -> None:
+    """
+    Function to move an open TSPLIB file forward to the start of a data section
+    :param file: text file
+    :param header: dict, updated with any keywords read on the way
+    :param section: str, the section the file is currently at
+    :param target: str
+    :return: None
+    """
+    while section != target:
+        if section == 'EOF':
+            raise ValueError(f'TSPLIB file has no {target}')
+        more_header, section = read_tsplib_header(file)
+        header.update(more_header)
+
+
+def read_tsplib(path: str, dtype=np.float64) -> np.ndarray:
+    """
+    Function to read a TSPLIB .tsp file into a distance matrix. Coordinate instances (EUC_2D, CEIL_2D, GEO, ATT)
+    are expanded block by block and explicit matrices are streamed row by row into a preallocated matrix.
+    :param path: str
+    :param dtype: dtype of the distance matrix
+    :return: distance_matrix: ndarray
+    """
+    with open(path) as file:
+        header, section = read_tsplib_header(file)
+        n_cities = int(header['DIMENSION'])
+        edge_weight_type = header.get('EDGE_WEIGHT_TYPE', 'EUC_2D')
+
+        if edge_weight_type == 'EXPLICIT':
+            distance_matrix = np.zeros((n_cities, n_cities), dtype=dtype)
+            seek_tsplib_section(file, header, section, 'EDGE_WEIGHT_SECTION')
+            edge_weight_format = header.get('EDGE_WEIGHT_FORMAT', 'FULL_MATRIX')
+            row_layout = TSPLIB_ROW_LAYOUTS[edge_weight_format]
+            pending = np.empty(0, dtype=dtype)
+            row = 0
+            for line in file:
+                if row == n_cities:
+                    break
+                pending = np.concatenate((pending, np.array(line.split(), dtype=dtype)))
+                # Fill every row whose values have all been read
+                while row < n_cities:
+                    columns = row_layout(row, n_cities)
+                    row_len = columns.stop - columns.start
+                    if len(pending) < row_len:
+                        break
+                    distance_matrix[row, columns] = pending[:row_len]
+                    pending = pending[row_len:]
+                    row += 1
+            if edge_weight_format != 'FULL_MATRIX':
+                # Mirror the triangle that was read, the first row of an upper triangle runs to the last column
+                upper = row_layout(0, n_cities).stop == n_cities
+                for i in range(n_cities):
+                    if upper:
+                        distance_matrix[i + 1:, i] = distance_matrix[i, i + 1:]
+                    else:
+                        distance_matrix[i, i + 1:] = distance_matrix[i + 1:, i]
+            return distance_matrix
+
+        seek_tsplib_section(file, header, section, 'NODE_COORD_SECTION')
+        coords = np.loadtxt(file, max_rows=n_cities, usecols=(1, 2), ndmin=2)
+
+    return coordinates_to_matrix(coords, edge_weight_type, dtype)
+
+
+def read_tsplib_coordinates(path: str) -> tuple[np.ndarray, str]:
     """
-    Function to read the XML file
-    :param country: str
-    :return: data: list
+    Function to read the city coordinates of a TSPLIB coordinate instance (EUC_2D, CEIL_2D, GEO, ATT) without
+    building its distance matrix
+    :param path: str
+    :return: coords, edge_weight_type: tuple[ndarray of shape (n_cities, 2), str]
     """
-    if country == 'brazil':
-        with open('data/brazil58.xml') as brazil_file:
-            data = xmltodict.parse(brazil_file.read())
+    if path.endswith('.xml'):
+        raise ValueError('XML instances list their edges, only TSPLIB coordinate instances have coordinates')
+    with open(path) as file:
+        header, section = read_tsplib_header(file)
+        edge_weight_type = header.get('EDGE_WEIGHT_TYPE', 'EUC_2D')
+        if edge_weight_type == 'EXPLICIT':
+            raise ValueError('Explicit TSPLIB instances have no coordinates')
+        seek_tsplib_section(file, header, section, 'NODE_COORD_SECTION')
+        coords = np.loadtxt(file, max_rows=int(header['DIMENSION']), usecols=(1, 2), ndmin=2)
+    return coords, edge_weight_type
+
+
+def coordinates_to_matrix(coords: np.ndarray, edge_weight_type: str, dtype=np.float64) -> np.ndarray:
+    """
+    Function to build a distance matrix from city coordinates, computing it block by block into a preallocated
+    matrix so the temporary arrays stay small
+    :param coords: ndarray of shape (n_cities, 2)
+    :param edge_weight_type: 'EUC_2D', 'CEIL_2D', 'ATT' or 'GEO'
+    :param dtype: dtype of the distance matrix
+    :return: distance_matrix: ndarray
+    """
+    n_cities = len(coords)
+    distance_matrix = np.empty((n_cities, n_cities), dtype=dtype)
+    block_rows = max(BLOCK_SIZE // n_cities, 1)
+    for start in range(0, n_cities, block_rows):
+        distance_matrix[start:start + block_rows] = coordinate_distances(
+            coords[start:start + block_rows], coords, edge_weight_type
+        )
+    return distance_matrix
+
+
+def load_distance_matrix(path: str, dtype=np.float64) -> np.ndarray:
+    """
+    Function to load the distance matrix of a TSP instance from an XML or TSPLIB .tsp file
+    :param path: str
+    :param dtype: dtype of the distance matrix
+    :return: distance_matrix: ndarray
+    """
+    if path.endswith('.xml'):
+        return read_xml(path, dtype)
+    return read_tsplib(path, dtype)
+
+
+def has_integral_costs(path: str) -> bool:
+    """
+    Function to tell from the header of a TSPLIB file whether all its distances are rounded to integers
+    :param path: str
+    :return: integral: bool
+    """
+    if path.endswith('.xml'):
+        return False
+    with open(path) as file:
+        header, _ = read_tsplib_header(file)
+    return header.get('EDGE_WEIGHT_TYPE', 'EUC_2D') in TSPLIB_INTEGRAL_TYPES
+
+
+def compact_distance_matrix(distance_matrix: np.ndarray) -> np.ndarray:
+    """
+    Function to cast a float64 distance matrix to int32 when every cost is an integer and to float32 otherwise.
+    The costs are checked and cast block by block into the front of the matrix's own buffer, so no full-size
+    temporary is made.
+    :param distance_matrix: ndarray of float64
+    :return: distance_matrix: ndarray of int32 or float32, a view into the buffer of the given matrix
+    """
+    n_cities = len(distance_matrix)
+    block_rows = max(BLOCK_SIZE // n_cities, 1)
+    int32_max = np.iinfo(np.int32).max
+    integral = True
+    for start in range(0, n_cities, block_rows):
+        block = distance_matrix[start:start + block_rows]
+        if not (np.equal(block, np.rint(block)).all() and np.abs(block).max() < int32_max):
+            integral = False
+            break
+
+    # Row i of the 4-byte matrix starts at or before row i of the 8-byte one, so writing the rows in order
+    # only overwrites rows that have already been cast
+    compact = distance_matrix.reshape(-1).view(np.int32 if integral else np.float32)[:n_cities * n_cities]
+    compact = compact.reshape(n_cities, n_cities)
+    for start in range(0, n_cities, block_rows):
+        compact[start:start + block_rows] = distance_matrix[start:start + block_rows].astype(compact.dtype)
+    return compact
+
+
+def cache_distance_matrix(path: str, dtype: str = 'float64', cache_dir: str = '.cache') -> str:
+    """
+    Function to parse an instance once into a binary .npy cache file. The cache file is keyed by the instance's
+    path and content hash, so an edited or moved instance is parsed again.
+    :param path: str
+    :param dtype: 'float64', 'float32', 'int32', or 'compact' for int32 when every cost is an integer and
+    float32 otherwise
+    :param cache_dir: str
+    :return: cache_file_path: str
+    """
+    content_hash = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 20), b''):
+            content_hash.update(chunk)
+    key = hashlib.sha256(f'{os.path.abspath(path)}:{content_hash.hexdigest()}'.encode()).hexdigest()[:16]
+    name = os.path.splitext(os.path.basename(path))[0]
+    cache_file_path = os.path.join(cache_dir, f'{name}-{key}-{dtype}.npy')
+    if os.path.exists(cache_file_path):
+        return cache_file_path
+
+    if dtype == 'compact':
+        if has_integral_costs(path):
+            distance_matrix = load_distance_matrix(path, np.int32)
+        else:
+            distance_matrix = compact_distance_matrix(load_distance_matrix(path))
     else:
-        with open('data/burma14.xml') as burma_file:
-            data = xmltodict.parse(burma_file.read())
-    return data['travellingSalesmanProblemInstance']['graph']['vertex']
+        distance_matrix = load_distance_matrix(path, np.dtype(dtype))
+
+    if not os.path.exists(cache_dir):
+        os.makedirs(cache_dir)
+    # Write to a temporary file first so readers never see a partial cache file
+    temp_file_path = f'{cache_file_path}.{os.getpid()}.tmp'
+    with open(temp_file_path, 'wb') as file:
+        np.save(file, distance_matrix)
+    os.replace(temp_file_path, cache_file_path)
+    return cache_file_path
+
+
+def load_cached_distance_matrix(path: str, dtype: str = 'float64', cache_dir: str = '.cache') -> np.ndarray:
+    """
+    Function to memory-map the cached distance matrix of an instance read-only, building the cache if needed
+    :param path: str
+    :param dtype: 'float64', 'float32', 'int32' or 'compact'
+    :param cache_dir: str
+    :return: distance_matrix: memmap
+    """
+    return np.load(cache_distance_matrix(path, dtype, cache_dir), mmap_mode='r')
+
+
+def tour_dtype(n_cities: int) -> np.dtype:
+    """
+    Function to find the smallest integer dtype that holds the 0-based cities of an instance, and one more value
+    that operators use as an empty entry
+    :param n_cities: int
+    :return: dtype
+    """
+    return np.dtype(np.uint16) if n_cities <= np.iinfo(np.uint16).max else np.dtype(np.int32)
 
 
 def prompt_input(options: list, input_message: str) -> str: